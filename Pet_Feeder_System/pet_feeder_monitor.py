@@ -1,11 +1,28 @@
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
-import serial
-import serial.tools.list_ports
-import threading
+from tkinter import ttk, messagebox
 import time
-import re
-from datetime import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from monitor_core.accesslog import AccessLog
+from monitor_core.alerts import AlertEngine
+from monitor_core.connection import ConnectionManager, PortWatcher, CONNECTED, DISCONNECTED
+from monitor_core.engine import MonitorEngine, list_serial_ports
+from monitor_core.feeding import FeedingRollups
+from monitor_core.handoff import Handoff
+from monitor_core.journal import EventJournal
+from monitor_core.parsers import PetFeederParser
+from monitor_core.profiling import StageProfiler, profiler_from_env, finish_profile
+from monitor_core.tkui import (RenderScheduler, HandoffPump, LabelUpdater, LogConsole, TrendPanel, LatencyPanel,
+                               AccessLogPanel, FeedingHistoryPanel, DEFAULT_MAX_LINES, LEVEL_COLORS)
+
+# Every RFID scan and access decision is journaled here
+ACCESS_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rfid_access.db')
+# Daily and weekly fed/skipped counts, food level at feed time and servo openings
+FEEDING_ROLLUPS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feeding_rollups.db')
+# Every parsed line, replayed on startup to rebuild the state and the console
+JOURNAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'journal')
 
 class PetFeederMonitorApp(tk.Tk):
     def __init__(self):
@@ -20,31 +37,65 @@ class PetFeederMonitorApp(tk.Tk):
         self.style.configure('Status.TLabel', font=('Arial', 10), foreground='#ffffff', background='#2b2b2b')
         self.style.configure('Custom.TButton', font=('Arial', 10, 'bold'))
 
-        self.serial_port = None
-        self.running = False
-        self.thread = None
-
-        self.current_data = {
-            'food_distance': '--',
-            'food_alert': 'Unknown',
-            'food_present': 'Unknown',
-            'ir_sensor': '--',
-            'relay_status': 'OFF',
-            'last_access': 'Never',
-            'last_feed': 'Never',
-            'last_uid': '--',
-            'access_status': '--',
-            'unauthorized_uid': '--',
-            'feeding_7am': '--',
-            'feeding_12pm': '--',
-            'feeding_7pm': '--',
-            'wifi_status': 'Unknown',
-            'firebase_status': 'Unknown',
-            'last_update': 'Never'
-        }
+        self.connection = None
+        self.connection_down = False
+
+        # Serial reading and parsing live in the headless engine; this window only renders its state.
+        # Engine callbacks run on the reader thread and only post into the handoff, which the Tk
+        # thread drains on a timer, so every method below runs on the Tk thread.
+        self.handoff = Handoff()
+        post = self.handoff.post
+        self.engine = MonitorEngine(PetFeederParser())
+        # UI-owned copy of the engine state, kept current by the deltas the reader posts
+        self.current_data = self.engine.parser.initial_state()
+        self.engine.subscribe_lines(lambda line: post(self.append_text, line))
+        self.engine.subscribe_errors(lambda message: post(self.append_text, message))
+        self.engine.state.subscribe(self.handoff.state_poster(self.on_state_changed))
+        # The readings as numbers, which the labels are coloured and formatted from
+        self.readings = {}
+        self.engine.subscribe_readings(self.handoff.state_poster(self.on_readings_changed))
+        # A boot banner from another board type means the wrong port was picked
+        self.engine.parser.subscribe_device(lambda device: post(self.on_device_detected, device))
+
+        # Thresholds are declarative alert rules, evaluated only when their channel gets a reading
+        self.alerts = AlertEngine.for_device(PetFeederParser.DEVICE)
+        self.alerts.subscribe(lambda event: post(self.on_alert, event))
+        self.engine.parser.subscribe_samples(self.alerts.feed)
+        self.active_alerts = set()
+
+        # Journal writes are batched by the access log's own thread, never dropped by the handoff
+        self.access_log = AccessLog(ACCESS_LOG_PATH).start()
+        self.access_log.subscribe_errors(lambda message: post(self.append_text, message))
+        self.engine.parser.subscribe_events(self.access_log.event_recorder())
+        self.access_log_panel = None
+
+        # Rollups are updated per event on the reader thread and outlive the firmware's midnight reset
+        self.rollups = FeedingRollups(FEEDING_ROLLUPS_PATH)
+        self.rollups.subscribe_errors(lambda message: post(self.append_text, message))
+        self.engine.parser.subscribe_events(self.rollups.event_recorder())
+        self.history_panel = None
+
+        self.max_console_lines = DEFAULT_MAX_LINES
+        self.labels = LabelUpdater()
+        self.renderer = RenderScheduler(self, self.render_frame)
+        self.latency_panel = None
+        # MONITOR_PROFILE=<file> samples every thread and writes collapsed stacks on exit
+        self.sampler, self.sampler_path = profiler_from_env()
 
         self.create_widgets()
         self.populate_ports()
+        # Every line is journaled with batched fsyncs, so a crash or restart keeps the state and the console
+        self.journal = EventJournal(JOURNAL_DIR)
+        self.journal.subscribe_errors(lambda message: post(self.append_text, message))
+        self.restore_from_journal()
+        # Hot-plug: the port list follows boards being plugged in and removed
+        self.port_watcher = PortWatcher()
+        self.port_watcher.subscribe(lambda ports, added, removed: post(self.on_ports_changed, ports, added))
+        self.port_watcher.start()
+        self.engine.parser.subscribe_samples(
+            lambda channel, value: post(self.trends.record, channel, value, time.time_ns()))
+        self.pump = HandoffPump(self, self.handoff, on_drop=self.on_updates_dropped)
+        self.pump.start()
 
     def create_widgets(self):
         main_frame = ttk.Frame(self)
@@ -84,23 +135,44 @@ class PetFeederMonitorApp(tk.Tk):
         status_frame.pack(fill=tk.X, pady=(0, 20))
         self.create_status_grid(status_frame)
 
+        trend_frame = ttk.LabelFrame(main_frame, text="📈 Trends", padding=10)
+        trend_frame.pack(fill=tk.X, pady=(0, 20))
+        self.trends = TrendPanel(trend_frame, PetFeederParser.CHANNELS, labels={'food_distance': "Food Distance (cm)", 'ir_sensor': "IR Sensor"})
+        self.trends.pack(fill=tk.X)
+
         data_frame = ttk.LabelFrame(main_frame, text="📜 Live Data Stream", padding=10)
         data_frame.pack(fill=tk.BOTH, expand=True)
 
-        self.text_area = scrolledtext.ScrolledText(
-            data_frame, 
-            width=100, 
-            height=20, 
-            state=tk.DISABLED, 
+        self.console = LogConsole(
+            data_frame,
+            max_lines=self.max_console_lines,
+            width=100,
+            height=20,
             font=("Consolas", 9),
             bg='#1e1e1e',
             fg='#ffffff',
             insertbackground='#ffffff'
         )
-        self.text_area.pack(fill=tk.BOTH, expand=True)
+        self.console.pack(fill=tk.BOTH, expand=True)
+
+        console_btn_frame = ttk.Frame(data_frame)
+        console_btn_frame.pack(pady=(10, 0))
+
+        clear_btn = ttk.Button(console_btn_frame, text="🗑️ Clear Display", command=self.clear_display, style='Custom.TButton')
+        clear_btn.pack(side=tk.LEFT, padx=5)
+
+        self.pause_scroll_var = tk.BooleanVar(value=False)
+        pause_btn = ttk.Checkbutton(console_btn_frame, text="⏸️ Pause Autoscroll", variable=self.pause_scroll_var, command=self.toggle_autoscroll)
+        pause_btn.pack(side=tk.LEFT, padx=5)
+
+        latency_btn = ttk.Button(console_btn_frame, text="🔬 Latency", command=self.show_latency_panel, style='Custom.TButton')
+        latency_btn.pack(side=tk.LEFT, padx=5)
+
+        access_btn = ttk.Button(console_btn_frame, text="📜 Access Log", command=self.show_access_log_panel, style='Custom.TButton')
+        access_btn.pack(side=tk.LEFT, padx=5)
 
-        clear_btn = ttk.Button(data_frame, text="🗑️ Clear Display", command=self.clear_display, style='Custom.TButton')
-        clear_btn.pack(pady=(10, 0))
+        history_btn = ttk.Button(console_btn_frame, text="📊 Feeding History", command=self.show_history_panel, style='Custom.TButton')
+        history_btn.pack(side=tk.LEFT, padx=5)
 
     def create_status_grid(self, parent):
         # Food Status Frame
@@ -200,99 +272,105 @@ class PetFeederMonitorApp(tk.Tk):
 
         ttk.Label(sys_grid, text="Last Update:", style='Status.TLabel').grid(row=0, column=4, sticky='w', padx=(0, 10))
         self.update_label = ttk.Label(sys_grid, text="Never", style='Status.TLabel')
-        self.update_label.grid(row=0, column=5, sticky='w')
-
-    def update_status_display(self):
-        # Food Monitoring
-        self.food_distance_label.config(text=f"{self.current_data['food_distance']} cm")
-        self.food_alert_label.config(text=self.current_data['food_alert'])
-        self.food_present_label.config(text=self.current_data['food_present'])
-        self.ir_sensor_label.config(text=self.current_data['ir_sensor'])
-
-        # RFID Access
-        self.last_uid_label.config(text=self.current_data['last_uid'])
-        self.access_status_label.config(text=self.current_data['access_status'])
-        self.unauthorized_uid_label.config(text=self.current_data['unauthorized_uid'])
+        self.update_label.grid(row=0, column=5, sticky='w', padx=(0, 20))
 
-        # Feeding Schedule
-        self.feeding_7am_label.config(text=self.current_data['feeding_7am'])
-        self.feeding_12pm_label.config(text=self.current_data['feeding_12pm'])
-        self.feeding_7pm_label.config(text=self.current_data['feeding_7pm'])
+        ttk.Label(sys_grid, text="Alerts:", style='Status.TLabel').grid(row=0, column=6, sticky='w', padx=(0, 10))
+        self.alerts_label = ttk.Label(sys_grid, text="None", style='Status.TLabel')
+        self.alerts_label.grid(row=0, column=7, sticky='w')
 
-        # Activity Log
-        self.last_access_label.config(text=self.current_data['last_access'])
-        self.last_feed_label.config(text=self.current_data['last_feed'])
-        self.relay_label.config(text=self.current_data['relay_status'])
+    def render_frame(self):
+        # Runs at most once per frame, however many lines arrived since the last one
+        self.console.flush()
+        self.update_status_display()
+        self.trends.refresh()
 
-        # System Status
-        self.wifi_label.config(text=self.current_data['wifi_status'])
-        self.firebase_label.config(text=self.current_data['firebase_status'])
-        self.update_label.config(text=self.current_data['last_update'])
+    def update_status_display(self):
+        data = self.current_data
+        labels = self.labels
 
         # Color coding
         # Food Alert
-        if "low" in self.current_data['food_alert'].lower():
-            self.food_alert_label.config(foreground='red')
-        elif "OK" in self.current_data['food_alert']:
-            self.food_alert_label.config(foreground='#00ff00')
+        if "low" in data['food_alert'].lower():
+            food_alert_color = 'red'
+        elif "OK" in data['food_alert']:
+            food_alert_color = '#00ff00'
         else:
-            self.food_alert_label.config(foreground='orange')
+            food_alert_color = 'orange'
 
         # Food Distance
-        try:
-            distance = int(self.current_data['food_distance'].replace('--', '0'))
-            if distance > 15:
-                self.food_distance_label.config(foreground='red')
-            elif distance > 10:
-                self.food_distance_label.config(foreground='orange')
-            else:
-                self.food_distance_label.config(foreground='#00ff00')
-        except:
-            self.food_distance_label.config(foreground='white')
+        # A typed reading, which the handoff never drops, so it cannot go stale; None until the first one
+        food = self.readings.get('food_distance')
+        # Coloured by the alert rule's thresholds, at once; the Alerts field waits for the debounce
+        food_distance_color = LEVEL_COLORS[self.alerts.level('food_distance', food)]
 
         # Food Present
-        if "Yes" in self.current_data['food_present']:
-            self.food_present_label.config(foreground='#00ff00')
-        elif "No" in self.current_data['food_present']:
-            self.food_present_label.config(foreground='orange')
+        if "Yes" in data['food_present']:
+            food_present_color = '#00ff00'
+        elif "No" in data['food_present']:
+            food_present_color = 'orange'
         else:
-            self.food_present_label.config(foreground='white')
+            food_present_color = 'white'
 
         # Access Status
-        if "Authorized" in self.current_data['access_status']:
-            self.access_status_label.config(foreground='#00ff00')
-        elif "Unauthorized" in self.current_data['access_status']:
-            self.access_status_label.config(foreground='red')
+        if "Authorized" in data['access_status']:
+            access_color = '#00ff00'
+        elif "Unauthorized" in data['access_status']:
+            access_color = 'red'
         else:
-            self.access_status_label.config(foreground='white')
+            access_color = 'white'
 
-        # Relay Status
-        if self.current_data['relay_status'] == "ON":
-            self.relay_label.config(foreground='#00ff00')
-        else:
-            self.relay_label.config(foreground='orange')
+        # Only labels whose text or colour changed are reconfigured
+        # Food Monitoring
+        labels.set(self.food_distance_label, f"{data['food_distance'] if food is None else format(food, '.0f')} cm",
+                   food_distance_color)
+        labels.set(self.food_alert_label, data['food_alert'], food_alert_color)
+        labels.set(self.food_present_label, data['food_present'], food_present_color)
+        labels.set(self.ir_sensor_label, data['ir_sensor'])
 
-        # WiFi and Firebase
-        if "Connected" in self.current_data['wifi_status']:
-            self.wifi_label.config(foreground='#00ff00')
-        else:
-            self.wifi_label.config(foreground='red')
+        # RFID Access
+        labels.set(self.last_uid_label, data['last_uid'])
+        labels.set(self.access_status_label, data['access_status'], access_color)
+        labels.set(self.unauthorized_uid_label, data['unauthorized_uid'])
 
-        if "true" in self.current_data['firebase_status'].lower():
-            self.firebase_label.config(foreground='#00ff00')
-        else:
-            self.firebase_label.config(foreground='red')
+        # Feeding Schedule
+        labels.set(self.feeding_7am_label, data['feeding_7am'])
+        labels.set(self.feeding_12pm_label, data['feeding_12pm'])
+        labels.set(self.feeding_7pm_label, data['feeding_7pm'])
 
-    def populate_ports(self):
-        ports = serial.tools.list_ports.comports()
-        port_names = [port.device for port in ports]
+        # Activity Log
+        labels.set(self.last_access_label, data['last_access'])
+        labels.set(self.last_feed_label, data['last_feed'])
+        labels.set(self.relay_label, data['relay_status'], '#00ff00' if data['relay_status'] == "ON" else 'orange')
+
+        # System Status
+        labels.set(self.wifi_label, data['wifi_status'], '#00ff00' if "Connected" in data['wifi_status'] else 'red')
+        labels.set(self.firebase_label, data['firebase_status'], '#00ff00' if "true" in data['firebase_status'].lower() else 'red')
+        labels.set(self.update_label, data['last_update'])
+        # Alerts are debounced and shown on their own; the colours above react to the reading at once
+        active = self.active_alerts
+        labels.set(self.alerts_label, ", ".join(sorted(active)) if active else "None", 'red' if active else '#00ff00')
+
+    def populate_ports(self, port_names=None):
+        if port_names is None:
+            port_names = list_serial_ports()
+        monitoring = self.connection is not None and self.connection.alive()
         if port_names:
             self.port_combo['values'] = port_names
-            self.port_combo.set(port_names[0])
+            # Keep the chosen port selected for as long as it is plugged in
+            if self.port_combo.get() not in port_names and not monitoring:
+                self.port_combo.set(port_names[0])
+            if not monitoring:
+                self.start_btn.config(state=tk.NORMAL)
         else:
             self.port_combo['values'] = ['No Ports Found']
-            self.port_combo.set('No Ports Found')
-            self.start_btn.config(state=tk.DISABLED)
+            if not monitoring:
+                self.port_combo.set('No Ports Found')
+                self.start_btn.config(state=tk.DISABLED)
+
+    def on_ports_changed(self, ports, added):
+        self.populate_ports(sorted(ports))
+        if self.connection is not None and self.connection.port_name in added:
+            self.connection.poke()
 
     def start_reading(self):
         port = self.port_combo.get()
@@ -306,165 +384,129 @@ class PetFeederMonitorApp(tk.Tk):
             messagebox.showerror("Error", "Invalid baud rate")
             return
 
-        try:
-            self.serial_port = serial.Serial(port, baud, timeout=1)
-            time.sleep(2)
-        except serial.SerialException as e:
-            messagebox.showerror("Error", f"Could not open serial port:\n{e}")
+        if self.connection is not None and self.connection.alive():
+            # Never two managers on one engine; Start comes back once the old one has exited
             return
 
-        self.running = True
         self.start_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
-        self.text_area.config(state=tk.NORMAL)
-        self.text_area.delete(1.0, tk.END)
-        self.text_area.config(state=tk.DISABLED)
+        self.console.clear()
+        self.connection_down = False
 
-        self.thread = threading.Thread(target=self.read_serial_data, daemon=True)
-        self.thread.start()
+        # Opening, reading and reconnecting all happen on the connection thread, so the window never waits on the port
+        self.connection = ConnectionManager(self.engine, port, baud)
+        self.connection.subscribe_status(
+            lambda status, message: self.handoff.post(self.on_connection_status, status, message))
+        self.connection.start()
 
     def stop_reading(self):
-        self.running = False
-        self.start_btn.config(state=tk.NORMAL)
+        if self.connection is not None:
+            self.connection.stop()
         self.stop_btn.config(state=tk.DISABLED)
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_port.close()
-
-    def read_serial_data(self):
-        while self.running:
-            if self.serial_port.in_waiting > 0:
-                try:
-                    line = self.serial_port.readline().decode('utf-8', errors='replace').strip()
-                    if line:
-                        self.process_data_line(line)
-                        self.append_text(line)
-                except Exception as e:
-                    self.append_text(f"Error decoding data: {e}")
-            else:
-                time.sleep(0.1)
-
-    def process_data_line(self, line):
-        try:
-            # WiFi Status
-            if "Connected to WiFi" in line or "Connected to Wi-Fi" in line:
-                self.current_data['wifi_status'] = "Connected"
-            elif "Failed to connect" in line:
-                self.current_data['wifi_status'] = "Failed"
-
-            # Firebase Status
-            if "Firebase.ready():" in line:
-                if "true" in line.lower():
-                    self.current_data['firebase_status'] = "Ready (true)"
-                else:
-                    self.current_data['firebase_status'] = "Not Ready (false)"
-
-            # RFID Detection
-            if "RFID Detected:" in line:
-                match = re.search(r"RFID Detected:\s*([A-F0-9:]+)", line)
-                if match:
-                    self.current_data['last_uid'] = match.group(1)
-
-            if "Authorized ID detected" in line or "✅ Authorized" in line:
-                self.current_data['access_status'] = "Authorized"
-
-            if "Unauthorized UID" in line or "❌ Unauthorized" in line:
-                self.current_data['access_status'] = "Unauthorized"
-                match = re.search(r"([A-F0-9:]+)", line)
-                if match:
-                    self.current_data['unauthorized_uid'] = match.group(1)
-
-            # Servo Actions
-            if "Opening Servo 1" in line:
-                self.current_data['last_access'] = datetime.now().strftime("%H:%M:%S")
-
-            if "Scheduled feeding time" in line or "Opening Servo 2" in line:
-                self.current_data['last_feed'] = datetime.now().strftime("%H:%M:%S")
-
-            # Relay Status
-            if "Relay:" in line:
-                if "ON" in line:
-                    self.current_data['relay_status'] = "ON"
-                else:
-                    self.current_data['relay_status'] = "OFF"
-
-            # Food Distance
-            if "Food container distance:" in line or "food container distance:" in line:
-                match = re.search(r"distance:\s*(\d+)\s*cm", line)
-                if match:
-                    self.current_data['food_distance'] = match.group(1)
-
-            # Food Alert
-            if "Food level low" in line or "Food level Low" in line:
-                self.current_data['food_alert'] = "Food level low"
-            elif "Food level OK" in line or "Food Status: Normal" in line:
-                self.current_data['food_alert'] = "OK"
-
-            # IR Sensor
-            if "IR Sensor:" in line:
-                match = re.search(r"IR Sensor:\s*(\d+)", line)
-                if match:
-                    self.current_data['ir_sensor'] = match.group(1)
-
-            if "Food Present:" in line:
-                if "Yes" in line:
-                    self.current_data['food_present'] = "Yes"
-                else:
-                    self.current_data['food_present'] = "No"
-
-            # Feeding Schedule
-            if "7 AM:" in line or "7am" in line:
-                if "Fed" in line:
-                    self.current_data['feeding_7am'] = "✅ Fed"
-                elif "Skipped" in line:
-                    self.current_data['feeding_7am'] = "⏭️ Skipped"
-
-            if "12 PM:" in line or "12pm" in line:
-                if "Fed" in line:
-                    self.current_data['feeding_12pm'] = "✅ Fed"
-                elif "Skipped" in line:
-                    self.current_data['feeding_12pm'] = "⏭️ Skipped"
-
-            if "7 PM:" in line or "7pm" in line:
-                if "Fed" in line:
-                    self.current_data['feeding_7pm'] = "✅ Fed"
-                elif "Skipped" in line:
-                    self.current_data['feeding_7pm'] = "⏭️ Skipped"
-
-            # Firebase Debug Messages
-            if "[OK]" in line:
-                # Extract path and value for better tracking
-                if "/petFeeder/lastAccess" in line:
-                    match = re.search(r"=\s*(.+)$", line)
-                    if match:
-                        self.current_data['last_access'] = match.group(1).strip()
-                elif "/petFeeder/lastFeed" in line:
-                    match = re.search(r"=\s*(.+)$", line)
-                    if match:
-                        self.current_data['last_feed'] = match.group(1).strip()
-
-            self.current_data['last_update'] = datetime.now().strftime("%H:%M:%S")
-            self.after(0, self.update_status_display)
-
-        except Exception as e:
-            print(f"Error processing line: {e}")
+        self.enable_start_when_stopped()
+
+    def enable_start_when_stopped(self):
+        # The manager finishes its current read (up to one read timeout) on its own thread; the window polls
+        if self.connection is not None and self.connection.alive():
+            self.after(50, self.enable_start_when_stopped)
+            return
+        self.start_btn.config(state=tk.NORMAL)
+
+    def on_connection_status(self, status, message):
+        # One line per outage; the retries in between are not repeated in the console
+        if status == CONNECTED:
+            self.connection_down = False
+            self.append_text(f"🔌 {message}")
+        elif status == DISCONNECTED and not self.connection_down:
+            self.connection_down = True
+            self.append_text(f"⚠️ {message}")
+
+    def on_device_detected(self, device):
+        if device != PetFeederParser.DEVICE:
+            self.append_text(f"⚠️ This port is talking to a {device} board, not a pet feeder")
+
+    def restore_from_journal(self):
+        # The last session's state and console, rebuilt from the journal before the reader starts
+        recovered = self.journal.recover(self.engine, console_lines=self.max_console_lines)
+        for line in recovered['lines']:
+            self.console.append(line)
+        self.on_state_changed(dict(self.engine.current_data))
+        self.journal.attach(self.engine)
+
+    def on_state_changed(self, delta):
+        self.current_data.update(delta)
+        self.renderer.request()
+
+    def on_readings_changed(self, delta):
+        self.readings.update(delta)
+        self.renderer.request()
+
+    def on_alert(self, event):
+        if event['active']:
+            self.active_alerts.add(event['name'])
+            self.append_text(f"🚨 ALERT: {event['message']} ({event['value']:g})")
+        else:
+            self.active_alerts.discard(event['name'])
+            self.append_text(f"✅ Cleared: {event['message']}")
 
     def append_text(self, text):
-        def task():
-            self.text_area.config(state=tk.NORMAL)
-            self.text_area.insert(tk.END, text + '\n')
-            self.text_area.see(tk.END)
-            self.text_area.config(state=tk.DISABLED)
-        self.after(0, task)
+        self.console.append(text)
+        self.renderer.request()
+
+    def on_updates_dropped(self, count):
+        # The handoff was full: the display could not keep up with the port
+        self.append_text(f"⚠️ Display fell behind: {count} updates dropped ({self.handoff.dropped} in total)")
 
     def clear_display(self):
-        self.text_area.config(state=tk.NORMAL)
-        self.text_area.delete(1.0, tk.END)
-        self.text_area.config(state=tk.DISABLED)
+        self.console.clear()
+
+    def toggle_autoscroll(self):
+        self.console.set_autoscroll(not self.pause_scroll_var.get())
+
+    def show_latency_panel(self):
+        # Stage timing is only switched on while the panel is open
+        if self.latency_panel is not None:
+            self.latency_panel.lift()
+            return
+        profiler = StageProfiler()
+        self.engine.profiler = profiler
+        self.renderer.profiler = profiler
+        self.latency_panel = LatencyPanel(self, profiler, on_close=self.hide_latency_panel)
+
+    def hide_latency_panel(self):
+        self.engine.profiler = None
+        self.renderer.profiler = None
+        self.latency_panel = None
+
+    def show_access_log_panel(self):
+        if self.access_log_panel is not None:
+            self.access_log_panel.lift()
+            return
+        uid = self.current_data['last_uid']
+        self.access_log_panel = AccessLogPanel(self, self.access_log, uid='' if uid == '--' else uid,
+                                               on_close=self.hide_access_log_panel)
+
+    def hide_access_log_panel(self):
+        self.access_log_panel = None
+
+    def show_history_panel(self):
+        if self.history_panel is not None:
+            self.history_panel.lift()
+            return
+        self.history_panel = FeedingHistoryPanel(self, self.rollups, on_close=self.hide_history_panel)
+
+    def hide_history_panel(self):
+        self.history_panel = None
 
     def on_closing(self):
-        self.running = False
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_port.close()
+        if self.connection is not None:
+            self.connection.stop(timeout=self.engine.read_timeout * 2)
+        self.port_watcher.stop()
+        self.pump.stop()
+        self.access_log.close()
+        self.rollups.close()
+        self.journal.close()
+        finish_profile(self.sampler, self.sampler_path)
         self.destroy()
 
 if __name__ == "__main__":
@@ -1,11 +1,21 @@
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
-import serial
-import serial.tools.list_ports
-import threading
+from tkinter import ttk, messagebox
 import time
-import re
-from datetime import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from monitor_core.alerts import AlertEngine
+from monitor_core.connection import ConnectionManager, PortWatcher, CONNECTED, DISCONNECTED
+from monitor_core.engine import MonitorEngine, list_serial_ports
+from monitor_core.handoff import Handoff
+from monitor_core.journal import EventJournal
+from monitor_core.parsers import SmartHomeParser
+from monitor_core.profiling import StageProfiler, profiler_from_env, finish_profile
+from monitor_core.tkui import RenderScheduler, HandoffPump, LabelUpdater, LogConsole, TrendPanel, LatencyPanel, DEFAULT_MAX_LINES, LEVEL_COLORS
+
+# Every parsed line, replayed on startup to rebuild the state and the console
+JOURNAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'journal')
 
 class SmartHomeMonitorApp(tk.Tk):
     def __init__(self):
@@ -20,25 +30,53 @@ class SmartHomeMonitorApp(tk.Tk):
         self.style.configure('Status.TLabel', font=('Arial', 10), foreground='#ffffff', background='#2b2b2b')
         self.style.configure('Custom.TButton', font=('Arial', 10, 'bold'))
 
-        self.serial_port = None
-        self.running = False
-        self.thread = None
-
-        self.current_data = {
-            'temperature': '--',
-            'humidity': '--',
-            'light': '--',
-            'motion': 'No Motion',
-            'door': 'Closed',
-            'gas': 'Normal',
-            'flame': 'Normal',
-            'wifi_status': 'Unknown',
-            'firebase_status': 'Unknown',
-            'last_update': 'Never'
-        }
+        self.connection = None
+        self.connection_down = False
+
+        # Serial reading and parsing live in the headless engine; this window only renders its state.
+        # Engine callbacks run on the reader thread and only post into the handoff, which the Tk
+        # thread drains on a timer, so every method below runs on the Tk thread.
+        self.handoff = Handoff()
+        post = self.handoff.post
+        self.engine = MonitorEngine(SmartHomeParser())
+        # UI-owned copy of the engine state, kept current by the deltas the reader posts
+        self.current_data = self.engine.parser.initial_state()
+        self.engine.subscribe_lines(lambda line: post(self.append_text, line))
+        self.engine.subscribe_errors(lambda message: post(self.append_text, message))
+        self.engine.state.subscribe(self.handoff.state_poster(self.on_state_changed))
+        # The readings as numbers, which the labels are coloured and formatted from
+        self.readings = {}
+        self.engine.subscribe_readings(self.handoff.state_poster(self.on_readings_changed))
+        # A boot banner from another board type means the wrong port was picked
+        self.engine.parser.subscribe_device(lambda device: post(self.on_device_detected, device))
+
+        # Thresholds are declarative alert rules, evaluated only when their channel gets a reading
+        self.alerts = AlertEngine.for_device(SmartHomeParser.DEVICE)
+        self.alerts.subscribe(lambda event: post(self.on_alert, event))
+        self.engine.parser.subscribe_samples(self.alerts.feed)
+        self.active_alerts = set()
+
+        self.max_console_lines = DEFAULT_MAX_LINES
+        self.labels = LabelUpdater()
+        self.renderer = RenderScheduler(self, self.render_frame)
+        self.latency_panel = None
+        # MONITOR_PROFILE=<file> samples every thread and writes collapsed stacks on exit
+        self.sampler, self.sampler_path = profiler_from_env()
 
         self.create_widgets()
         self.populate_ports()
+        # Every line is journaled with batched fsyncs, so a crash or restart keeps the state and the console
+        self.journal = EventJournal(JOURNAL_DIR)
+        self.journal.subscribe_errors(lambda message: post(self.append_text, message))
+        self.restore_from_journal()
+        # Hot-plug: the port list follows boards being plugged in and removed
+        self.port_watcher = PortWatcher()
+        self.port_watcher.subscribe(lambda ports, added, removed: post(self.on_ports_changed, ports, added))
+        self.port_watcher.start()
+        self.engine.parser.subscribe_samples(
+            lambda channel, value: post(self.trends.record, channel, value, time.time_ns()))
+        self.pump = HandoffPump(self, self.handoff, on_drop=self.on_updates_dropped)
+        self.pump.start()
 
     def create_widgets(self):
         main_frame = ttk.Frame(self)
@@ -78,23 +116,38 @@ class SmartHomeMonitorApp(tk.Tk):
         status_frame.pack(fill=tk.X, pady=(0, 20))
         self.create_status_grid(status_frame)
 
+        trend_frame = ttk.LabelFrame(main_frame, text="📈 Trends", padding=10)
+        trend_frame.pack(fill=tk.X, pady=(0, 20))
+        self.trends = TrendPanel(trend_frame, SmartHomeParser.CHANNELS, labels={'temperature': "Temp (°C)", 'humidity': "Humidity (%)", 'light': "Light (V)", 'gas': "Gas", 'flame': "Flame"})
+        self.trends.pack(fill=tk.X)
+
         data_frame = ttk.LabelFrame(main_frame, text="📝 Live Data Stream", padding=10)
         data_frame.pack(fill=tk.BOTH, expand=True)
 
-        self.text_area = scrolledtext.ScrolledText(
-            data_frame, 
-            width=100, 
-            height=20, 
-            state=tk.DISABLED, 
+        self.console = LogConsole(
+            data_frame,
+            max_lines=self.max_console_lines,
+            width=100,
+            height=20,
             font=("Consolas", 9),
             bg='#1e1e1e',
             fg='#ffffff',
             insertbackground='#ffffff'
         )
-        self.text_area.pack(fill=tk.BOTH, expand=True)
+        self.console.pack(fill=tk.BOTH, expand=True)
+
+        console_btn_frame = ttk.Frame(data_frame)
+        console_btn_frame.pack(pady=(10, 0))
+
+        clear_btn = ttk.Button(console_btn_frame, text="🗑️ Clear Display", command=self.clear_display, style='Custom.TButton')
+        clear_btn.pack(side=tk.LEFT, padx=5)
 
-        clear_btn = ttk.Button(data_frame, text="🗑️ Clear Display", command=self.clear_display, style='Custom.TButton')
-        clear_btn.pack(pady=(10, 0))
+        self.pause_scroll_var = tk.BooleanVar(value=False)
+        pause_btn = ttk.Checkbutton(console_btn_frame, text="⏸️ Pause Autoscroll", variable=self.pause_scroll_var, command=self.toggle_autoscroll)
+        pause_btn.pack(side=tk.LEFT, padx=5)
+
+        latency_btn = ttk.Button(console_btn_frame, text="🔬 Latency", command=self.show_latency_panel, style='Custom.TButton')
+        latency_btn.pack(side=tk.LEFT, padx=5)
 
     def create_status_grid(self, parent):
         env_frame = ttk.LabelFrame(parent, text="🌡️ Environmental", padding=10)
@@ -153,77 +206,79 @@ class SmartHomeMonitorApp(tk.Tk):
 
         ttk.Label(sys_grid, text="Last Update:", style='Status.TLabel').grid(row=0, column=4, sticky='w', padx=(0, 10))
         self.update_label = ttk.Label(sys_grid, text="Never", style='Status.TLabel')
-        self.update_label.grid(row=0, column=5, sticky='w')
+        self.update_label.grid(row=0, column=5, sticky='w', padx=(0, 20))
+
+        ttk.Label(sys_grid, text="Alerts:", style='Status.TLabel').grid(row=0, column=6, sticky='w', padx=(0, 10))
+        self.alerts_label = ttk.Label(sys_grid, text="None", style='Status.TLabel')
+        self.alerts_label.grid(row=0, column=7, sticky='w')
+
+    def render_frame(self):
+        # Runs at most once per frame, however many lines arrived since the last one
+        self.console.flush()
+        self.update_status_display()
+        self.trends.refresh()
 
     def update_status_display(self):
-        self.temp_label.config(text=f"{self.current_data['temperature']}°C")
-        self.hum_label.config(text=f"{self.current_data['humidity']}%")
-        self.light_label.config(text=f"{self.current_data['light']}V")
-        self.motion_label.config(text=self.current_data['motion'])
-        self.door_label.config(text=self.current_data['door'])
-        self.gas_label.config(text=self.current_data['gas'])
-        self.flame_label.config(text=self.current_data['flame'])
-        self.wifi_label.config(text=self.current_data['wifi_status'])
-        self.firebase_label.config(text=self.current_data['firebase_status'])
-        self.update_label.config(text=self.current_data['last_update'])
-
-        # Color logic for temperature
-        try:
-            temp = float(self.current_data['temperature'])
-            if temp > 35:
-                self.temp_label.config(foreground='red')
-            elif temp > 30:
-                self.temp_label.config(foreground='orange')
-            else:
-                self.temp_label.config(foreground='#00ff00')
-        except:
-            self.temp_label.config(foreground='#ffffff')
-
-        # Color logic for humidity
-        try:
-            hum = float(self.current_data['humidity'])
-            if hum < 30:
-                self.hum_label.config(foreground='red')
-            elif hum < 40:
-                self.hum_label.config(foreground='orange')
-            else:
-                self.hum_label.config(foreground='#00ff00')
-        except:
-            self.hum_label.config(foreground='#ffffff')
-
-        # Color logic for light
-        try:
-            light = float(self.current_data['light'])
-            if light < 1:
-                self.light_label.config(foreground='red')
-            elif light < 2:
-                self.light_label.config(foreground='orange')
-            else:
-                self.light_label.config(foreground='#00ff00')
-        except:
-            self.light_label.config(foreground='#ffffff')
+        data = self.current_data
+        labels = self.labels
+
+        # Typed readings, which the handoff never drops, so they cannot go stale; None until the first one
+        readings = self.readings
+        temp = readings.get('temperature')
+        hum = readings.get('humidity')
+        light = readings.get('light')
+
+        # Colours come from the alert rules' thresholds, at once; the Alerts field waits for the debounce
+        level = self.alerts.level
+        temp_color = LEVEL_COLORS[level('temperature', temp)]
+        hum_color = LEVEL_COLORS[level('humidity', hum)]
+        light_color = LEVEL_COLORS[level('light', light)]
+        gas_color = LEVEL_COLORS[level('gas', readings.get('gas'))]
+        flame_color = LEVEL_COLORS[level('flame', readings.get('flame'))]
+        # The board also reports fire on its own status and alarm lines, which carry no reading
+        if "FIRE" in data['flame']:
+            flame_color = 'red'
+
+        # Only labels whose text or colour changed are reconfigured
+        labels.set(self.temp_label, f"{data['temperature'] if temp is None else format(temp, '.2f')}°C", temp_color)
+        labels.set(self.hum_label, f"{data['humidity'] if hum is None else format(hum, '.2f')}%", hum_color)
+        labels.set(self.light_label, f"{data['light'] if light is None else format(light, '.2f')}V", light_color)
 
         # Security sensors colors
-        self.motion_label.config(foreground='red' if "YES" in self.current_data['motion'] else '#00ff00')
-        self.door_label.config(foreground='red' if "OPEN" in self.current_data['door'] else '#00ff00')
-        self.gas_label.config(foreground='red' if "LEAK" in self.current_data['gas'] else '#00ff00')
-        self.flame_label.config(foreground='red' if "FIRE" in self.current_data['flame'] or "Detected" in self.current_data['flame'] else '#00ff00')
+        labels.set(self.motion_label, data['motion'], 'red' if "YES" in data['motion'] else '#00ff00')
+        labels.set(self.door_label, data['door'], 'red' if "OPEN" in data['door'] else '#00ff00')
+        labels.set(self.gas_label, data['gas'], gas_color)
+        labels.set(self.flame_label, data['flame'], flame_color)
 
         # System status colors
-        self.wifi_label.config(foreground='#00ff00' if "Connected" in self.current_data['wifi_status'] else 'red')
-        self.firebase_label.config(foreground='#00ff00' if "Ready" in self.current_data['firebase_status'] else 'red')
-
-    def populate_ports(self):
-        ports = serial.tools.list_ports.comports()
-        port_names = [port.device for port in ports]
+        labels.set(self.wifi_label, data['wifi_status'], '#00ff00' if "Connected" in data['wifi_status'] else 'red')
+        labels.set(self.firebase_label, data['firebase_status'], '#00ff00' if "Ready" in data['firebase_status'] else 'red')
+        labels.set(self.update_label, data['last_update'])
+        # Alerts are debounced and shown on their own; the colours above react to the reading at once
+        active = self.active_alerts
+        labels.set(self.alerts_label, ", ".join(sorted(active)) if active else "None", 'red' if active else '#00ff00')
+
+    def populate_ports(self, port_names=None):
+        if port_names is None:
+            port_names = list_serial_ports()
+        monitoring = self.connection is not None and self.connection.alive()
         if port_names:
             self.port_combo['values'] = port_names
-            self.port_combo.set(port_names[0])
-            self.start_btn.config(state=tk.NORMAL)
+            # Keep the chosen port selected for as long as it is plugged in
+            if self.port_combo.get() not in port_names and not monitoring:
+                self.port_combo.set(port_names[0])
+            if not monitoring:
+                self.start_btn.config(state=tk.NORMAL)
         else:
             self.port_combo['values'] = ['No Ports Found']
-            self.port_combo.set('No Ports Found')
-            self.start_btn.config(state=tk.DISABLED)
+            if not monitoring:
+                self.port_combo.set('No Ports Found')
+                self.start_btn.config(state=tk.DISABLED)
+
+    def on_ports_changed(self, ports, added):
+        self.populate_ports(sorted(ports))
+        if self.connection is not None and self.connection.port_name in added:
+            self.connection.poke()
 
     def start_reading(self):
         port = self.port_combo.get()
@@ -237,146 +292,107 @@ class SmartHomeMonitorApp(tk.Tk):
             messagebox.showerror("Error", "Invalid baud rate")
             return
 
-        try:
-            self.serial_port = serial.Serial(port, baud, timeout=1)
-            time.sleep(2)
-        except serial.SerialException as e:
-            messagebox.showerror("Error", f"Could not open serial port:\n{e}")
+        if self.connection is not None and self.connection.alive():
+            # Never two managers on one engine; Start comes back once the old one has exited
             return
 
-        self.running = True
         self.start_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
-        self.text_area.config(state=tk.NORMAL)
-        self.text_area.delete(1.0, tk.END)
-        self.text_area.config(state=tk.DISABLED)
+        self.console.clear()
+        self.connection_down = False
 
-        self.thread = threading.Thread(target=self.read_serial_data, daemon=True)
-        self.thread.start()
+        # Opening, reading and reconnecting all happen on the connection thread, so the window never waits on the port
+        self.connection = ConnectionManager(self.engine, port, baud)
+        self.connection.subscribe_status(
+            lambda status, message: self.handoff.post(self.on_connection_status, status, message))
+        self.connection.start()
 
     def stop_reading(self):
-        self.running = False
-        self.start_btn.config(state=tk.NORMAL)
+        if self.connection is not None:
+            self.connection.stop()
         self.stop_btn.config(state=tk.DISABLED)
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_port.close()
-
-    def read_serial_data(self):
-        while self.running:
-            if self.serial_port.in_waiting > 0:
-                try:
-                    line = self.serial_port.readline().decode('utf-8', errors='replace').strip()
-                    if line:
-                        self.process_data_line(line)
-                        self.append_text(line)
-                except Exception as e:
-                    self.append_text(f"Error decoding data: {e}")
-            else:
-                time.sleep(0.1)
-
-    def process_data_line(self, line):
-        try:
-            # WiFi Status
-            if "Connected to WiFi" in line:
-                self.current_data['wifi_status'] = "Connected"
-            elif "Failed to connect to WiFi" in line:
-                self.current_data['wifi_status'] = "Failed"
-
-            # Firebase Status
-            if "Firebase.ready(): true" in line:
-                self.current_data['firebase_status'] = "Ready"
-            elif "Firebase.ready(): false" in line:
-                self.current_data['firebase_status'] = "Not Ready"
-            elif "Firebase signup OK" in line:
-                self.current_data['firebase_status'] = "Connected"
-
-            # Environmental data - matches: "Environment -> Temp: 25.50°C  Humidity: 60.00%  Light: 3.25V"
-            if "Environment ->" in line:
-                temp_match = re.search(r"Temp:\s*([\d.]+)", line)
-                hum_match = re.search(r"Humidity:\s*([\d.]+)", line)
-                light_match = re.search(r"Light:\s*([\d.]+)", line)
-                
-                if temp_match:
-                    self.current_data['temperature'] = temp_match.group(1)
-                if hum_match:
-                    self.current_data['humidity'] = hum_match.group(1)
-                if light_match:
-                    self.current_data['light'] = light_match.group(1)
-
-            # Security data - NEW PARSING LOGIC
-            # Matches: "Security -> Motion: YES | Door: OPEN | Gas: 450"
-            if "Security ->" in line:
-                # Motion - look for "Motion: YES" or "Motion: NO"
-                if "Motion: YES" in line:
-                    self.current_data['motion'] = "Motion YES"
-                elif "Motion: NO" in line:
-                    self.current_data['motion'] = "No Motion"
-
-                # Door - look for "Door: OPEN" or "Door: CLOSED"
-                if "Door: OPEN" in line:
-                    self.current_data['door'] = "OPEN"
-                elif "Door: CLOSED" in line:
-                    self.current_data['door'] = "Closed"
-
-                # Gas level - extract numeric value after "Gas: "
-                gas_match = re.search(r"\|\s*Gas:\s*([\d.]+)", line)
-                if gas_match:
-                    gas_val = float(gas_match.group(1))
-                    if gas_val > 500:
-                        self.current_data['gas'] = "GAS LEAK!"
-                    else:
-                        self.current_data['gas'] = f"Normal ({gas_val:.0f})"
-
-            # Flame sensor - separate lines
-            # Matches: "| flame: 1234"
-            if "| flame:" in line:
-                flame_match = re.search(r"\|\s*flame:\s*([\d.]+)", line)
-                if flame_match:
-                    flame_val = float(flame_match.group(1))
-                    if flame_val < 1000:
-                        self.current_data['flame'] = "FIRE DETECTED!"
-                    else:
-                        self.current_data['flame'] = f"Normal ({flame_val:.0f})"
-
-            # Flame status string
-            # Matches: "| status: Detected" or "| status: norm"
-            if "| status:" in line:
-                if "Detected" in line:
-                    self.current_data['flame'] = "FIRE DETECTED!"
-                elif "norm" in line:
-                    if "FIRE" not in self.current_data['flame']:  # Don't override if already detected
-                        self.current_data['flame'] = "Normal"
-
-            # Alarm triggers
-            if "Door Opened - Alarm Triggered" in line:
-                self.current_data['door'] = "OPEN - ALARM!"
-            if "Fire Detected - Alarm Triggered" in line:
-                self.current_data['flame'] = "FIRE DETECTED - ALARM!"
-
-            # Update timestamp
-            self.current_data['last_update'] = datetime.now().strftime("%H:%M:%S")
-            self.after(0, self.update_status_display)
-
-        except Exception as e:
-            print(f"Error processing line '{line}': {e}")
+        self.enable_start_when_stopped()
+
+    def enable_start_when_stopped(self):
+        # The manager finishes its current read (up to one read timeout) on its own thread; the window polls
+        if self.connection is not None and self.connection.alive():
+            self.after(50, self.enable_start_when_stopped)
+            return
+        self.start_btn.config(state=tk.NORMAL)
+
+    def on_connection_status(self, status, message):
+        # One line per outage; the retries in between are not repeated in the console
+        if status == CONNECTED:
+            self.connection_down = False
+            self.append_text(f"🔌 {message}")
+        elif status == DISCONNECTED and not self.connection_down:
+            self.connection_down = True
+            self.append_text(f"⚠️ {message}")
+
+    def on_device_detected(self, device):
+        if device != SmartHomeParser.DEVICE:
+            self.append_text(f"⚠️ This port is talking to a {device} board, not a smart home system")
+
+    def restore_from_journal(self):
+        # The last session's state and console, rebuilt from the journal before the reader starts
+        recovered = self.journal.recover(self.engine, console_lines=self.max_console_lines)
+        for line in recovered['lines']:
+            self.console.append(line)
+        self.on_state_changed(dict(self.engine.current_data))
+        self.journal.attach(self.engine)
+
+    def on_state_changed(self, delta):
+        self.current_data.update(delta)
+        self.renderer.request()
+
+    def on_readings_changed(self, delta):
+        self.readings.update(delta)
+        self.renderer.request()
+
+    def on_alert(self, event):
+        if event['active']:
+            self.active_alerts.add(event['name'])
+            self.append_text(f"🚨 ALERT: {event['message']} ({event['value']:g})")
+        else:
+            self.active_alerts.discard(event['name'])
+            self.append_text(f"✅ Cleared: {event['message']}")
 
     def append_text(self, text):
-        def task():
-            self.text_area.config(state=tk.NORMAL)
-            self.text_area.insert(tk.END, text + '\n')
-            self.text_area.see(tk.END)
-            self.text_area.config(state=tk.DISABLED)
-        self.after(0, task)
+        self.console.append(text)
+        self.renderer.request()
+
+    def on_updates_dropped(self, count):
+        # The handoff was full: the display could not keep up with the port
+        self.append_text(f"⚠️ Display fell behind: {count} updates dropped ({self.handoff.dropped} in total)")
 
     def clear_display(self):
-        self.text_area.config(state=tk.NORMAL)
-        self.text_area.delete(1.0, tk.END)
-        self.text_area.config(state=tk.DISABLED)
+        self.console.clear()
+
+    def toggle_autoscroll(self):
+        self.console.set_autoscroll(not self.pause_scroll_var.get())
+
+    def show_latency_panel(self):
+        # Stage timing is only switched on while the panel is open
+        if self.latency_panel is not None:
+            self.latency_panel.lift()
+            return
+        profiler = StageProfiler()
+        self.engine.profiler = profiler
+        self.renderer.profiler = profiler
+        self.latency_panel = LatencyPanel(self, profiler, on_close=self.hide_latency_panel)
+
+    def hide_latency_panel(self):
+        self.engine.profiler = None
+        self.renderer.profiler = None
+        self.latency_panel = None
 
     def on_closing(self):
-        self.running = False
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_port.close()
+        if self.connection is not None:
+            self.connection.stop(timeout=self.engine.read_timeout * 2)
+        self.port_watcher.stop()
+        self.pump.stop()
+        self.journal.close()
+        finish_profile(self.sampler, self.sampler_path)
         self.destroy()
 
 if __name__ == "__main__":
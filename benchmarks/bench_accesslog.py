@@ -0,0 +1,117 @@
+"""RFID access journal: burst insert throughput and indexed query latency.
+
+Inserts: a burst of scans and decisions recorded through AccessLog
+(WAL, one transaction per flush) vs a commit per event with SQLite's
+default rollback journal, which is what a naive journal does. Queries: every attempt by one card this
+month and unauthorized attempts per hour over the month, on a journal of
+--rows rows, with the indexes and on the same table without them.
+
+    python -m benchmarks.bench_accesslog --rows 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from monitor_core.accesslog import AccessLog, INSERT, month_bounds
+
+
+def journal(rows, cards, start, span, seed=17):
+    """Scan + decision pairs spread over span seconds; about 3% of decisions are unauthorized."""
+    rng = random.Random(seed)
+    uids = [':'.join(f"{rng.randrange(256):02X}" for _ in range(4)) for _ in range(cards)]
+    rogue = uids[:cards // 50 or 1]
+    step = span / (rows // 2)
+    ts = start
+    for _ in range(rows // 2):
+        ts += rng.uniform(0, 2 * step)
+        if rng.random() < 0.03:
+            uid, authorized = rng.choice(rogue), False
+        else:
+            uid, authorized = rng.choice(uids), True
+        yield ts, uid, None
+        yield ts + 0.05, uid, authorized
+
+
+def best_ms(function, repeat=7):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--cards', type=int, default=2000)
+    parser.add_argument('--naive-rows', type=int, default=5000,
+                        help="rows for the one-commit-per-event baseline (it is slow)")
+    args = parser.parse_args()
+
+    start, end = month_bounds()
+    rows = list(journal(args.rows, args.cards, start, end - start - 3600))
+    probe = rows[1][1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # SQLite defaults: rollback journal, full sync, a commit per event
+        naive = sqlite3.connect(os.path.join(tmp, 'naive.db'), isolation_level=None)
+        naive.executescript("CREATE TABLE access (id INTEGER PRIMARY KEY, ts REAL NOT NULL, uid TEXT,"
+                            " authorized INTEGER, device TEXT NOT NULL DEFAULT '')")
+        began = time.perf_counter()
+        for ts, uid, authorized in rows[:args.naive_rows]:
+            naive.execute(INSERT, (ts, uid, authorized, ''))
+        naive_rate = args.naive_rows / (time.perf_counter() - began)
+        naive.close()
+
+        log = AccessLog(os.path.join(tmp, 'access.db'))
+        record = log.record
+        began = time.perf_counter()
+        for ts, uid, authorized in rows:
+            record(ts, uid, authorized)
+        recorded = time.perf_counter() - began
+        log.flush()
+        total = time.perf_counter() - began
+        size = os.path.getsize(log.path) + os.path.getsize(log.path + '-wal')
+
+        print(f"insert, {args.rows:,} events")
+        print(f"  commit per event      {naive_rate:12,.0f} rows/s  ({args.naive_rows:,} rows)")
+        print(f"  AccessLog batches     {args.rows / total:12,.0f} rows/s  "
+              f"(record() {recorded / args.rows * 1e9:.0f} ns on the reader thread)")
+        print(f"  journal size          {size / args.rows:12.0f} B/row")
+
+        bare = sqlite3.connect(os.path.join(tmp, 'bare.db'))
+        bare.execute("CREATE TABLE access (id INTEGER PRIMARY KEY, ts REAL NOT NULL, uid TEXT,"
+                     " authorized INTEGER, device TEXT NOT NULL DEFAULT '')")
+        bare.executemany(INSERT, ((ts, uid, authorized, '') for ts, uid, authorized in rows))
+        bare.commit()
+
+        attempts = log.attempts(probe, start, end)
+        per_hour = log.unauthorized_per_hour(start, end)
+        print(f"\nqueries, median of 7 ({len(attempts)} attempts by {probe}, "
+              f"{sum(count for _, count in per_hour):,} unauthorized in {len(per_hour)} hours)")
+        print(f"{'':28}{'indexed':>10}{'no index':>10}")
+        indexed = best_ms(lambda: log.attempts(probe, start, end))
+        scanned = best_ms(lambda: bare.execute("SELECT ts, authorized, device FROM access WHERE uid = ?"
+                                               " AND ts >= ? AND ts < ? ORDER BY ts",
+                                               (probe, start, end)).fetchall(), repeat=3)
+        print(f"{'attempts by UID this month':28}{indexed:8.2f}ms{scanned:8.1f}ms")
+        indexed = best_ms(lambda: log.unauthorized_per_hour(start, end))
+        scanned = best_ms(lambda: bare.execute("SELECT CAST(ts / 3600 AS INTEGER), COUNT(*) FROM access"
+                                               " WHERE authorized = 0 AND ts >= ? AND ts < ? GROUP BY 1",
+                                               (start, end)).fetchall(), repeat=3)
+        print(f"{'unauthorized per hour':28}{indexed:8.2f}ms{scanned:8.1f}ms")
+        bare.close()
+        log.close()
+
+
+if __name__ == '__main__':
+    main()
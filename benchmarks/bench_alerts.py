@@ -0,0 +1,136 @@
+"""Alert evaluation cost and flapping: indexed AlertEngine vs re-checking every rule.
+
+Builds a fleet of --devices boards, each with --rules-per-device threshold
+rules spread over the smart home channels (thousands of rules in total),
+then streams --samples random readings. The indexed engine evaluates only
+the rules on the sample's channel; the baseline re-checks every rule on each
+update, as a UI refresh loop does. A second pass feeds a reading that
+jitters around 35°C and counts alert transitions with and without
+hysteresis.
+
+    python -m benchmarks.bench_alerts --devices 200 --rules-per-device 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from monitor_core.alerts import AlertEngine, ThresholdRule
+from monitor_core.parsers import SmartHomeParser
+
+CHANNEL_RANGES = {
+    'temperature': (15.0, 45.0),
+    'humidity': (10.0, 90.0),
+    'light': (0.0, 5.0),
+    'gas': (100.0, 900.0),
+    'flame': (0.0, 4095.0),
+}
+
+
+def fleet_rules(devices, per_device, rng):
+    channels = SmartHomeParser.CHANNELS
+    rules = []
+    for d in range(devices):
+        prefix = f"board{d}."
+        for r in range(per_device):
+            channel = channels[r % len(channels)]
+            low, high = CHANNEL_RANGES[channel]
+            limit = rng.uniform(low, high)
+            band = (high - low) * 0.02
+            if r % 2:
+                rules.append(ThresholdRule(f"{prefix}rule{r}", prefix + channel, above=limit, hysteresis=band))
+            else:
+                rules.append(ThresholdRule(f"{prefix}rule{r}", prefix + channel, below=limit, hysteresis=band))
+    return rules
+
+
+def sample_stream(devices, count, rng):
+    channels = SmartHomeParser.CHANNELS
+    stream = []
+    for i in range(count):
+        channel = channels[rng.randrange(len(channels))]
+        low, high = CHANNEL_RANGES[channel]
+        stream.append((f"board{rng.randrange(devices)}.{channel}", rng.uniform(low, high), i * 0.01))
+    return stream
+
+
+def bench_indexed(rules, stream):
+    engine = AlertEngine()
+    for rule in rules:
+        engine.add_rule(rule)
+    transitions = [0]
+    engine.subscribe(lambda event: transitions.__setitem__(0, transitions[0] + 1))
+    feed = engine.feed
+    start = time.perf_counter()
+    for channel, value, ts in stream:
+        feed(channel, value, ts)
+    return time.perf_counter() - start, engine.evaluations, transitions[0]
+
+
+def bench_rescan(rules, stream):
+    # Latest value per channel, with every rule re-checked after each update
+    latest = {}
+    evaluations = 0
+    transitions = 0
+    start = time.perf_counter()
+    for channel, value, ts in stream:
+        latest[channel] = value
+        for rule in rules:
+            current = latest.get(rule.channel)
+            if current is None:
+                continue
+            evaluations += 1
+            if rule.update(current, ts) is not None:
+                transitions += 1
+    return time.perf_counter() - start, evaluations, transitions
+
+
+def count_flaps(hysteresis, count, rng):
+    engine = AlertEngine()
+    engine.add_rule(ThresholdRule('temperature_high', 'temperature', above=35, hysteresis=hysteresis))
+    transitions = [0]
+    engine.subscribe(lambda event: transitions.__setitem__(0, transitions[0] + 1))
+    for i in range(count):
+        engine.feed('temperature', 35 + rng.uniform(-0.6, 0.6), i)
+    return transitions[0]
+
+
+def reset(rules):
+    for rule in rules:
+        rule.active = False
+        rule.pending_since = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--devices', type=int, default=200)
+    parser.add_argument('--rules-per-device', type=int, default=20)
+    parser.add_argument('--samples', type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    rules = fleet_rules(args.devices, args.rules_per_device, rng)
+    stream = sample_stream(args.devices, args.samples, rng)
+
+    indexed, i_evals, i_transitions = bench_indexed(rules, stream)
+    reset(rules)
+    rescan, r_evals, r_transitions = bench_rescan(rules, stream)
+
+    print(f"{len(rules):,} rules on {args.devices} devices, {args.samples:,} samples")
+    print(f"{'':10}{'samples/s':>14}{'evals/sample':>14}{'transitions':>13}")
+    print(f"{'indexed':10}{args.samples / indexed:14,.0f}{i_evals / args.samples:14.1f}{i_transitions:13,}")
+    print(f"{'rescan':10}{args.samples / rescan:14,.0f}{r_evals / args.samples:14.1f}{r_transitions:13,}")
+    print(f"speedup {rescan / indexed:.0f}x")
+
+    print()
+    print("jittering 35 ± 0.6°C for 10,000 samples:")
+    for band in (0.0, 0.5, 1.0):
+        print(f"  hysteresis {band:.1f}: {count_flaps(band, 10000, random.Random(3)):,} transitions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Scaling of the offline log analyzer with worker processes.
+
+Writes a corpus of --mb megabytes of smart home and pet feeder logs (plain
+text, plus one gzip file per board) to a temporary directory. It checks that
+the chunked, merged analysis matches a single sequential pass over every
+file (channel counts, min, max and mean, and alert ``over``/``fires``
+counts), using byte ranges small enough that alerts span chunk boundaries.
+It then times the analysis with 1, 2, 4, ... processes up to --jobs, and
+reports MB/s, the speedup over one process and the parallel efficiency.
+
+    python -m benchmarks.bench_analyze --mb 2048 --jobs 8
+"""
+import argparse
+import gzip
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_classifier import smart_home_lines, pet_feeder_lines
+from monitor_core.alerts import DEFAULT_RULES, RateRule, build_rule
+from monitor_core.analyze import analyze, read_lines
+from monitor_core.parsers import PARSERS, SmartHomeParser, PetFeederParser
+
+BOARDS = (
+    ('smarthome', SmartHomeParser.grammar.banner, smart_home_lines),
+    ('petfeeder', PetFeederParser.grammar.banner, pet_feeder_lines),
+)
+
+
+def write_corpus(directory, total_mb, files_per_board=3, seed=7):
+    """Plain logs of about total_mb in all, plus a smaller gzip log per board."""
+    rng = random.Random(seed)
+    target = total_mb * 1e6 / (len(BOARDS) * files_per_board)
+    paths = []
+    for device, banner, generator in BOARDS:
+        for number in range(files_per_board):
+            path = os.path.join(directory, f"{device}-{number}.log")
+            with open(path, 'w', encoding='utf-8', newline='\r\n') as f:
+                f.write(banner + '\n')
+                written = 0
+                while written < target:
+                    text = '\n'.join(generator(rng)) + '\n'
+                    f.write(text)
+                    written += len(text.encode('utf-8'))
+            paths.append(path)
+        path = os.path.join(directory, f"{device}-archive.log.gz")
+        with gzip.open(path, 'wt', encoding='utf-8', newline='\r\n') as f:
+            f.write(banner + '\n')
+            for _ in range(2000):
+                f.write('\n'.join(generator(rng)) + '\n')
+        paths.append(path)
+    return paths
+
+
+def sequential(paths):
+    """The reference: every file parsed front to back with live alert rules (no debounces)."""
+    report = {}
+    for path in paths:
+        device = os.path.basename(path).split('-')[0]
+        group = report.setdefault(device, {'lines': 0, 'channels': {}, 'alerts': {}})
+        rules = {}
+        for spec in DEFAULT_RULES[device]:
+            rule = build_rule({**spec, 'for_seconds': 0})
+            if not isinstance(rule, RateRule):
+                rules.setdefault(rule.channel, []).append(rule)
+                group['alerts'].setdefault(rule.name, {'over': 0, 'fires': 0})
+
+        def on_sample(channel, value):
+            group['channels'].setdefault(channel, []).append(value)
+            for rule in rules.get(channel, ()):
+                counts = group['alerts'][rule.name]
+                counts['over'] += rule.triggered(value)
+                counts['fires'] += rule.update(value, 0) is True
+
+        parser = PARSERS[device]()
+        parser.subscribe_samples(on_sample)
+        state = parser.initial_state()
+        for batch in read_lines(path):
+            group['lines'] += len(batch)
+            for line in batch:
+                parser.process(line, state)
+    return report
+
+
+def check(report, reference):
+    for device, expected in reference.items():
+        group = report[device]
+        assert group['lines'] == expected['lines'], device
+        assert group['alerts'] == expected['alerts'], (device, group['alerts'], expected['alerts'])
+        for channel, values in expected['channels'].items():
+            stats = group['channels'][channel]
+            assert stats['count'] == len(values) and stats['min'] == min(values) and stats['max'] == max(values)
+            assert math.isclose(stats['mean'], sum(values) / len(values), rel_tol=1e-9), channel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mb', type=int, default=256, help="size of the plain-text part of the corpus")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-mb', type=int, default=16)
+    parser.add_argument('--dir', help="where to write the corpus (default: a temporary directory)")
+    args = parser.parse_args()
+
+    directory = args.dir or tempfile.mkdtemp(prefix='analyze-bench-')
+    try:
+        paths = write_corpus(directory, args.mb)
+        size = sum(os.path.getsize(path) for path in paths)
+        print(f"corpus: {len(paths)} files, {size / 1e6:,.0f} MB on disk, {os.cpu_count()} cores")
+
+        # Small ranges so that plenty of them start in the middle of an alert
+        os.makedirs(os.path.join(directory, 'check'))
+        sample = write_corpus(os.path.join(directory, 'check'), 4)
+        check(analyze(sample, 'auto', jobs=min(args.jobs, 2), chunk_bytes=64 << 10), sequential(sample))
+        print("chunked analysis matches a sequential pass")
+
+        jobs = sorted({1, *(2 ** power for power in range(1, args.jobs.bit_length())), args.jobs})
+        baseline = None
+        print(f"{'processes':>10}{'seconds':>10}{'MB/s':>10}{'speedup':>10}{'efficiency':>12}")
+        for count in jobs:
+            started = time.perf_counter()
+            analyze(paths, 'auto', jobs=count, chunk_bytes=args.chunk_mb << 20)
+            elapsed = time.perf_counter() - started
+            baseline = baseline or elapsed
+            print(f"{count:10}{elapsed:10.2f}{size / 1e6 / elapsed:10.1f}{baseline / elapsed:9.2f}x"
+                  f"{baseline / elapsed / count * 100:11.0f}%")
+    finally:
+        if not args.dir:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Lines/sec of the legacy process_data_line cascades vs the compiled parsers.
+
+Builds a synthetic log (one million lines by default) from realistic firmware
+output, checks that both implementations end in identical state after every
+line of a verification pass, then times each over the full log.
+
+    python -m benchmarks.bench_classifier --lines 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.legacy_parsers import smart_home_cascade, pet_feeder_cascade
+from monitor_core.parsers import SmartHomeParser, PetFeederParser
+
+SMART_HOME_STATE = {
+    'temperature': '--', 'humidity': '--', 'light': '--', 'motion': 'No Motion',
+    'door': 'Closed', 'gas': 'Normal', 'flame': 'Normal',
+    'wifi_status': 'Unknown', 'firebase_status': 'Unknown',
+}
+
+PET_FEEDER_STATE = {
+    'food_distance': '--', 'food_alert': 'Unknown', 'food_present': 'Unknown',
+    'ir_sensor': '--', 'relay_status': 'OFF', 'last_access': 'Never',
+    'last_feed': 'Never', 'last_uid': '--', 'access_status': '--',
+    'unauthorized_uid': '--', 'feeding_7am': '--', 'feeding_12pm': '--',
+    'feeding_7pm': '--', 'wifi_status': 'Unknown', 'firebase_status': 'Unknown',
+}
+
+
+def smart_home_lines(rng):
+    temp = rng.uniform(18, 40)
+    gas = rng.randint(200, 700)
+    flame = rng.randint(500, 4095)
+    return [
+        f"Environment -> Temp: {temp:.2f}°C  Humidity: {rng.uniform(20, 80):.2f}%  Light: {rng.uniform(0, 5):.2f}V",
+        f"Security -> Motion: {rng.choice(['YES', 'NO'])} | Door: {rng.choice(['OPEN', 'CLOSED'])} | Gas: {gas}",
+        f"| flame: {flame}",
+        f"| status: {'Detected' if flame < 1000 else 'norm'}",
+        f"[OK] environment/temperature = {temp:.2f}",
+        f"[OK] security/gasLeak = {int(gas > 500)}",
+        "[OK] security/motion = 0",
+        "Firebase.ready(): true",
+        rng.choice(["Connected to WiFi", "Failed to connect to WiFi", "Firebase signup OK",
+                    "Door Opened - Alarm Triggered", "Fire Detected - Alarm Triggered",
+                    "Firebase.ready(): false", "IP Address: 192.168.1.40"]),
+    ]
+
+
+def pet_feeder_lines(rng):
+    uid = ':'.join(f"{rng.randint(0, 255):02X}" for _ in range(4))
+    return [
+        f"Food container distance: {rng.randint(2, 25)} cm",
+        rng.choice(["Food level low", "Food level OK", "Food Status: Normal", "Food level Low"]),
+        f"IR Sensor: {rng.randint(0, 1)}",
+        f"Food Present: {rng.choice(['Yes', 'No'])}",
+        f"RFID Detected: {uid}",
+        rng.choice(["Authorized: Opening Servo 1", "Unauthorized UID", "❌ Unauthorized " + uid,
+                    "✅ Authorized", "Authorized ID detected"]),
+        f"Relay: {rng.choice(['ON', 'OFF'])}",
+        rng.choice(["7 AM: Fed", "7 AM: Skipped", "12 PM: Fed", "12pm Skipped", "7 PM: Fed",
+                    "Scheduled Feeding: Opening Servo 2", "Daily feeding schedule reset."]),
+        f"[OK] /petFeeder/lastFeed = {rng.randint(0, 23):02d}:00:00",
+        f"[OK] /petFeeder/lastAccess = {rng.randint(0, 23):02d}:30:00",
+        "Firebase.ready(): true",
+        rng.choice(["Connected to Wi-Fi", "Connecting to WiFi....", "Failed to connect"]),
+    ]
+
+
+def build_log(generator, count, seed=1):
+    rng = random.Random(seed)
+    lines = []
+    while len(lines) < count:
+        lines.extend(generator(rng))
+    return lines[:count]
+
+
+def clock():
+    return "12:00:00"
+
+
+def verify(lines, legacy, compiled, initial):
+    legacy_state = dict(initial)
+    compiled_state = dict(initial)
+    for line in lines:
+        legacy(line, legacy_state)
+        compiled.process(line, compiled_state)
+        if legacy_state != compiled_state:
+            raise AssertionError(f"state diverged after {line!r}")
+
+
+def time_run(func, lines):
+    start = time.perf_counter()
+    for line in lines:
+        func(line)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=1000000)
+    args = parser.parse_args()
+
+    suites = [
+        ("smart home", build_log(smart_home_lines, args.lines), smart_home_cascade,
+         SmartHomeParser(), SMART_HOME_STATE),
+        ("pet feeder", build_log(pet_feeder_lines, args.lines),
+         lambda line, state: pet_feeder_cascade(line, state, clock),
+         PetFeederParser(clock=clock), PET_FEEDER_STATE),
+    ]
+
+    for name, lines, legacy, compiled, initial in suites:
+        verify(lines[:20000], legacy, compiled, initial)
+
+        state = dict(initial)
+        before = time_run(lambda line: legacy(line, state), lines)
+        state = dict(initial)
+        after = time_run(lambda line: compiled.process(line, state), lines)
+
+        print(f"{name}: {len(lines):,} lines")
+        print(f"  cascade   {len(lines) / before:12,.0f} lines/s")
+        print(f"  compiled  {len(lines) / after:12,.0f} lines/s  ({before / after:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
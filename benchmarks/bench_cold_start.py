@@ -0,0 +1,63 @@
+"""Cold start of the headless engine vs the Tk monitor window's imports.
+
+Each measurement is a fresh interpreter that imports the path under test and
+builds an engine; the interpreter's own startup is subtracted. The headless
+path must stay under COLD_START_BUDGET_MS.
+
+    python -m benchmarks.bench_cold_start --runs 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budget for importing the engine + CLI and constructing an engine, on top of bare interpreter startup
+COLD_START_BUDGET_MS = 50
+
+SNIPPETS = {
+    'python -c pass': "pass",
+    'headless engine + cli': (
+        "from monitor_core.cli import main\n"
+        "from monitor_core.engine import MonitorEngine\n"
+        "MonitorEngine.for_device('smarthome')"
+    ),
+    'tk + ttk + serial (GUI imports)': (
+        "import tkinter, tkinter.ttk, tkinter.scrolledtext, tkinter.messagebox\n"
+        "import serial, serial.tools.list_ports\n"
+        "import monitor_core.tkui, monitor_core.engine"
+    ),
+}
+
+
+def time_snippet(code, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=15)
+    args = parser.parse_args()
+
+    results = {name: time_snippet(code, args.runs) for name, code in SNIPPETS.items()}
+    baseline = results.pop('python -c pass')
+    print(f"interpreter startup: {baseline:6.1f} ms")
+    for name, value in results.items():
+        print(f"{name:<32} +{value - baseline:6.1f} ms")
+
+    headless = results['headless engine + cli'] - baseline
+    verdict = "within" if headless <= COLD_START_BUDGET_MS else "OVER"
+    print(f"headless cold start {verdict} the {COLD_START_BUDGET_MS} ms budget")
+    return 0 if headless <= COLD_START_BUDGET_MS else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""Load test of the live dashboard with hundreds of concurrent browser clients.
+
+Opens --clients local connections to /events, then has a feeder thread run
+a smart home log through MonitorEngine at --rate lines/s for --seconds. Each
+client keeps a replica of the state from the snapshot and the updates it
+receives; the run checks that every replica ends equal to the engine's
+state, and reports the connect time, the fan-out time per update, the
+delivery latency from broadcast to client and the bytes each client read.
+
+    python -m benchmarks.bench_dashboard --clients 500 --rate 2000 --seconds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_classifier import build_log, smart_home_lines
+from monitor_core.dashboard import DashboardServer, DEFAULT_INTERVAL, KEEPALIVE, encode_event
+from monitor_core.engine import MonitorEngine
+
+
+class TimedDashboard(DashboardServer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent = []
+        self.fanout = []
+        self.payload_bytes = 0
+        self.last_payload = None
+
+    def broadcast(self, payload):
+        started = time.perf_counter()
+        super().broadcast(payload)
+        if payload is not KEEPALIVE:
+            self.fanout.append(time.perf_counter() - started)
+            self.sent.append(started)
+            self.payload_bytes += len(payload)
+            self.last_payload = payload
+
+
+class Client:
+    def __init__(self):
+        self.replica = {}
+        self.received = []
+        self.bytes = 0
+
+    async def run(self, port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b"GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        try:
+            await reader.readuntil(b'\r\n\r\n')
+            while True:
+                block = await reader.readuntil(b'\n\n')
+                now = time.perf_counter()
+                self.bytes += len(block)
+                event = data = None
+                for line in block.decode('utf-8').split('\n'):
+                    if line.startswith('event: '):
+                        event = line[7:]
+                    elif line.startswith('data: '):
+                        data = json.loads(line[6:])
+                if data is None:
+                    continue
+                if event == 'snapshot':
+                    self.replica = data
+                    continue
+                for device, changes in data.items():
+                    self.replica.setdefault(device, {}).update(changes)
+                self.received.append(now)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def feed(engine, lines, rate):
+    # Paced in batches of 10 ms worth of lines
+    batch = max(1, rate // 100)
+    started = time.perf_counter()
+    for index in range(0, len(lines), batch):
+        for line in lines[index:index + batch]:
+            engine.process_line(line)
+        delay = started + (index + batch) / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def raise_file_limit(needed):
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        limit = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+
+
+async def load_test(args, lines):
+    dashboard = TimedDashboard(port=0, interval=args.interval).start()
+    engine = MonitorEngine.for_device('smarthome')
+    dashboard.add_engine(engine, 'smarthome')
+    port = dashboard.server.sockets[0].getsockname()[1]
+
+    clients = [Client() for _ in range(args.clients)]
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(client.run(port)) for client in clients]
+    while dashboard.stats()['clients'] < args.clients or any(not client.replica for client in clients):
+        if time.perf_counter() - started > 30:
+            raise SystemExit(f"only {dashboard.stats()['clients']} of {args.clients} clients connected")
+        await asyncio.sleep(0.01)
+    connected = time.perf_counter() - started
+
+    feeder = threading.Thread(target=feed, args=(engine, lines, args.rate), daemon=True)
+    fed = time.perf_counter()
+    feeder.start()
+    while feeder.is_alive():
+        await asyncio.sleep(0.05)
+    fed = time.perf_counter() - fed
+
+    # Wait for the last flush to reach everyone
+    expected = {'smarthome': dict(engine.current_data)}
+    deadline = time.perf_counter() + 10
+    while time.perf_counter() < deadline and any(client.replica != expected for client in clients):
+        await asyncio.sleep(0.05)
+    matching = sum(client.replica == expected for client in clients)
+    stats = dashboard.stats()
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    dashboard.stop(timeout=5)
+    return dashboard, clients, connected, fed, matching, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--rate', type=int, default=2000, help="lines per second fed to the engine")
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help="seconds over which the dashboard coalesces changes into one update")
+    args = parser.parse_args()
+
+    raise_file_limit(args.clients * 2 + 100)
+    lines = build_log(smart_home_lines, int(args.rate * args.seconds))
+    dashboard, clients, connected, fed, matching, stats = asyncio.run(load_test(args, lines))
+
+    updates = len(dashboard.sent)
+    print(f"{args.clients} clients connected in {connected * 1e3:.0f} ms; "
+          f"{len(lines):,} lines fed in {fed:.2f} s")
+    if not updates:
+        print("no updates were broadcast")
+        return 1
+    mean_fanout = statistics.mean(dashboard.fanout)
+    print(f"updates: {updates} broadcast, {dashboard.payload_bytes / updates:.0f} bytes each on average")
+    print(f"fan-out: {mean_fanout * 1e3:.2f} ms per update ({mean_fanout * 1e6 / args.clients:.2f} us per client), "
+          f"{sum(dashboard.fanout) / fed * 100:.1f}% of the run")
+    # What the same update would cost if it were serialized for each client instead of once
+    update = json.loads(dashboard.last_payload.decode('utf-8')[len('data: '):])
+    encode = timeit.timeit(lambda: encode_event(update), number=2000) / 2000
+    print(f"serializing per client instead would add {encode * args.clients * 1e3:.2f} ms per update "
+          f"({encode * 1e6:.1f} us x {args.clients})")
+
+    latencies = []
+    for client in clients:
+        if len(client.received) == updates:
+            latencies.extend(at - sent for at, sent in zip(client.received, dashboard.sent))
+    if latencies:
+        latencies.sort()
+        ms = [x * 1e3 for x in latencies]
+        print(f"delivery latency: p50 {statistics.median(ms):.2f} ms, "
+              f"p99 {ms[int(len(ms) * 0.99) - 1]:.2f} ms, max {ms[-1]:.2f} ms")
+    received = [len(client.received) for client in clients]
+    print(f"per client: {min(received)}-{max(received)} updates, "
+          f"{statistics.mean(client.bytes for client in clients) / 1024:.1f} KiB")
+    print(f"replicas matching the engine state: {matching}/{args.clients}; "
+          f"clients cut off for falling behind: {stats['dropped_clients']}")
+    return 0 if matching == args.clients else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Typed events vs display strings: parse cost per line and memory per retained event.
+
+Parse: lines/s of the parsers with and without an event subscriber, plus
+the render-side cost of turning state into numbers, i.e. today's float() of
+display strings vs reading fields off the latest typed event. Memory:
+bytes per retained reading for a snapshot of the state dict, a dict of
+strings per reading and a slotted event, measured with tracemalloc.
+
+    python -m benchmarks.bench_events --lines 200000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_classifier import build_log, smart_home_lines, pet_feeder_lines, clock
+from monitor_core.events import EnvironmentReading
+from monitor_core.parsers import SmartHomeParser, PetFeederParser
+
+
+def parse_rate(parser, lines, with_events):
+    latest = {}
+    if with_events:
+        def keep(event):
+            latest[event.kind] = event
+        parser.subscribe_events(keep)
+    state = parser.initial_state()
+    process = parser.process
+    start = time.perf_counter()
+    for line in lines:
+        process(line, state)
+    return len(lines) / (time.perf_counter() - start)
+
+
+def render_from_strings(state):
+    # What update_status_display did on every refresh
+    values = []
+    for key in ('temperature', 'humidity', 'light'):
+        try:
+            values.append(float(state[key]))
+        except ValueError:
+            values.append(None)
+    return values
+
+
+def render_from_event(latest):
+    env = latest.get('environment')
+    if env is None:
+        return [None, None, None]
+    return [env.temperature, env.humidity, env.light]
+
+
+def render_cost(func, arg, count=200000):
+    start = time.perf_counter()
+    for _ in range(count):
+        func(arg)
+    return (time.perf_counter() - start) / count * 1e9
+
+
+def retained_bytes(build, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The list itself holds one pointer per item under every approach
+    return (after - before) / len(kept) - 8
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--retain', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"parse, {args.lines:,} lines")
+    print(f"{'':12}{'strings':>14}{'+ events':>14}")
+    for name, factory, generator in (("smart home", SmartHomeParser, smart_home_lines),
+                                     ("pet feeder", lambda: PetFeederParser(clock=clock), pet_feeder_lines)):
+        lines = build_log(generator, args.lines)
+        plain = parse_rate(factory(), lines, False)
+        typed = parse_rate(factory(), lines, True)
+        print(f"{name:12}{plain:14,.0f}{typed:14,.0f}  lines/s")
+
+    smart = SmartHomeParser()
+    state = smart.initial_state()
+    latest = {}
+    smart.subscribe_events(lambda event: latest.__setitem__(event.kind, event))
+    smart.process("Environment -> Temp: 25.50°C  Humidity: 60.00%  Light: 3.25V", state)
+    print()
+    print("render-side numbers per refresh")
+    print(f"  float() of display strings  {render_cost(render_from_strings, state):7.0f} ns")
+    print(f"  typed event fields          {render_cost(render_from_event, latest):7.0f} ns")
+
+    def snapshot(i):
+        data = dict(state)
+        data['temperature'] = f"{20 + i % 1000 / 100:.2f}"
+        return data
+
+    def string_dict(i):
+        return {'temperature': f"{20 + i % 1000 / 100:.2f}", 'humidity': f"{40 + i % 700 / 100:.2f}",
+                'light': f"{i % 500 / 100:.2f}", 'last_update': time.strftime("%H:%M:%S")}
+
+    def event(i):
+        return EnvironmentReading(time.time(), 20 + i % 1000 / 100, 40 + i % 700 / 100, i % 500 / 100)
+
+    print()
+    print(f"memory per retained reading ({args.retain:,} kept)")
+    print(f"  state dict snapshot         {retained_bytes(snapshot, args.retain):7.0f} B")
+    print(f"  dict of display strings     {retained_bytes(string_dict, args.retain):7.0f} B")
+    print(f"  slotted EnvironmentReading  {retained_bytes(event, args.retain):7.0f} B")
+
+
+if __name__ == '__main__':
+    main()
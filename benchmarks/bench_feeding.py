@@ -0,0 +1,118 @@
+"""Feeding history: incremental rollups vs re-aggregating raw events.
+
+Simulates --years of pet feeder events (three scheduled slots a day with
+the food level read before each, servo 2 on every feed, --accesses RFID door
+openings a day) and feeds them to FeedingRollups, reporting the cost per
+event. Then times loading the history views (the last 90 days, every week)
+from the rollup table, and from a raw event table aggregated with GROUP BY
+on every load, which is what a rescan of the history costs.
+
+    python -m benchmarks.bench_feeding --years 5
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from monitor_core.events import FeedEvent, FoodLevelReading, ServoEvent
+from monitor_core.feeding import FeedingRollups
+
+SLOTS = (('7am', 7), ('12pm', 12), ('7pm', 19))
+
+
+def simulate(years, accesses, seed=11):
+    rng = random.Random(seed)
+    midnight = time.mktime(time.localtime(time.time() - years * 365 * 86400)[:3] + (0, 0, 0, 0, 0, -1))
+    events = []
+    level = 10
+    for day in range(years * 365):
+        base = midnight + day * 86400
+        for _ in range(accesses):
+            events.append(ServoEvent(base + rng.uniform(0, 86400), 1))
+        for slot, hour in SLOTS:
+            ts = base + hour * 3600
+            level = min(25, max(2, level + rng.choice((-3, -1, 0, 2, 4))))
+            fed = level > 10
+            events.append(FoodLevelReading(ts, level))
+            events.append(FeedEvent(ts + 1, slot, fed))
+            if fed:
+                events.append(ServoEvent(ts + 2, 2))
+                level = 4
+    events.sort(key=lambda event: event.ts)
+    return events
+
+
+def median_ms(function, repeat=7):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e3
+
+
+RESCAN_DAYS = """
+SELECT date(ts, 'unixepoch', 'localtime') AS day,
+       sum(kind = 'feed' AND value = 1), sum(kind = 'feed' AND value = 0),
+       sum(kind = 'servo' AND value = 1), sum(kind = 'servo' AND value = 2)
+FROM event GROUP BY day ORDER BY day DESC LIMIT 90
+"""
+
+RESCAN_WEEKS = """
+SELECT date(ts, 'unixepoch', 'localtime', 'weekday 1', '-7 days') AS week,
+       sum(kind = 'feed' AND value = 1), sum(kind = 'feed' AND value = 0),
+       sum(kind = 'servo' AND value = 1), sum(kind = 'servo' AND value = 2)
+FROM event GROUP BY week ORDER BY week DESC
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--accesses', type=int, default=40, help="RFID door openings per day")
+    args = parser.parse_args()
+
+    events = simulate(args.years, args.accesses)
+    with tempfile.TemporaryDirectory() as tmp:
+        rollups = FeedingRollups(os.path.join(tmp, 'feeding.db'))
+        record = rollups.event_recorder()
+        start = time.perf_counter()
+        for event in events:
+            record(event)
+        rollups.flush()
+        elapsed = time.perf_counter() - start
+        print(f"{args.years} years, {len(events):,} events")
+        print(f"  rollup update       {elapsed / len(events) * 1e9:8.0f} ns/event "
+              f"({rollups.flushes:,} flushes)")
+
+        raw = sqlite3.connect(os.path.join(tmp, 'raw.db'))
+        raw.execute("CREATE TABLE event (ts REAL NOT NULL, kind TEXT NOT NULL, value REAL)")
+        raw.executemany("INSERT INTO event VALUES (?, ?, ?)",
+                        ((event.ts, event.kind, getattr(event, 'servo', None) if event.kind == 'servo' else
+                          (event.fed if event.kind == 'feed' else event.distance_cm)) for event in events))
+        raw.commit()
+
+        days = rollups.history('day', 90)
+        rescanned = raw.execute(RESCAN_DAYS).fetchall()
+        assert [row[0] for row in days] == [row[0] for row in rescanned]
+        assert [(row[1], row[2], row[6], row[7]) for row in days] == [tuple(row[1:]) for row in rescanned]
+
+        print("\nhistory load, median of 7")
+        print(f"{'':22}{'rollups':>10}{'rescan':>10}")
+        print(f"{'last 90 days':22}{median_ms(lambda: rollups.history('day', 90)):8.2f}ms"
+              f"{median_ms(lambda: raw.execute(RESCAN_DAYS).fetchall(), repeat=3):8.1f}ms")
+        print(f"{'every week':22}{median_ms(lambda: rollups.history('week')):8.2f}ms"
+              f"{median_ms(lambda: raw.execute(RESCAN_WEEKS).fetchall(), repeat=3):8.1f}ms")
+        raw.close()
+        rollups.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Firebase request count: one request per write vs the coalescing sink.
+
+Simulates --seconds of firmware output from a small fleet at the rates the
+sketches run (smart home: 7 writes per ~1 s loop, pet feeder: 7 writes per
+2 s routine), then counts the uploads FirebaseSink would make for several
+coalescing windows. Finally both strategies are sent over HTTP to two local
+Realtime Database stand-ins, timed, and the resulting trees compared.
+
+    python -m benchmarks.bench_firebase --seconds 300 --devices 4
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from monitor_core.firebase import FirebaseSink, MemoryBackend, RestBackend, parse_firebase_write
+from monitor_core.localdb import LocalRealtimeDatabase
+
+
+def smart_home_writes(rng, state):
+    state['temp'] += rng.uniform(-0.2, 0.2)
+    state['hum'] += rng.uniform(-0.5, 0.5)
+    return [
+        f"[OK] environment/temperature = {state['temp']:.2f}",
+        f"[OK] environment/humidity = {state['hum']:.2f}",
+        f"[OK] environment/lightLevel = {rng.uniform(2.9, 3.1):.2f}",
+        f"[OK] security/motion = {int(rng.random() < 0.1)}",
+        "[OK] security/doorStatus = 0",
+        f"[OK] security/gasLeak = {int(rng.random() < 0.01)}",
+        "[OK] security/fire = 0",
+    ]
+
+
+def pet_feeder_writes(rng, state):
+    state['dist'] = min(25, max(2, state['dist'] + rng.choice((-1, 0, 0, 0, 1))))
+    soil = int(rng.random() < 0.5)
+    return [
+        f"[OK] /petFeeder/irSensor = {int(state['dist'] > 10)}",
+        f"[OK] /petFeeder/foodPresent = {int(state['dist'] <= 10)}",
+        f"[OK] /petFeeder/soilMoisture = {soil}",
+        f"[OK] /petFeeder/soilStatus = {'Wet - Pump Off' if soil else 'Dry - Watering'}",
+        f"[OK] /petFeeder/pumpStatus = {1 - soil}",
+        f"[OK] /petFeeder/foodDistance = {state['dist']}",
+        f"[OK] /petFeeder/foodAlert = {'Food level low' if state['dist'] > 15 else 'OK'}",
+    ]
+
+
+def timeline(devices, seconds, seed=5):
+    """[(t, prefix, line)] sorted by time, for alternating smart home / pet feeder boards."""
+    rng = random.Random(seed)
+    events = []
+    for d in range(devices):
+        prefix = f"devices/board{d}"
+        if d % 2 == 0:
+            generator, period, state = smart_home_writes, 1.0, {'temp': 25.0, 'hum': 55.0}
+        else:
+            generator, period, state = pet_feeder_writes, 2.0, {'dist': 8}
+        t = rng.uniform(0, period)
+        while t < seconds:
+            for i, line in enumerate(generator(rng, state)):
+                events.append((t + i * 0.01, prefix, line))
+            t += period
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def feed_sink(sink, events):
+    # Flushes fire on simulated time, as the sink thread would every `window` seconds
+    writers = {}
+    next_flush = sink.window
+    for t, prefix, line in events:
+        while t >= next_flush:
+            sink.flush()
+            next_flush += sink.window
+        writer = writers.get(prefix)
+        if writer is None:
+            writer = writers[prefix] = sink.line_writer(prefix)
+        writer(line)
+    sink.flush()
+
+
+def send_direct(events, url):
+    backend = RestBackend(url)
+    start = time.perf_counter()
+    for t, prefix, line in events:
+        path, value = parse_firebase_write(line)
+        backend.put(f"{prefix}/{path}", value)
+    return time.perf_counter() - start, backend.requests
+
+
+def send_coalesced(events, url, window):
+    backend = RestBackend(url)
+    start = time.perf_counter()
+    feed_sink(FirebaseSink(backend, window=window), events)
+    return time.perf_counter() - start, backend.requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=300)
+    parser.add_argument('--devices', type=int, default=4)
+    parser.add_argument('--window', type=float, default=1.0, help="window used for the HTTP comparison")
+    args = parser.parse_args()
+
+    events = timeline(args.devices, args.seconds)
+    print(f"{args.devices} boards, {args.seconds:.0f} s simulated, {len(events):,} firmware writes "
+          f"({len(events) / args.seconds:.1f}/s)")
+    print(f"{'window':>8}{'requests':>10}{'reduction':>11}{'coalesced':>11}")
+    for window in (0.5, 1.0, 2.0, 5.0, 10.0):
+        sink = FirebaseSink(MemoryBackend(), window=window)
+        feed_sink(sink, events)
+        requests = sink.backend.requests
+        print(f"{window:7.1f}s{requests:10,}{len(events) / requests:10.1f}x{sink.coalesced:11,}")
+
+    direct_db = LocalRealtimeDatabase().start()
+    batched_db = LocalRealtimeDatabase().start()
+    try:
+        direct_time, direct_requests = send_direct(events, direct_db.url)
+        batched_time, batched_requests = send_coalesced(events, batched_db.url, args.window)
+        if direct_db.tree != batched_db.tree:
+            raise AssertionError("coalesced uploads left a different database state")
+    finally:
+        direct_db.stop()
+        batched_db.stop()
+
+    print()
+    print(f"over HTTP to the local stand-in ({args.window:g}s window), final trees identical:")
+    print(f"  direct   {direct_requests:8,} requests  {direct_time:7.2f} s")
+    print(f"  batched  {batched_requests:8,} requests  {batched_time:7.2f} s")
+
+
+if __name__ == '__main__':
+    main()
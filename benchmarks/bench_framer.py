@@ -0,0 +1,105 @@
+"""Compare per-line readline()/decode against chunked LineFramer reads.
+
+Replays a recorded capture (or a synthetic one built from the fake ESP32
+lines) through both approaches and reports sustained bytes/sec and lines/sec.
+
+    python -m benchmarks.bench_framer --capture session.log
+    python -m benchmarks.bench_framer --lines 500000 --pty
+"""
+import argparse
+import io
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_esp32 import FakeESP32, SMART_HOME_LINES, PET_FEEDER_LINES
+from monitor_core.serial_reader import LineFramer, SerialLineReader, DEFAULT_CHUNK_SIZE
+
+
+def synthetic_capture(count):
+    pattern = SMART_HOME_LINES + PET_FEEDER_LINES
+    lines = (pattern * (count // len(pattern) + 1))[:count]
+    return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+
+
+def bench_readline(data):
+    stream = io.BytesIO(data)
+    count = 0
+    start = time.perf_counter()
+    while True:
+        raw = stream.readline()
+        if not raw:
+            break
+        line = raw.decode('utf-8', errors='replace').strip()
+        if line:
+            count += 1
+    return count, time.perf_counter() - start
+
+
+def bench_framer(data, chunk_size):
+    framer = LineFramer()
+    view = memoryview(data)
+    count = 0
+    start = time.perf_counter()
+    for offset in range(0, len(data), chunk_size):
+        count += len(framer.feed(view[offset:offset + chunk_size]))
+    count += len(framer.flush())
+    return count, time.perf_counter() - start
+
+
+def bench_pty(data, chunk_size):
+    import serial
+
+    device = FakeESP32()
+    port = serial.Serial(device.port_name, 115200, timeout=1)
+    reader = SerialLineReader(port, chunk_size=chunk_size)
+    expected = data.count(b'\n')
+    writer = threading.Thread(target=device.write_bytes, args=(data,), daemon=True)
+
+    count = 0
+    start = time.perf_counter()
+    writer.start()
+    while count < expected:
+        lines = reader.read_lines()
+        if not lines and not writer.is_alive() and not reader.wait_readable():
+            break
+        count += len(lines)
+    elapsed = time.perf_counter() - start
+    writer.join()
+    reader.close()
+    port.close()
+    device.close()
+    return count, elapsed
+
+
+def report(name, nbytes, count, elapsed):
+    print(f"{name:<22} {nbytes / elapsed / 1e6:8.2f} MB/s {count / elapsed:12,.0f} lines/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--capture', help="raw serial capture to replay")
+    parser.add_argument('--lines', type=int, default=200000, help="size of the synthetic capture")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--pty', action='store_true', help="also read the capture through a pty")
+    args = parser.parse_args()
+
+    if args.capture:
+        with open(args.capture, 'rb') as f:
+            data = f.read()
+    else:
+        data = synthetic_capture(args.lines)
+
+    print(f"capture: {len(data):,} bytes")
+    report("readline + decode", len(data), *bench_readline(data))
+    report(f"LineFramer ({args.chunk_size} B)", len(data), *bench_framer(data, args.chunk_size))
+    if args.pty:
+        report("pty SerialLineReader", len(data), *bench_pty(data, args.chunk_size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""Lines/sec of the grammar parsers vs the handler parsers and the cascades they replaced.
+
+Builds the bench_classifier logs, salted with malformed and multi-marker
+lines, and first checks that the grammar parsers and the hand-written
+handler parsers agree after every line: same state, same return value,
+same samples and the same events (timestamps aside), and that the cascade
+ends each line in the same state. Then times each over the log, without
+subscribers and with a sample and an event subscriber, taking the best
+of --repeat interleaved runs, and times banner detection on a log that
+starts with a board's boot banner.
+
+    python -m benchmarks.bench_grammar --lines 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_classifier import build_log, smart_home_lines, pet_feeder_lines, clock
+from benchmarks.legacy_parsers import (smart_home_cascade, pet_feeder_cascade,
+                                       SmartHomeHandlerParser, PetFeederHandlerParser)
+from monitor_core.parsers import SmartHomeParser, PetFeederParser, AutoDetectParser
+
+SMART_HOME_EDGES = [
+    "Environment -> Temp: 25.50°C  Humidity: 60.00%  Light: 3.25V junk",
+    "Environment -> Temp: 1.2.3C",
+    "Security -> Motion: NO",
+    "Security -> Door: OPEN | Gas: 600 trailing",
+    "x | flame: 1.2",
+    "| flame: abc",
+    "| status: nothing",
+    "Connected to WiFi and Firebase.ready(): false",
+    "Firebase.ready(): true Firebase.ready(): false",
+]
+
+PET_FEEDER_EDGES = [
+    "RFID Detected: 5B:2B:3A:03 extra",
+    "RFID Detected: zz",
+    "✅ Authorized 93:29:C1:01",
+    "❌ Unauthorized",
+    "Food container distance: 12 cm!",
+    "food container distance: 7cm",
+    "IR Sensor: x",
+    "Scheduled feeding time",
+    "7am Fed 12pm Skipped",
+    "7 AM: nothing",
+    "[OK] /petFeeder/lastFeed = 07:00:00  ",
+    "[OK] /petFeeder/other = 1",
+    "Firebase.ready(): TRUE",
+]
+
+
+def salted_log(generator, edges, count, seed=5):
+    lines = build_log(generator, count)
+    rng = random.Random(seed)
+    for line in edges:
+        for _ in range(max(1, count // 5000)):
+            lines.insert(rng.randrange(len(lines)), line)
+    return lines
+
+
+def recorded(parser):
+    samples = []
+    events = []
+    parser.subscribe_samples(lambda channel, value: samples.append((channel, value)))
+    parser.subscribe_events(lambda event: events.append({k: v for k, v in event.as_dict().items() if k != 'ts'}))
+    return samples, events
+
+
+def verify(lines, cascade, handler, grammar):
+    handler_samples, handler_events = recorded(handler)
+    grammar_samples, grammar_events = recorded(grammar)
+    cascade_state = handler.initial_state()
+    handler_state = handler.initial_state()
+    grammar_state = grammar.initial_state()
+    for line in lines:
+        cascade(line, cascade_state)
+        expected = handler.process(line, handler_state)
+        if grammar.process(line, grammar_state) != expected:
+            raise AssertionError(f"return value differs for {line!r}")
+        if grammar_state != handler_state or cascade_state != {**cascade_state, **grammar_state}:
+            raise AssertionError(f"state diverged after {line!r}")
+        if grammar_samples != handler_samples or grammar_events != handler_events:
+            raise AssertionError(f"samples or events differ for {line!r}")
+        del handler_samples[:], handler_events[:], grammar_samples[:], grammar_events[:]
+
+
+def time_run(process, lines, state):
+    start = time.perf_counter()
+    for line in lines:
+        process(line, state)
+    return time.perf_counter() - start
+
+
+def best_of(repeat, runs):
+    """Best time of each named run, with the runs interleaved so drift hits them alike."""
+    best = {}
+    for _ in range(repeat):
+        for name, run in runs:
+            elapsed = run()
+            best[name] = min(best.get(name, elapsed), elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    suites = [
+        ("smart home", salted_log(smart_home_lines, SMART_HOME_EDGES, args.lines),
+         smart_home_cascade, SmartHomeHandlerParser, SmartHomeParser),
+        ("pet feeder", salted_log(pet_feeder_lines, PET_FEEDER_EDGES, args.lines),
+         lambda line, state: pet_feeder_cascade(line, state, clock),
+         lambda: PetFeederHandlerParser(clock=clock), lambda: PetFeederParser(clock=clock)),
+    ]
+
+    for name, lines, cascade, handler_type, grammar_type in suites:
+        verify(lines, cascade, handler_type(), grammar_type())
+        print(f"{name}: {len(lines):,} lines, outputs identical")
+
+        for subscribed in (False, True):
+            handler = handler_type()
+            grammar = grammar_type()
+            if subscribed:
+                for instance in (handler, grammar):
+                    instance.subscribe_samples(lambda channel, value: None)
+                    instance.subscribe_events(lambda event: None)
+            runs = [
+                ('handler', lambda: time_run(handler.process, lines, handler.initial_state())),
+                ('grammar', lambda: time_run(grammar.process, lines, grammar.initial_state())),
+            ]
+            if not subscribed:
+                runs.insert(0, ('cascade', lambda: time_run(cascade, lines, handler.initial_state())))
+            best = best_of(args.repeat, runs)
+            print(f"  {'with subscribers' if subscribed else 'no subscribers'}")
+            for run_name, elapsed in best.items():
+                print(f"    {run_name:9}{len(lines) / elapsed:12,.0f} lines/s  "
+                      f"({elapsed / best['grammar']:.2f}x the grammar's time)")
+
+    # A board announcing itself: the auto parser switches grammars on the banner line
+    lines = ["=== ESP32 Smart Home System ==="] + build_log(smart_home_lines, args.lines)
+    fixed = SmartHomeParser()
+    fixed_state = fixed.initial_state()
+    best = best_of(args.repeat, [
+        ('fixed', lambda: time_run(fixed.process, lines, fixed.initial_state())),
+        ('auto', lambda: time_run(AutoDetectParser().process, lines, AutoDetectParser.INITIAL_STATE.copy())),
+    ])
+    auto = AutoDetectParser()
+    auto_state = auto.initial_state()
+    for line in lines:
+        fixed.process(line, fixed_state)
+        auto.process(line, auto_state)
+    assert auto.device == SmartHomeParser.DEVICE and auto_state == fixed_state
+    print(f"banner detection: {len(lines):,} smart home lines")
+    print(f"  --device smarthome {len(lines) / best['fixed']:12,.0f} lines/s")
+    print(f"  --device auto      {len(lines) / best['auto']:12,.0f} lines/s")
+
+
+if __name__ == '__main__':
+    main()
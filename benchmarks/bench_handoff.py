@@ -0,0 +1,125 @@
+"""Reader-to-UI handoff under load: post cost, drops and state convergence.
+
+Wires a MonitorEngine the way the Tk apps do (lines, state deltas, events
+and samples posted into a Handoff) and floods it from a reader thread while
+a consumer thread plays the Tk loop: every ``--interval-ms`` it drains at
+most ``--batch`` calls, each costing ``--call-us`` of simulated UI work.
+Reports the producer-side cost per line, how much was dropped, and whether
+the UI's copy of the state matches the engine's once the flood is over.
+
+    python -m benchmarks.bench_handoff --lines 200000 --batch 2000
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_classifier import build_log, smart_home_lines
+from monitor_core.engine import MonitorEngine
+from monitor_core.handoff import Handoff
+
+
+class FakeUI:
+    def __init__(self, engine, call_seconds):
+        self.current_data = engine.parser.initial_state()
+        self.latest = {}
+        self.lines = 0
+        self.samples = 0
+        self.deltas = 0
+        self.delta_keys = 0
+        self.call_seconds = call_seconds
+
+    def work(self):
+        if self.call_seconds:
+            until = time.perf_counter() + self.call_seconds
+            while time.perf_counter() < until:
+                pass
+
+    def append_text(self, line):
+        self.lines += 1
+        self.work()
+
+    def on_state_changed(self, delta):
+        self.current_data.update(delta)
+        self.deltas += 1
+        self.delta_keys += len(delta)
+        self.work()
+
+    def on_event(self, event):
+        self.latest[event.kind] = event
+
+    def record(self, channel, value, ts_ns):
+        self.samples += 1
+
+
+def consume(handoff, stopped, interval, batch):
+    while not stopped.is_set():
+        handoff.drain(batch)
+        handoff.flush_unsent()
+        time.sleep(interval)
+    handoff.drain()
+    handoff.flush_unsent()
+
+
+def run(lines, max_items, interval, batch, call_seconds):
+    handoff = Handoff(max_items)
+    post = handoff.post
+    engine = MonitorEngine.for_device('smarthome')
+    ui = FakeUI(engine, call_seconds)
+    engine.subscribe_lines(lambda line: post(ui.append_text, line))
+    engine.state.subscribe(handoff.state_poster(ui.on_state_changed))
+    engine.parser.subscribe_events(lambda event: post(ui.on_event, event))
+    engine.parser.subscribe_samples(lambda channel, value: post(ui.record, channel, value, time.time_ns()))
+
+    stopped = threading.Event()
+    consumer = threading.Thread(target=consume, args=(handoff, stopped, interval, batch))
+    consumer.start()
+    process_line = engine.process_line
+    start = time.perf_counter()
+    for line in lines:
+        process_line(line)
+    elapsed = time.perf_counter() - start
+
+    # No more lines: the consumer alone has to bring the UI state up to date
+    while handoff.depth():
+        time.sleep(interval)
+    stopped.set()
+    consumer.join()
+    return elapsed, handoff.stats(), ui, engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--max-items', type=int, default=10000)
+    parser.add_argument('--interval-ms', type=float, default=33)
+    parser.add_argument('--batch', type=int, default=2000)
+    parser.add_argument('--call-us', type=float, default=2.0, help="simulated UI work per line and per delta")
+    args = parser.parse_args()
+
+    lines = build_log(smart_home_lines, args.lines)
+    baseline = MonitorEngine.for_device('smarthome')
+    start = time.perf_counter()
+    for line in lines:
+        baseline.process_line(line)
+    plain = time.perf_counter() - start
+
+    elapsed, stats, ui, engine = run(lines, args.max_items, args.interval_ms / 1000, args.batch, args.call_us / 1e6)
+    per_line = 1e9 / args.lines
+    print(f"{args.lines:,} lines, queue bound {args.max_items:,}, "
+          f"{args.batch:,} calls every {args.interval_ms:g} ms")
+    print(f"reader: {plain * per_line:.0f} ns/line plain, {elapsed * per_line:.0f} ns/line with handoff "
+          f"({args.lines / elapsed:,.0f} lines/s)")
+    print(f"posted {stats['posted']:,}  drained {stats['drained']:,}  dropped {stats['dropped']:,}  "
+          f"high water {stats['high_water']:,}")
+    print(f"UI got {ui.lines:,} lines, {ui.samples:,} samples, {ui.deltas:,} state deltas "
+          f"({ui.delta_keys / max(ui.deltas, 1):.1f} keys each, of {len(ui.current_data)})")
+    print(f"UI state matches engine: {ui.current_data == engine.current_data}")
+
+
+if __name__ == '__main__':
+    main()
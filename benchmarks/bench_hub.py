@@ -0,0 +1,87 @@
+"""Aggregate throughput of MonitorHub across many simulated boards.
+
+Opens N pty-backed fake ESP32s (half smart home, half pet feeder), has a
+writer thread stream a fixed number of lines into each, and times how long
+one hub thread takes to parse them all.
+
+    python -m benchmarks.bench_hub --devices 64 --lines 5000
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_esp32 import FakeESP32, SMART_HOME_LINES, PET_FEEDER_LINES
+from monitor_core.engine import open_serial
+from monitor_core.hub import MonitorHub
+
+
+def payload(sample, count):
+    lines = (sample * (count // len(sample) + 1))[:count]
+    return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+
+
+def run(device_count, lines_per_device):
+    hub = MonitorHub(read_timeout=0.05)
+    devices = []
+    payloads = {
+        'smarthome': payload(SMART_HOME_LINES, lines_per_device),
+        'petfeeder': payload(PET_FEEDER_LINES, lines_per_device),
+    }
+    for index in range(device_count):
+        device_type = 'smarthome' if index % 2 == 0 else 'petfeeder'
+        fake = FakeESP32()
+        port = open_serial(fake.port_name, 115200)
+        hub.add_device(f"board{index:02d}", device_type, port)
+        devices.append((fake, port, payloads[device_type]))
+
+    def write_all():
+        # Interleave writes so every port has traffic pending at the same time
+        chunk = 1024
+        offset = 0
+        remaining = True
+        while remaining:
+            remaining = False
+            for fake, _, data in devices:
+                if offset < len(data):
+                    fake.write_bytes(data[offset:offset + chunk])
+                    remaining = True
+            offset += chunk
+
+    expected = device_count * lines_per_device
+    writer = threading.Thread(target=write_all, daemon=True)
+    start = time.perf_counter()
+    writer.start()
+    while hub.lines_total < expected:
+        if not hub.poll(timeout=1.0) and not writer.is_alive():
+            break
+    elapsed = time.perf_counter() - start
+    writer.join()
+
+    processed = hub.lines_total
+    per_device_ok = all(d.lines_read == lines_per_device for d in hub.devices.values())
+    hub.close()
+    for fake, port, _ in devices:
+        port.close()
+        fake.close()
+    return processed, elapsed, per_device_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--devices', type=int, default=64)
+    parser.add_argument('--lines', type=int, default=5000, help="lines written per device")
+    args = parser.parse_args()
+
+    for count in sorted({1, 8, args.devices}):
+        processed, elapsed, ok = run(count, args.lines)
+        print(f"{count:3d} devices: {processed:8,} lines in {elapsed:6.2f} s "
+              f"= {processed / elapsed:10,.0f} lines/s  per-device counts {'ok' if ok else 'MISMATCH'}")
+
+
+if __name__ == '__main__':
+    main()
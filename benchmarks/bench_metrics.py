@@ -0,0 +1,67 @@
+"""Per-line overhead of the Prometheus instrumentation on MonitorEngine.
+
+Runs the same log through engine.process_line with and without
+instrument_engine attached (line counter, parse-time histogram, sensor
+gauges), reports the added cost per line, what that is as CPU share at a
+fleet-wide line rate, and the time to render a scrape.
+
+    python -m benchmarks.bench_metrics --lines 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_classifier import build_log, smart_home_lines, pet_feeder_lines
+from monitor_core.engine import MonitorEngine
+from monitor_core.metrics import MetricsRegistry, instrument_engine
+
+
+def run(device, lines, registry):
+    engine = MonitorEngine.for_device(device)
+    if registry is not None:
+        instrument_engine(registry, engine, device)
+    process_line = engine.process_line
+    start = time.perf_counter()
+    for line in lines:
+        process_line(line)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--rate', type=float, default=5000,
+                        help="fleet-wide lines/s used to express the overhead as CPU share")
+    args = parser.parse_args()
+
+    print(f"{args.lines:,} lines, best of {args.repeat}")
+    print(f"{'':12}{'plain ns':>10}{'metrics ns':>12}{'overhead':>10}")
+    for device, generator in (('smarthome', smart_home_lines), ('petfeeder', pet_feeder_lines)):
+        lines = build_log(generator, args.lines)
+        # Interleaved so drift on a busy machine hits both sides equally
+        plain_times = []
+        metered_times = []
+        for _ in range(args.repeat):
+            plain_times.append(run(device, lines, None))
+            registry = MetricsRegistry()
+            metered_times.append(run(device, lines, registry))
+        plain = min(plain_times)
+        metered = min(metered_times)
+        per_line = 1e9 / args.lines
+        overhead = (metered - plain) / args.lines
+        print(f"{device:12}{plain * per_line:10.0f}{metered * per_line:12.0f}"
+              f"{overhead * 1e9:8.0f}ns  ({metered / plain - 1:+.0%}, "
+              f"{max(overhead, 0) * args.rate:.2%} of a core at {args.rate:,.0f} lines/s)")
+
+    start = time.perf_counter()
+    body = registry.render()
+    print(f"\nscrape render: {(time.perf_counter() - start) * 1e3:.2f} ms, {len(body):,} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Reconnect latency after a board disappears and comes back.
+
+A pty-backed fake ESP32 behind a fixed path is unplugged (pty closed, path
+removed) while a ConnectionManager is reading it, kept away for a random
+0.5-1.5 x --away seconds and plugged back in as a new pty at the same path.
+Reported per cycle: how long until the loss was noticed, and how long from
+the replug to the first line parsed again. Run with --no-probe to see the same cycles
+with only the exponential backoff (as on ports that cannot be stat'ed).
+
+    python -m benchmarks.bench_reconnect --cycles 20 --away 1.0
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_esp32 import FakeESP32
+from monitor_core.connection import ConnectionManager, DISCONNECTED
+from monitor_core.engine import MonitorEngine
+
+MARKER = "Firebase.ready(): true"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cycles', type=int, default=20)
+    parser.add_argument('--away', type=float, default=1.0, help="seconds the board stays unplugged")
+    parser.add_argument('--read-timeout', type=float, default=0.5)
+    parser.add_argument('--no-probe', action='store_true', help="disable the device node probe")
+    parser.add_argument('--settle', type=float, default=0.0,
+                        help="seconds to wait after each open (the fake board has no DTR reset to wait out)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        device = FakeESP32(link=os.path.join(tmp, 'ttyFAKE0'))
+        engine = MonitorEngine.for_device('smarthome', read_timeout=args.read_timeout)
+        manager = ConnectionManager(engine, device.port_name, settle=args.settle)
+        if args.no_probe:
+            manager.probe_path = None
+
+        parsed = threading.Event()
+        lost = threading.Event()
+        engine.subscribe_lines(lambda line: parsed.set() if line == MARKER else None)
+        manager.subscribe_status(lambda status, message: lost.set() if status == DISCONNECTED else None)
+        manager.start()
+
+        rng = random.Random(3)
+        detect = []
+        resume = []
+        for _ in range(args.cycles):
+            # Connected and parsing before each unplug
+            parsed.clear()
+            while not parsed.is_set():
+                device.write_line(MARKER)
+                parsed.wait(0.05)
+            lost.clear()
+            unplugged = time.perf_counter()
+            device.unplug()
+            if not lost.wait(5):
+                print("loss was never detected", file=sys.stderr)
+                break
+            detect.append(time.perf_counter() - unplugged)
+
+            # Random, so the replug does not land at the same point of the backoff every cycle
+            time.sleep(rng.uniform(0.5, 1.5) * args.away)
+            parsed.clear()
+            device.replug()
+            replugged = time.perf_counter()
+            while not parsed.is_set():
+                device.write_line(MARKER)
+                parsed.wait(0.005)
+                if time.perf_counter() - replugged > 30:
+                    print("board never came back", file=sys.stderr)
+                    break
+            resume.append(time.perf_counter() - replugged)
+
+        manager.stop(timeout=args.read_timeout * 2)
+        device.unplug()
+
+    print(f"{len(resume)} cycles, unplugged for ~{args.away:g} s, "
+          f"{'backoff only' if args.no_probe else 'backoff + node probe'}")
+    for name, values in (("loss detected", detect), ("parsing resumed", resume)):
+        print(f"  {name:16} p50 {statistics.median(values) * 1e3:7.1f} ms   max {max(values) * 1e3:7.1f} ms")
+    stats = manager.stats()
+    print(f"  {stats['connects']} connects, {stats['attempts']} open attempts")
+
+
+if __name__ == '__main__':
+    main()
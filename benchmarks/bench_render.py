@@ -0,0 +1,88 @@
+"""Tk event-queue depth and label reconfiguration under a burst of lines.
+
+Feeds a burst of firmware lines into each monitor window and samples the
+number of pending Tk ``after`` callbacks, comparing the old one-callback-per-
+line behaviour with the coalescing RenderScheduler. Needs a display (use
+xvfb-run on a headless box):
+
+    python -m benchmarks.bench_render --burst 200
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_esp32 import SMART_HOME_LINES, PET_FEEDER_LINES
+from monitor_core.tkui import pending_after_callbacks
+
+APPS = [
+    ('smart home', 'Smart_Home_Automation___Security_System/Test-Display.py', 'SmartHomeMonitorApp', SMART_HOME_LINES),
+    ('pet feeder', 'Pet_Feeder_System/pet_feeder_monitor.py', 'PetFeederMonitorApp', PET_FEEDER_LINES),
+]
+
+
+def load_app(path, class_name):
+    spec = importlib.util.spec_from_file_location(class_name, os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return getattr(module, class_name)
+
+
+def drain(app):
+    deadline = time.monotonic() + 2
+    while pending_after_callbacks(app) and time.monotonic() < deadline:
+        app.update()
+
+
+def legacy_burst(app, lines):
+    # What every line used to cost: one status refresh and one text insert callback
+    peak = 0
+    for line in lines:
+        app.after(0, app.update_status_display)
+        app.after(0, lambda: None)
+        peak = max(peak, pending_after_callbacks(app))
+    return peak
+
+
+def scheduled_burst(app, lines):
+    peak = 0
+    for line in lines:
+        app.engine.process_line(line)
+        peak = max(peak, pending_after_callbacks(app))
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--burst', type=int, default=200)
+    args = parser.parse_args()
+
+    for name, path, class_name, sample in APPS:
+        app = load_app(path, class_name)()
+        app.withdraw()
+        drain(app)
+        lines = (sample * (args.burst // len(sample) + 1))[:args.burst]
+
+        legacy_peak = legacy_burst(app, lines)
+        drain(app)
+
+        app.labels.configs = 0
+        start = time.perf_counter()
+        peak = scheduled_burst(app, lines)
+        drain(app)
+        elapsed = time.perf_counter() - start
+        stats = app.renderer.stats()
+
+        print(f"{name}: burst of {len(lines)} lines")
+        print(f"  per-line after(0):  peak queue depth {legacy_peak}")
+        print(f"  RenderScheduler:    peak queue depth {peak}, {stats['renders']} renders, "
+              f"{app.labels.configs} label configs, {elapsed * 1000:.1f} ms")
+        app.destroy()
+
+
+if __name__ == '__main__':
+    main()
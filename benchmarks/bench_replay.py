@@ -0,0 +1,80 @@
+"""Replay throughput: synthetic captures fed through the engine at max speed.
+
+Records a log for each monitor to a capture file (one line every 100 ms of
+recorded time), then replays it through ReplaySerial and MonitorEngine as
+fast as the parser goes, and once more at --speed to check pacing.
+
+    python -m benchmarks.bench_replay --lines 200000 --speed 1000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_classifier import build_log, smart_home_lines, pet_feeder_lines
+from monitor_core.capture import CaptureWriter, ReplaySerial
+from monitor_core.engine import MonitorEngine
+
+LINE_INTERVAL_NS = 100_000_000
+
+
+def write_capture(path, lines):
+    with CaptureWriter(path) as writer:
+        for i, line in enumerate(lines):
+            writer.write_line(line, offset_ns=i * LINE_INTERVAL_NS)
+
+
+def replay(device, path, speed):
+    engine = MonitorEngine.for_device(device, read_timeout=0.05)
+    count = [0]
+
+    def count_line(line):
+        count[0] += 1
+
+    engine.subscribe_lines(count_line)
+    port = ReplaySerial(path, speed=speed, timeout=0.05)
+    start = time.perf_counter()
+    engine.start(port)
+    while engine.thread.is_alive() and not (port.finished.is_set() and not port.buffer):
+        time.sleep(0.005)
+    engine.stop(timeout=1)
+    elapsed = time.perf_counter() - start
+    port.close()
+    return count[0], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--speed', type=float, default=1000.0)
+    args = parser.parse_args()
+
+    suites = [
+        ('smarthome', build_log(smart_home_lines, args.lines)),
+        ('petfeeder', build_log(pet_feeder_lines, args.lines)),
+    ]
+    recorded = args.lines * LINE_INTERVAL_NS / 1e9
+    scratch = tempfile.mkdtemp(prefix='replaybench-')
+    try:
+        print(f"{args.lines:,} lines, {recorded:,.0f} s recorded")
+        print(f"{'':12}{'capture KB':>12}{'max lines/s':>14}{f'{args.speed:g}x wall':>14}{'expected':>10}")
+        for device, lines in suites:
+            path = os.path.join(scratch, f"{device}.shcap")
+            write_capture(path, lines)
+            fast_count, fast = replay(device, path, None)
+            paced_count, paced = replay(device, path, args.speed)
+            if fast_count != len(lines) or paced_count != len(lines):
+                raise AssertionError(f"{device}: replayed {fast_count}/{paced_count} of {len(lines)} lines")
+            print(f"{device:12}{os.path.getsize(path) / 1024:12,.0f}{fast_count / fast:14,.0f}"
+                  f"{paced:13.2f}s{recorded / args.speed:9.2f}s")
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == '__main__':
+    main()
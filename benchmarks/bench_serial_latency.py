@@ -0,0 +1,82 @@
+"""Measure how long an alarm line takes to reach current_data.
+
+A pty-backed fake ESP32 writes "Fire Detected - Alarm Triggered" and the
+timer stops once the smart home engine's state subscriber sees the flame
+state change. Run from the repository root:
+
+    python -m benchmarks.bench_serial_latency --samples 500
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_esp32 import FakeESP32
+from monitor_core.engine import MonitorEngine, open_serial
+
+ALARM_LINE = "Fire Detected - Alarm Triggered"
+CLEAR_LINE = "| flame: 4095"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--read-timeout', type=float, default=0.5)
+    args = parser.parse_args()
+
+    device = FakeESP32()
+    port = open_serial(device.port_name, 115200)
+    engine = MonitorEngine.for_device('smarthome', read_timeout=args.read_timeout)
+
+    arrived = threading.Event()
+    cleared = threading.Event()
+    stamps = []
+
+    def on_flame(changes):
+        if changes['flame'] == "FIRE DETECTED - ALARM!":
+            stamps.append(time.perf_counter())
+            arrived.set()
+        else:
+            cleared.set()
+
+    engine.state.subscribe(on_flame, keys=['flame'])
+    engine.start(port)
+
+    latencies = []
+    for _ in range(args.samples):
+        arrived.clear()
+        # Let the reader go idle so every sample measures a cold wake-up
+        time.sleep(0.005)
+        start = time.perf_counter()
+        device.write_line(ALARM_LINE)
+        if not arrived.wait(2):
+            print("timed out waiting for alarm line", file=sys.stderr)
+            break
+        latencies.append(stamps[-1] - start)
+        # The store only publishes changes, so the alarm has to be cleared before it can fire again
+        cleared.clear()
+        device.write_line(CLEAR_LINE)
+        cleared.wait(2)
+
+    engine.stop(timeout=args.read_timeout * 2)
+    port.close()
+    device.close()
+
+    if not latencies:
+        return 1
+    latencies.sort()
+    us = [x * 1e6 for x in latencies]
+    print(f"samples: {len(us)}")
+    print(f"p50: {statistics.median(us):8.1f} us")
+    print(f"p99: {us[int(len(us) * 0.99) - 1]:8.1f} us")
+    print(f"max: {us[-1]:8.1f} us")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Fan-out cost of state publishing as the number of subscribers grows.
+
+Runs a smart home log through MonitorEngine.process_line with N trivial
+state subscribers, N = 0, 1, 2, 4, ... --max-subscribers, published three
+ways:
+
+* full state - the old store: every subscriber gets the whole state dict
+  after every line
+* changes    - every subscriber gets the keys the line changed, and is not
+  called when nothing changed
+* keyed      - each subscriber asks for one state key (spread over all of
+  them) and is called only when that key changed
+
+and reports ns per line and subscriber calls per line. It first checks that
+a replica kept up to date from the published changes matches the engine's
+state after every line, and that a keyed subscriber sees exactly the
+changes of its key.
+
+    python -m benchmarks.bench_state --lines 200000 --max-subscribers 64
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_classifier import build_log, smart_home_lines
+from monitor_core.engine import MonitorEngine, StateStore
+
+
+class FullStateStore(StateStore):
+    """The store before change-only publishing: the whole state to everyone, after every line."""
+
+    def publish(self):
+        for callback in self.subscribers:
+            callback(self.data)
+
+
+def counter(calls):
+    def on_state(changes):
+        calls[0] += 1
+    return on_state
+
+
+def build(mode, subscribers):
+    engine = MonitorEngine.for_device('smarthome')
+    if mode == 'full state':
+        engine.state = FullStateStore(engine.parser.initial_state())
+        engine.current_data = engine.state.data
+    keys = list(engine.current_data)
+    calls = [0]
+    for index in range(subscribers):
+        if mode == 'keyed':
+            engine.state.subscribe(counter(calls), keys=[keys[index % len(keys)]])
+        else:
+            engine.state.subscribe(counter(calls))
+    return engine, calls
+
+
+def verify(lines):
+    engine = MonitorEngine.for_device('smarthome')
+    replica = engine.parser.initial_state()
+    engine.state.subscribe(replica.update)
+    seen = {key: [] for key in replica}
+    for key, changes in seen.items():
+        engine.state.subscribe(changes.append, keys=[key])
+    previous = dict(replica)
+    for line in lines:
+        engine.process_line(line)
+        state = engine.current_data
+        if replica != state:
+            raise AssertionError(f"replica diverged after {line!r}")
+        for key, changes in seen.items():
+            expected = [{key: state[key]}] if previous[key] != state[key] else []
+            if changes != expected:
+                raise AssertionError(f"{key} subscriber got {changes} after {line!r}, expected {expected}")
+            del changes[:]
+        previous = dict(state)
+
+
+def run(lines, mode, subscribers):
+    engine, calls = build(mode, subscribers)
+    process_line = engine.process_line
+    start = time.perf_counter()
+    for line in lines:
+        process_line(line)
+    return time.perf_counter() - start, calls[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--max-subscribers', type=int, default=64)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    lines = build_log(smart_home_lines, args.lines)
+    verify(lines[:20000])
+    print(f"{args.lines:,} lines; published changes keep a replica identical to the engine state")
+
+    modes = ('full state', 'changes', 'keyed')
+    counts = [0] + [2 ** power for power in range(args.max_subscribers.bit_length())]
+    print(f"{'subscribers':>11}" + ''.join(f"{mode:>26}" for mode in modes))
+    print(f"{'':>11}" + f"{'ns/line':>14}{'calls/line':>12}" * len(modes))
+    for count in counts:
+        row = f"{count:>11}"
+        for mode in modes:
+            elapsed, calls = min(run(lines, mode, count) for _ in range(args.repeat))
+            row += f"{elapsed * 1e9 / len(lines):14.0f}{calls / len(lines):12.2f}"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Write throughput, disk size and query time: TimeSeriesStore vs naive CSV.
+
+Appends N samples spread over the smart home channels at one reading per
+second per channel, then times a one-hour range query and a one-minute
+downsample of a full day.
+
+    python -m benchmarks.bench_timeseries --samples 1000000
+"""
+import argparse
+import csv
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from monitor_core.parsers import SmartHomeParser
+from monitor_core.timeseries import TimeSeriesStore
+
+SECOND = 1_000_000_000
+
+
+def disk_usage(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def samples(count, seed=7):
+    rng = random.Random(seed)
+    channels = SmartHomeParser.CHANNELS
+    start = 1_700_000_000 * SECOND
+    for i in range(count):
+        yield channels[i % len(channels)], start + (i // len(channels)) * SECOND, rng.uniform(0, 1000)
+
+
+def bench_store(data, directory):
+    store = TimeSeriesStore(directory)
+    start = time.perf_counter()
+    for channel, ts, value in data:
+        store.append(channel, value, ts)
+    store.flush()
+    write = time.perf_counter() - start
+
+    t0 = data[0][1]
+    start = time.perf_counter()
+    ts, values = store.range('temperature', t0 + 3600 * SECOND, t0 + 7200 * SECOND)
+    query = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store.downsample('temperature', 60 * SECOND, t0, t0 + 86400 * SECOND)
+    down = time.perf_counter() - start
+    store.close()
+    return write, query, down, len(ts)
+
+
+def bench_csv(data, path):
+    start = time.perf_counter()
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        for channel, ts, value in data:
+            writer.writerow((ts, channel, value))
+    write = time.perf_counter() - start
+
+    t0 = data[0][1]
+    lo, hi = t0 + 3600 * SECOND, t0 + 7200 * SECOND
+    start = time.perf_counter()
+    matched = 0
+    with open(path, newline='') as f:
+        for ts, channel, value in csv.reader(f):
+            ts = int(ts)
+            if channel == 'temperature' and lo <= ts < hi:
+                float(value)
+                matched += 1
+    query = time.perf_counter() - start
+    return write, query, matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=1000000)
+    args = parser.parse_args()
+
+    data = list(samples(args.samples))
+    scratch = tempfile.mkdtemp(prefix='tsbench-')
+    try:
+        store_dir = os.path.join(scratch, 'store')
+        csv_path = os.path.join(scratch, 'samples.csv')
+        s_write, s_query, s_down, s_rows = bench_store(data, store_dir)
+        c_write, c_query, c_rows = bench_csv(data, csv_path)
+        per_million = 1_000_000 / args.samples
+
+        print(f"{args.samples:,} samples")
+        print(f"{'':12}{'samples/s':>14}{'MB per 1M':>12}{'1h query':>12}")
+        print(f"{'store':12}{args.samples / s_write:14,.0f}{disk_usage(store_dir) * per_million / 1e6:12.2f}"
+              f"{s_query * 1000:10.2f}ms  ({s_rows} rows, 1-min downsample of a day {s_down * 1000:.1f} ms)")
+        print(f"{'csv':12}{args.samples / c_write:14,.0f}{disk_usage(csv_path) * per_million / 1e6:12.2f}"
+              f"{c_query * 1000:10.2f}ms  ({c_rows} rows)")
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Cost of feeding and reading the trend-chart decimation pyramid.
+
+Loads weeks of one-per-second readings into a MinMaxPyramid and times how
+long it takes to fetch one chart's worth of buckets for each span. The fetch
+cost should stay flat as history grows.
+
+    python -m benchmarks.bench_trends --days 28 --columns 600
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from monitor_core.decimate import MinMaxPyramid, SECOND
+from monitor_core.tkui import TREND_SPANS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=28)
+    parser.add_argument('--columns', type=int, default=600)
+    args = parser.parse_args()
+
+    pyramid = MinMaxPyramid()
+    samples = args.days * 86400
+    start = time.perf_counter()
+    for i in range(samples):
+        pyramid.add(i * SECOND, 25 + 5 * math.sin(i / 3600))
+    ingest = time.perf_counter() - start
+    print(f"ingest: {samples:,} samples at {samples / ingest:,.0f} samples/s")
+
+    for name, span in TREND_SPANS.items():
+        level = pyramid.level_for(span, args.columns)
+        start = time.perf_counter()
+        for _ in range(100):
+            buckets = pyramid.latest(level, args.columns)
+            pyramid.live(level)
+        elapsed = (time.perf_counter() - start) / 100
+        print(f"{name:>8}: level {level}, {len(buckets):4d} buckets, {elapsed * 1e6:7.1f} us per full fetch")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""NumPy batch parsing of sensor lines vs process_data_line and the grammar parser.
+
+Builds a smart home log from bench_classifier's lines plus a golden set of
+awkward ones (fields missing, repeated or out of order, odd numbers, non-ASCII
+text, CRLF endings) and checks, for every line:
+
+* that the vectorized rows equal parse_line(), the per-line reading of
+  process_data_line's patterns, and
+* that process_data_line itself wrote exactly what those rows say: the
+  temperature text that parses to the row's value, the row's gas and flame
+  shown through its display rules, the row's motion and door.
+
+Then times process_data_line, the grammar parser (with an event subscriber,
+which is how it yields numbers), parse_line() over the decoded lines into a
+ROW array (the same output as parse_block(), a line at a time) and
+parse_block() over the same bytes.
+
+    python -m benchmarks.bench_vectorized --lines 1000000
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_classifier import build_log, smart_home_lines
+from benchmarks.bench_grammar import SMART_HOME_EDGES
+from benchmarks.legacy_parsers import smart_home_cascade
+from monitor_core.parsers import SmartHomeParser
+from monitor_core.vectorized import ROW, parse_block, parse_line
+
+GOLDEN = SMART_HOME_EDGES + [
+    "Environment -> Temp: .5°C  Humidity: 5.%  Light: 007.250V",
+    "Environment -> Temp: 123456789012345°C  Humidity: 1234567890123456%  Light: 1.2345678901234567V",
+    "Environment -> Temp:\t\t21.5  Humidity:60  Light: 3",
+    "Environment -> Humidity: 40.00%  Temp: 19.25°C",
+    "Environment -> Temp: abc Temp: 22.5",
+    "Environment -> Temp:  22.5  Light: ٣.5V",
+    "Environment -> Temp: 2٣5  Humidity: 1.2.3%",
+    "Environment -> Temp: 25.50°C  Humidity: 60.00%  Light: 3.25V\r",
+    "Security -> Motion: YES | Door: OPEN | Gas: 501",
+    "Security -> Motion: NO | Motion: YES | Door: CLOSED | Door: OPEN | Gas: 12.5",
+    "Security -> Motion: YES | Door: OPEN |   Gas: 300",
+    "Security -> Motion: YES | Door: OPEN Gas: 300",
+    "Security -> Motion: YES | Door: OPEN | Gas: 1.2.3 | flame: 10",
+    "Security -> Motion: YES | Door: OPEN | Gas: . | flame: 10",
+    "Security -> Gas: 10 | Gas: 20",
+    "Security -> nothing to see",
+    "| flame: 999.99",
+    "| flame: 1000",
+    "| flame:12 | flame: 4000",
+    "|flame: 12",
+    "| flame: 5 and Environment -> Temp: 30",
+    "Environment -> Temp: 30 Security -> Motion: YES | Door: OPEN | Gas: 600 | flame: 700",
+    "",
+    "   ",
+    "Environment ->",
+]
+
+
+class Writes(dict):
+    """A state dict that remembers the first value written to each key since clear_writes()."""
+
+    def __init__(self, initial):
+        super().__init__(initial)
+        self.writes = {}
+
+    def __setitem__(self, key, value):
+        self.writes.setdefault(key, value)
+        super().__setitem__(key, value)
+
+
+def display(value, limit, above, then):
+    if math.isnan(value):
+        return None
+    return then if (value > limit if above else value < limit) else f"Normal ({value:.0f})"
+
+
+def same(a, b):
+    return a == b or (isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b))
+
+
+def verify(lines):
+    rows = parse_block('\n'.join(lines).encode('utf-8'))
+    state = Writes(SmartHomeParser.INITIAL_STATE)
+    index = 0
+    for line in lines:
+        expected = parse_line(line.strip())
+        state.writes = {}
+        try:
+            smart_home_cascade(line.strip(), state)
+        except ValueError:
+            pass  # the engine reports these and moves on
+        if expected is None:
+            continue
+        row = tuple(rows[index].tolist()[1:])
+        index += 1
+        if not all(same(a, b) for a, b in zip(row, expected)):
+            raise AssertionError(f"{line!r}: vectorized {row} vs {expected}")
+        temp, hum, light, gas, flame, motion, door = row
+        writes = state.writes
+        for key, value in (('temperature', temp), ('humidity', hum), ('light', light)):
+            written = writes.get(key)
+            try:
+                parsed = math.nan if written is None else float(written)
+            except ValueError:
+                parsed = math.nan
+            if not same(parsed, value):
+                raise AssertionError(f"{line!r}: {key} written {written!r}, row {value}")
+        checks = (
+            ('motion', {1: "Motion YES", 0: "No Motion", -1: None}[motion]),
+            ('door', {1: "OPEN", 0: "Closed", -1: None}[door]),
+            ('gas', display(gas, 500, True, "GAS LEAK!")),
+            ('flame', display(flame, 1000, False, "FIRE DETECTED!")),
+        )
+        for key, value in checks:
+            if writes.get(key) != value and not (key == 'flame' and value is None and "| status:" in line):
+                raise AssertionError(f"{line!r}: {key} written {writes.get(key)!r}, row says {value!r}")
+    if index != len(rows):
+        raise AssertionError(f"{len(rows)} rows for {index} sensor lines")
+    return rows
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    lines = build_log(smart_home_lines, args.lines)
+    rng = random.Random(9)
+    for line in GOLDEN:
+        for _ in range(max(1, args.lines // 20000)):
+            lines.insert(rng.randrange(len(lines)), line)
+    rows = verify(lines)
+    print(f"{len(lines):,} lines, {len(rows):,} sensor rows: vectorized rows match process_data_line")
+
+    data = '\n'.join(lines).encode('utf-8')
+
+    def cascade():
+        state = dict(SmartHomeParser.INITIAL_STATE)
+        for line in lines:
+            try:
+                smart_home_cascade(line, state)
+            except ValueError:
+                pass
+
+    def grammar():
+        grammar_parser = SmartHomeParser()
+        events = []
+        grammar_parser.subscribe_events(events.append)
+        state = grammar_parser.initial_state()
+        for line in lines:
+            grammar_parser.process(line, state)
+
+    def per_line():
+        rows = [row for row in map(parse_line, data.decode('utf-8').split('\n')) if row is not None]
+        return np.array([(math.nan,) + row for row in rows], ROW)
+
+    results = [
+        ("process_data_line", best_of(args.repeat, cascade)),
+        ("grammar + events", best_of(args.repeat, grammar)),
+        ("parse_line rows", best_of(args.repeat, per_line)),
+        ("parse_block", best_of(args.repeat, lambda: parse_block(data))),
+    ]
+    baseline = results[0][1]
+    for name, elapsed in results:
+        print(f"  {name:18}{len(lines) / elapsed:14,.0f} lines/s  {baseline / elapsed:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
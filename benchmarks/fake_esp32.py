@@ -0,0 +1,77 @@
+"""pty-backed stand-in for an ESP32 board, used by the benchmarks."""
+import os
+import tty
+
+SMART_HOME_LINES = [
+    "Firebase.ready(): true",
+    "Environment -> Temp: 25.50°C  Humidity: 60.00%  Light: 3.25V",
+    "[OK] environment/temperature = 25.50",
+    "[OK] environment/humidity = 60.00",
+    "[OK] environment/lightLevel = 3.25",
+    "Security -> Motion: NO | Door: CLOSED | Gas: 450",
+    "| flame: 2400",
+    "| status: norm",
+    "[OK] security/motion = 0",
+    "[OK] security/doorStatus = 0",
+    "[OK] security/gasLeak = 0",
+    "[OK] security/fire = 0",
+]
+
+PET_FEEDER_LINES = [
+    "Firebase.ready(): true",
+    "Food container distance: 8 cm",
+    "Food level OK",
+    "IR Sensor: 1",
+    "Food Present: Yes",
+    "RFID Detected: 04:A3:1B:22",
+    "Authorized: Opening Servo 1",
+    "[OK] /petFeeder/lastAccess = 07:02:11",
+    "Relay: OFF",
+    "7 AM: Fed",
+]
+
+
+class FakeESP32:
+    """Opens a pseudo-terminal pair; the slave end looks like a USB serial port.
+
+    With ``link``, the port is also reachable under that fixed path, which
+    survives ``unplug()`` / ``replug()`` the way /dev/ttyUSB0 does when a
+    board's cable is pulled and reconnected.
+    """
+
+    def __init__(self, link=None):
+        self.link = link
+        self.plug()
+
+    def plug(self):
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.port_name = os.ttyname(self.slave_fd)
+        if self.link is not None:
+            os.symlink(self.port_name, self.link)
+            self.port_name = self.link
+
+    def unplug(self):
+        """Close the pty: open handles start failing with EIO and the link disappears."""
+        if self.link is not None and os.path.lexists(self.link):
+            os.remove(self.link)
+        self.close()
+
+    def replug(self):
+        self.plug()
+
+    def write_line(self, line):
+        os.write(self.master_fd, (line + "\r\n").encode('utf-8'))
+
+    def write_bytes(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(self.master_fd, view)
+            view = view[written:]
+
+    def close(self):
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
@@ -0,0 +1,591 @@
+"""The original substring/regex cascades from process_data_line, and the
+hand-written handler parsers that replaced them before the line grammars.
+
+Kept verbatim (modulo self.current_data -> state, and the handler parsers'
+class names) as the baselines the benchmarks compare the compiled parsers against.
+"""
+import re
+import time
+
+from monitor_core.events import (EnvironmentReading, SecurityReading, FlameReading, FoodLevelReading,
+                                 RfidEvent, FeedEvent, ServoEvent)
+from monitor_core.grammar import trie_pattern, parse_float, now_hms
+
+
+def smart_home_cascade(line, state):
+    # WiFi Status
+    if "Connected to WiFi" in line:
+        state['wifi_status'] = "Connected"
+    elif "Failed to connect to WiFi" in line:
+        state['wifi_status'] = "Failed"
+
+    # Firebase Status
+    if "Firebase.ready(): true" in line:
+        state['firebase_status'] = "Ready"
+    elif "Firebase.ready(): false" in line:
+        state['firebase_status'] = "Not Ready"
+    elif "Firebase signup OK" in line:
+        state['firebase_status'] = "Connected"
+
+    # Environmental data - matches: "Environment -> Temp: 25.50°C  Humidity: 60.00%  Light: 3.25V"
+    if "Environment ->" in line:
+        temp_match = re.search(r"Temp:\s*([\d.]+)", line)
+        hum_match = re.search(r"Humidity:\s*([\d.]+)", line)
+        light_match = re.search(r"Light:\s*([\d.]+)", line)
+        
+        if temp_match:
+            state['temperature'] = temp_match.group(1)
+        if hum_match:
+            state['humidity'] = hum_match.group(1)
+        if light_match:
+            state['light'] = light_match.group(1)
+
+    # Security data - NEW PARSING LOGIC
+    # Matches: "Security -> Motion: YES | Door: OPEN | Gas: 450"
+    if "Security ->" in line:
+        # Motion - look for "Motion: YES" or "Motion: NO"
+        if "Motion: YES" in line:
+            state['motion'] = "Motion YES"
+        elif "Motion: NO" in line:
+            state['motion'] = "No Motion"
+
+        # Door - look for "Door: OPEN" or "Door: CLOSED"
+        if "Door: OPEN" in line:
+            state['door'] = "OPEN"
+        elif "Door: CLOSED" in line:
+            state['door'] = "Closed"
+
+        # Gas level - extract numeric value after "Gas: "
+        gas_match = re.search(r"\|\s*Gas:\s*([\d.]+)", line)
+        if gas_match:
+            gas_val = float(gas_match.group(1))
+            if gas_val > 500:
+                state['gas'] = "GAS LEAK!"
+            else:
+                state['gas'] = f"Normal ({gas_val:.0f})"
+
+    # Flame sensor - separate lines
+    # Matches: "| flame: 1234"
+    if "| flame:" in line:
+        flame_match = re.search(r"\|\s*flame:\s*([\d.]+)", line)
+        if flame_match:
+            flame_val = float(flame_match.group(1))
+            if flame_val < 1000:
+                state['flame'] = "FIRE DETECTED!"
+            else:
+                state['flame'] = f"Normal ({flame_val:.0f})"
+
+    # Flame status string
+    # Matches: "| status: Detected" or "| status: norm"
+    if "| status:" in line:
+        if "Detected" in line:
+            state['flame'] = "FIRE DETECTED!"
+        elif "norm" in line:
+            if "FIRE" not in state['flame']:  # Don't override if already detected
+                state['flame'] = "Normal"
+
+    # Alarm triggers
+    if "Door Opened - Alarm Triggered" in line:
+        state['door'] = "OPEN - ALARM!"
+    if "Fire Detected - Alarm Triggered" in line:
+        state['flame'] = "FIRE DETECTED - ALARM!"
+
+
+def pet_feeder_cascade(line, state, clock):
+    # WiFi Status
+    if "Connected to WiFi" in line or "Connected to Wi-Fi" in line:
+        state['wifi_status'] = "Connected"
+    elif "Failed to connect" in line:
+        state['wifi_status'] = "Failed"
+
+    # Firebase Status
+    if "Firebase.ready():" in line:
+        if "true" in line.lower():
+            state['firebase_status'] = "Ready (true)"
+        else:
+            state['firebase_status'] = "Not Ready (false)"
+
+    # RFID Detection
+    if "RFID Detected:" in line:
+        match = re.search(r"RFID Detected:\s*([A-F0-9:]+)", line)
+        if match:
+            state['last_uid'] = match.group(1)
+
+    if "Authorized ID detected" in line or "✅ Authorized" in line:
+        state['access_status'] = "Authorized"
+
+    if "Unauthorized UID" in line or "❌ Unauthorized" in line:
+        state['access_status'] = "Unauthorized"
+        match = re.search(r"([A-F0-9:]+)", line)
+        if match:
+            state['unauthorized_uid'] = match.group(1)
+
+    # Servo Actions
+    if "Opening Servo 1" in line:
+        state['last_access'] = clock()
+
+    if "Scheduled feeding time" in line or "Opening Servo 2" in line:
+        state['last_feed'] = clock()
+
+    # Relay Status
+    if "Relay:" in line:
+        if "ON" in line:
+            state['relay_status'] = "ON"
+        else:
+            state['relay_status'] = "OFF"
+
+    # Food Distance
+    if "Food container distance:" in line or "food container distance:" in line:
+        match = re.search(r"distance:\s*(\d+)\s*cm", line)
+        if match:
+            state['food_distance'] = match.group(1)
+
+    # Food Alert
+    if "Food level low" in line or "Food level Low" in line:
+        state['food_alert'] = "Food level low"
+    elif "Food level OK" in line or "Food Status: Normal" in line:
+        state['food_alert'] = "OK"
+
+    # IR Sensor
+    if "IR Sensor:" in line:
+        match = re.search(r"IR Sensor:\s*(\d+)", line)
+        if match:
+            state['ir_sensor'] = match.group(1)
+
+    if "Food Present:" in line:
+        if "Yes" in line:
+            state['food_present'] = "Yes"
+        else:
+            state['food_present'] = "No"
+
+    # Feeding Schedule
+    if "7 AM:" in line or "7am" in line:
+        if "Fed" in line:
+            state['feeding_7am'] = "✅ Fed"
+        elif "Skipped" in line:
+            state['feeding_7am'] = "⏭️ Skipped"
+
+    if "12 PM:" in line or "12pm" in line:
+        if "Fed" in line:
+            state['feeding_12pm'] = "✅ Fed"
+        elif "Skipped" in line:
+            state['feeding_12pm'] = "⏭️ Skipped"
+
+    if "7 PM:" in line or "7pm" in line:
+        if "Fed" in line:
+            state['feeding_7pm'] = "✅ Fed"
+        elif "Skipped" in line:
+            state['feeding_7pm'] = "⏭️ Skipped"
+
+    # Firebase Debug Messages
+    if "[OK]" in line:
+        # Extract path and value for better tracking
+        if "/petFeeder/lastAccess" in line:
+            match = re.search(r"=\s*(.+)$", line)
+            if match:
+                state['last_access'] = match.group(1).strip()
+        elif "/petFeeder/lastFeed" in line:
+            match = re.search(r"=\s*(.+)$", line)
+            if match:
+                state['last_feed'] = match.group(1).strip()
+
+
+class LineParser:
+    """Single-pass line classifier.
+
+    Subclasses list their markers in RULES as ``(marker, handler_name)`` pairs,
+    in the order the checks should be applied. All markers are compiled into
+    one alternation regex, so a line is scanned once and only the handlers
+    whose marker actually occurs in it are called. When several markers of the
+    same handler occur, the handler runs once with the first-listed marker,
+    which keeps ``if/elif`` priorities inside a group intact.
+    """
+
+    RULES = ()
+    INITIAL_STATE = {}
+    # Numeric channels this parser reports through emit_sample()
+    CHANNELS = ()
+
+    def __init__(self):
+        self.sample_subscribers = []
+        self.event_subscribers = []
+        self.dispatch = {}
+        for order, (marker, handler_name) in enumerate(self.RULES):
+            self.dispatch[marker] = (order, handler_name, getattr(self, handler_name))
+        self.handlers = {marker: entry[2] for marker, entry in self.dispatch.items()}
+        self.pattern = re.compile(trie_pattern(self.dispatch))
+        self.findall = self.pattern.findall
+
+    def initial_state(self):
+        return dict(self.INITIAL_STATE)
+
+    def subscribe_samples(self, callback):
+        """Receive ``callback(channel, value)`` for every numeric reading parsed."""
+        self.sample_subscribers.append(callback)
+
+    def emit_sample(self, channel, value):
+        for callback in self.sample_subscribers:
+            callback(channel, value)
+
+    def subscribe_events(self, callback):
+        """Receive ``callback(event)`` for every typed event (see monitor_core.events)."""
+        self.event_subscribers.append(callback)
+
+    def emit_event(self, event):
+        for callback in self.event_subscribers:
+            callback(event)
+
+    def emit_number(self, channel, text):
+        try:
+            value = float(text)
+        except ValueError:
+            return  # e.g. "1.2.3" still matches [\d.]+
+        self.emit_sample(channel, value)
+
+    def process(self, line, state):
+        """Apply every matching handler to state; return False if nothing matched."""
+        found = self.findall(line)
+        if not found:
+            return False
+
+        if len(found) == 1:
+            # Fast path: nearly every firmware line carries exactly one marker
+            marker = found[0]
+            self.handlers[marker](line, state, marker)
+            return True
+
+        selected = {}
+        for marker in found:
+            order, name, handler = self.dispatch[marker]
+            if name not in selected or order < selected[name][0]:
+                selected[name] = (order, handler, marker)
+        for order, handler, marker in sorted(selected.values(), key=lambda item: item[0]):
+            handler(line, state, marker)
+        return True
+
+
+TEMP_RE = re.compile(r"Temp:\s*([\d.]+)")
+HUMIDITY_RE = re.compile(r"Humidity:\s*([\d.]+)")
+LIGHT_RE = re.compile(r"Light:\s*([\d.]+)")
+GAS_RE = re.compile(r"\|\s*Gas:\s*([\d.]+)")
+FLAME_RE = re.compile(r"\|\s*flame:\s*([\d.]+)")
+
+# Exact firmware layouts, tried first so the common case costs one regex call
+ENVIRONMENT_LINE_RE = re.compile(r"Environment -> Temp:\s*([\d.]+)\S*\s+Humidity:\s*([\d.]+)\S*\s+Light:\s*([\d.]+)")
+SECURITY_LINE_RE = re.compile(r"Security -> Motion: (YES|NO) \| Door: (OPEN|CLOSED) \| Gas:\s*([\d.]+)")
+MOTION_STATES = {'YES': "Motion YES", 'NO': "No Motion"}
+DOOR_STATES = {'OPEN': "OPEN", 'CLOSED': "Closed"}
+
+
+class SmartHomeHandlerParser(LineParser):
+    DEVICE = 'smarthome'
+    CHANNELS = ('temperature', 'humidity', 'light', 'gas', 'flame')
+    INITIAL_STATE = {
+        'temperature': '--',
+        'humidity': '--',
+        'light': '--',
+        'motion': 'No Motion',
+        'door': 'Closed',
+        'gas': 'Normal',
+        'flame': 'Normal',
+        'wifi_status': 'Unknown',
+        'firebase_status': 'Unknown',
+        'last_update': 'Never'
+    }
+    RULES = (
+        ("Connected to WiFi", 'on_wifi'),
+        ("Failed to connect to WiFi", 'on_wifi'),
+        ("Firebase.ready(): true", 'on_firebase'),
+        ("Firebase.ready(): false", 'on_firebase'),
+        ("Firebase signup OK", 'on_firebase'),
+        ("Environment ->", 'on_environment'),
+        ("Security ->", 'on_security'),
+        ("| flame:", 'on_flame'),
+        ("| status:", 'on_flame_status'),
+        ("Door Opened - Alarm Triggered", 'on_door_alarm'),
+        ("Fire Detected - Alarm Triggered", 'on_fire_alarm'),
+    )
+
+    def on_wifi(self, line, state, marker):
+        if marker == "Connected to WiFi":
+            state['wifi_status'] = "Connected"
+        else:
+            state['wifi_status'] = "Failed"
+
+    def on_firebase(self, line, state, marker):
+        if marker == "Firebase.ready(): true":
+            state['firebase_status'] = "Ready"
+        elif marker == "Firebase.ready(): false":
+            state['firebase_status'] = "Not Ready"
+        else:
+            state['firebase_status'] = "Connected"
+
+    # Matches: "Environment -> Temp: 25.50°C  Humidity: 60.00%  Light: 3.25V"
+    def on_environment(self, line, state, marker):
+        full = ENVIRONMENT_LINE_RE.match(line)
+        if full:
+            values = full.groups()
+        else:
+            values = [match.group(1) if match else None
+                      for match in (TEMP_RE.search(line), HUMIDITY_RE.search(line), LIGHT_RE.search(line))]
+
+        for key, value in zip(('temperature', 'humidity', 'light'), values):
+            if value is not None:
+                state[key] = value
+                if self.sample_subscribers:
+                    self.emit_number(key, value)
+        if self.event_subscribers:
+            self.emit_event(EnvironmentReading(time.time(), *[parse_float(value) for value in values]))
+
+    # Matches: "Security -> Motion: YES | Door: OPEN | Gas: 450"
+    def on_security(self, line, state, marker):
+        full = SECURITY_LINE_RE.match(line)
+        if full:
+            motion, door, gas = full.groups()
+            state['motion'] = MOTION_STATES[motion]
+            state['door'] = DOOR_STATES[door]
+            gas = float(gas)
+            self.set_gas(state, gas)
+            if self.event_subscribers:
+                self.emit_event(SecurityReading(time.time(), motion == 'YES', door == 'OPEN', gas))
+            return
+
+        motion = door_open = gas = None
+        if "Motion: YES" in line:
+            state['motion'] = "Motion YES"
+            motion = True
+        elif "Motion: NO" in line:
+            state['motion'] = "No Motion"
+            motion = False
+
+        if "Door: OPEN" in line:
+            state['door'] = "OPEN"
+            door_open = True
+        elif "Door: CLOSED" in line:
+            state['door'] = "Closed"
+            door_open = False
+
+        gas_match = GAS_RE.search(line)
+        if gas_match:
+            gas = float(gas_match.group(1))
+            self.set_gas(state, gas)
+        if self.event_subscribers:
+            self.emit_event(SecurityReading(time.time(), motion, door_open, gas))
+
+    def set_gas(self, state, gas_val):
+        if self.sample_subscribers:
+            self.emit_sample('gas', gas_val)
+        if gas_val > 500:
+            state['gas'] = "GAS LEAK!"
+        else:
+            state['gas'] = f"Normal ({gas_val:.0f})"
+
+    # Matches: "| flame: 1234"
+    def on_flame(self, line, state, marker):
+        flame_match = FLAME_RE.search(line)
+        if flame_match:
+            flame_val = float(flame_match.group(1))
+            if self.sample_subscribers:
+                self.emit_sample('flame', flame_val)
+            if self.event_subscribers:
+                self.emit_event(FlameReading(time.time(), flame_val))
+            if flame_val < 1000:
+                state['flame'] = "FIRE DETECTED!"
+            else:
+                state['flame'] = f"Normal ({flame_val:.0f})"
+
+    # Matches: "| status: Detected" or "| status: norm"
+    def on_flame_status(self, line, state, marker):
+        if "Detected" in line:
+            state['flame'] = "FIRE DETECTED!"
+        elif "norm" in line:
+            if "FIRE" not in state['flame']:  # Don't override if already detected
+                state['flame'] = "Normal"
+
+    def on_door_alarm(self, line, state, marker):
+        state['door'] = "OPEN - ALARM!"
+
+    def on_fire_alarm(self, line, state, marker):
+        state['flame'] = "FIRE DETECTED - ALARM!"
+
+
+RFID_UID_RE = re.compile(r"RFID Detected:\s*([A-F0-9:]+)")
+UNAUTHORIZED_UID_RE = re.compile(r"([A-F0-9:]+)")
+FOOD_DISTANCE_RE = re.compile(r"distance:\s*(\d+)\s*cm")
+IR_SENSOR_RE = re.compile(r"IR Sensor:\s*(\d+)")
+OK_VALUE_RE = re.compile(r"=\s*(.+)$")
+# Stricter than UNAUTHORIZED_UID_RE, which also matches the "D" in "UID"
+CARD_UID_RE = re.compile(r"\b([0-9A-F]{2}(?::[0-9A-F]{2})+)\b")
+
+
+FED = "✅ Fed"
+SKIPPED = "⏭️ Skipped"
+
+
+class PetFeederHandlerParser(LineParser):
+    DEVICE = 'petfeeder'
+    CHANNELS = ('food_distance', 'ir_sensor')
+    INITIAL_STATE = {
+        'food_distance': '--',
+        'food_alert': 'Unknown',
+        'food_present': 'Unknown',
+        'ir_sensor': '--',
+        'relay_status': 'OFF',
+        'last_access': 'Never',
+        'last_feed': 'Never',
+        'last_uid': '--',
+        'access_status': '--',
+        'unauthorized_uid': '--',
+        'feeding_7am': '--',
+        'feeding_12pm': '--',
+        'feeding_7pm': '--',
+        'wifi_status': 'Unknown',
+        'firebase_status': 'Unknown',
+        'last_update': 'Never'
+    }
+    RULES = (
+        ("Connected to WiFi", 'on_wifi'),
+        ("Connected to Wi-Fi", 'on_wifi'),
+        ("Failed to connect", 'on_wifi'),
+        ("Firebase.ready():", 'on_firebase'),
+        ("RFID Detected:", 'on_rfid'),
+        ("Authorized ID detected", 'on_authorized'),
+        ("✅ Authorized", 'on_authorized'),
+        ("Unauthorized UID", 'on_unauthorized'),
+        ("❌ Unauthorized", 'on_unauthorized'),
+        ("Opening Servo 1", 'on_access'),
+        ("Scheduled feeding time", 'on_feed'),
+        ("Opening Servo 2", 'on_feed'),
+        ("Relay:", 'on_relay'),
+        ("Food container distance:", 'on_food_distance'),
+        ("food container distance:", 'on_food_distance'),
+        ("Food level low", 'on_food_alert'),
+        ("Food level Low", 'on_food_alert'),
+        ("Food level OK", 'on_food_alert'),
+        ("Food Status: Normal", 'on_food_alert'),
+        ("IR Sensor:", 'on_ir_sensor'),
+        ("Food Present:", 'on_food_present'),
+        ("7 AM:", 'on_feeding_7am'),
+        ("7am", 'on_feeding_7am'),
+        ("12 PM:", 'on_feeding_12pm'),
+        ("12pm", 'on_feeding_12pm'),
+        ("7 PM:", 'on_feeding_7pm'),
+        ("7pm", 'on_feeding_7pm'),
+        ("[OK]", 'on_firebase_write'),
+    )
+
+    def __init__(self, clock=None):
+        super().__init__()
+        # Returns the "HH:MM:SS" string stamped on servo events
+        self.clock = clock or now_hms
+
+    def on_wifi(self, line, state, marker):
+        if marker == "Failed to connect":
+            state['wifi_status'] = "Failed"
+        else:
+            state['wifi_status'] = "Connected"
+
+    def on_firebase(self, line, state, marker):
+        if "true" in line.lower():
+            state['firebase_status'] = "Ready (true)"
+        else:
+            state['firebase_status'] = "Not Ready (false)"
+
+    def on_rfid(self, line, state, marker):
+        match = RFID_UID_RE.search(line)
+        if match:
+            state['last_uid'] = match.group(1)
+            if self.event_subscribers:
+                self.emit_event(RfidEvent(time.time(), match.group(1), None))
+
+    def on_authorized(self, line, state, marker):
+        state['access_status'] = "Authorized"
+        if self.event_subscribers:
+            self.emit_event(RfidEvent(time.time(), self.card_uid(line, state), True))
+
+    def on_unauthorized(self, line, state, marker):
+        state['access_status'] = "Unauthorized"
+        match = UNAUTHORIZED_UID_RE.search(line)
+        if match:
+            state['unauthorized_uid'] = match.group(1)
+        if self.event_subscribers:
+            self.emit_event(RfidEvent(time.time(), self.card_uid(line, state), False))
+
+    def card_uid(self, line, state):
+        # The decision lines rarely repeat the UID; fall back to the last card scanned
+        match = CARD_UID_RE.search(line)
+        if match:
+            return match.group(1)
+        return None if state['last_uid'] == '--' else state['last_uid']
+
+    def on_access(self, line, state, marker):
+        state['last_access'] = self.clock()
+        if self.event_subscribers:
+            self.emit_event(ServoEvent(time.time(), 1))
+
+    def on_feed(self, line, state, marker):
+        state['last_feed'] = self.clock()
+        # "Scheduled feeding time" only announces the feed; the servo opens on the next line
+        if self.event_subscribers and marker == "Opening Servo 2":
+            self.emit_event(ServoEvent(time.time(), 2))
+
+    def on_relay(self, line, state, marker):
+        state['relay_status'] = "ON" if "ON" in line else "OFF"
+
+    def on_food_distance(self, line, state, marker):
+        match = FOOD_DISTANCE_RE.search(line)
+        if match:
+            state['food_distance'] = match.group(1)
+            if self.sample_subscribers:
+                self.emit_sample('food_distance', float(match.group(1)))
+            if self.event_subscribers:
+                self.emit_event(FoodLevelReading(time.time(), int(match.group(1))))
+
+    def on_food_alert(self, line, state, marker):
+        if marker in ("Food level low", "Food level Low"):
+            state['food_alert'] = "Food level low"
+        else:
+            state['food_alert'] = "OK"
+
+    def on_ir_sensor(self, line, state, marker):
+        match = IR_SENSOR_RE.search(line)
+        if match:
+            state['ir_sensor'] = match.group(1)
+            if self.sample_subscribers:
+                self.emit_sample('ir_sensor', float(match.group(1)))
+
+    def on_food_present(self, line, state, marker):
+        state['food_present'] = "Yes" if "Yes" in line else "No"
+
+    def set_feeding_slot(self, line, state, key):
+        if "Fed" in line:
+            state[key] = FED
+            fed = True
+        elif "Skipped" in line:
+            state[key] = SKIPPED
+            fed = False
+        else:
+            return
+        if self.event_subscribers:
+            self.emit_event(FeedEvent(time.time(), key.partition('_')[2], fed))
+
+    def on_feeding_7am(self, line, state, marker):
+        self.set_feeding_slot(line, state, 'feeding_7am')
+
+    def on_feeding_12pm(self, line, state, marker):
+        self.set_feeding_slot(line, state, 'feeding_12pm')
+
+    def on_feeding_7pm(self, line, state, marker):
+        self.set_feeding_slot(line, state, 'feeding_7pm')
+
+    # Firebase debug messages, e.g. "[OK] /petFeeder/lastFeed = 12:00:03"
+    def on_firebase_write(self, line, state, marker):
+        if "/petFeeder/lastAccess" in line:
+            key = 'last_access'
+        elif "/petFeeder/lastFeed" in line:
+            key = 'last_feed'
+        else:
+            return
+        match = OK_VALUE_RE.search(line)
+        if match:
+            state[key] = match.group(1).strip()
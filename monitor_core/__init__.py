@@ -0,0 +1 @@
+"""Shared serial monitoring core for the Smart Home and Pet Feeder monitors."""
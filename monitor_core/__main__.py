@@ -0,0 +1,5 @@
+import sys
+
+from monitor_core.cli import main
+
+sys.exit(main())
@@ -0,0 +1,195 @@
+"""Append-only journal of RFID access events, kept in SQLite.
+
+Every card scan and every authorized/unauthorized decision becomes one row.
+The parser's event callback only appends to a pending list; a background
+thread inserts the batch in a single transaction every ``window`` seconds,
+or sooner once ``max_batch`` rows are waiting. The database runs in WAL mode
+so queries from the UI never block the writer, and two indexes keep the
+questions the monitor asks cheap at millions of rows:
+
+    access_uid_ts     (uid, ts)              every attempt by one card in a range
+    access_result_ts  (authorized, ts, uid)  e.g. unauthorized attempts per hour
+
+``authorized`` is NULL for a scan, 1 for authorized and 0 for unauthorized.
+
+    log = AccessLog('rfid_access.db').start()
+    parser.subscribe_events(log.event_recorder())
+    log.attempts('A1:B2:C3:D4', *month_bounds())
+"""
+import datetime
+import sqlite3
+import threading
+import time
+
+DEFAULT_WINDOW = 1.0
+DEFAULT_MAX_BATCH = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS access (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    uid TEXT,
+    authorized INTEGER,
+    device TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS access_uid_ts ON access (uid, ts);
+CREATE INDEX IF NOT EXISTS access_result_ts ON access (authorized, ts, uid);
+"""
+
+INSERT = "INSERT INTO access (ts, uid, authorized, device) VALUES (?, ?, ?, ?)"
+
+RESULT_NAMES = {None: "Scan", 1: "Authorized", 0: "Unauthorized"}
+
+
+def connect(path):
+    connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # With WAL, NORMAL only syncs at checkpoints: a power cut can lose the last
+    # batches but never corrupts the journal
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def month_bounds(ts=None):
+    """(start, end) unix times of the local calendar month containing ts."""
+    day = datetime.datetime.fromtimestamp(time.time() if ts is None else ts)
+    start = day.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start.timestamp(), end.timestamp()
+
+
+class AccessLog:
+    def __init__(self, path, window=DEFAULT_WINDOW, max_batch=DEFAULT_MAX_BATCH):
+        self.path = path
+        self.window = window
+        self.max_batch = max_batch
+        self.lock = threading.Lock()
+        self.pending = []
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread = None
+        self.error_subscribers = []
+        self.recorded = 0
+        self.inserted = 0
+        self.flushes = 0
+
+        # One connection for the flusher and one for queries, each behind its own lock
+        self.write_lock = threading.Lock()
+        self.writer = connect(path)
+        self.writer.executescript(SCHEMA)
+        self.read_lock = threading.Lock()
+        self.reader = connect(path)
+
+    def subscribe_errors(self, callback):
+        self.error_subscribers.append(callback)
+
+    def record(self, ts, uid, authorized, device=''):
+        row = (ts, uid, None if authorized is None else int(authorized), device)
+        with self.lock:
+            self.pending.append(row)
+            self.recorded += 1
+            full = len(self.pending) == self.max_batch
+        if full:
+            self.wakeup.set()
+
+    def event_recorder(self, device=''):
+        """A parser event callback that journals every RfidEvent, tagged with device."""
+        def record(event):
+            if event.kind == 'rfid':
+                self.record(event.ts, event.uid, event.authorized, device)
+        return record
+
+    def flush(self):
+        with self.lock:
+            rows = self.pending
+            if not rows:
+                return 0
+            self.pending = []
+        try:
+            with self.write_lock:
+                self.writer.execute("BEGIN")
+                try:
+                    self.writer.executemany(INSERT, rows)
+                    self.writer.execute("COMMIT")
+                except BaseException:
+                    self.writer.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            # Keep the batch, ahead of anything recorded since, for the next flush
+            with self.lock:
+                self.pending[:0] = rows
+            for callback in self.error_subscribers:
+                callback(f"Access log write failed: {e}")
+            return 0
+        self.inserted += len(rows)
+        self.flushes += 1
+        return len(rows)
+
+    def run(self):
+        while self.running:
+            self.wakeup.wait(self.window)
+            self.wakeup.clear()
+            self.flush()
+        self.flush()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self.running = False
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def close(self):
+        self.stop()
+        self.flush()
+        with self.write_lock:
+            self.writer.close()
+        with self.read_lock:
+            self.reader.close()
+
+    def query(self, sql, params=()):
+        with self.read_lock:
+            return self.reader.execute(sql, params).fetchall()
+
+    def count(self):
+        return self.query("SELECT COUNT(*) FROM access")[0][0]
+
+    def attempts(self, uid, start=None, end=None, limit=None):
+        """[(ts, authorized, device), ...] for one card, oldest first."""
+        sql = "SELECT ts, authorized, device FROM access WHERE uid = ? AND ts >= ? AND ts < ? ORDER BY ts"
+        params = [uid, float('-inf') if start is None else start, float('inf') if end is None else end]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.query(sql, params)
+
+    def per_hour(self, authorized=0, start=None, end=None):
+        """[(hour_start, count), ...] of attempts with this result, in local clock hours."""
+        start = float('-inf') if start is None else start
+        end = float('inf') if end is None else end
+        # Buckets are aligned to local hours, which matters for half-hour UTC offsets
+        offset = time.localtime(time.time() if start == float('-inf') else start).tm_gmtoff
+        rows = self.query(
+            "SELECT CAST((ts + ?) / 3600 AS INTEGER), COUNT(*) FROM access"
+            " WHERE authorized = ? AND ts >= ? AND ts < ? GROUP BY 1 ORDER BY 1",
+            (offset, authorized, start, end))
+        return [(hour * 3600 - offset, count) for hour, count in rows]
+
+    def unauthorized_per_hour(self, start=None, end=None):
+        return self.per_hour(0, start, end)
+
+    def stats(self):
+        return {
+            'recorded': self.recorded,
+            'inserted': self.inserted,
+            'flushes': self.flushes,
+            'pending': len(self.pending),
+        }
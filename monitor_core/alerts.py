@@ -0,0 +1,262 @@
+"""Declarative alert rules evaluated as sensor samples arrive.
+
+Rules are plain dicts, e.g.
+
+    {'name': 'temperature_high', 'channel': 'temperature', 'above': 35, 'hysteresis': 1}
+    {'name': 'food_low', 'channel': 'food_distance', 'above': 15, 'for_seconds': 5}
+    {'name': 'temperature_rising', 'channel': 'temperature', 'rise': 0.1, 'window': 60}
+
+``above``/``below`` fire when the value crosses the threshold and clear only
+once it is back past the threshold by ``hysteresis``, so readings that jitter
+around a limit do not flap. ``for_seconds`` is a debounce: the condition (or
+its clearing) must hold that long before the alert changes state. ``rise`` and
+``fall`` compare the rate of change per second over ``window`` seconds; until
+the samples span ``min_span`` seconds (half the window by default) the rate
+reads as 0, so a single step right after startup does not fire. ``near`` is
+an optional level short of the threshold, on the same side, from which a
+reading counts as approaching it.
+
+The rules are the one place thresholds are written down: views colour a
+reading with ``AlertEngine.level(channel, value)`` ('alert', 'near' or 'ok',
+at once and without the debounce), and the parsers take the limits of their
+display text from ``rule_spec()``.
+
+AlertEngine keeps an index from channel to rules, so a sample only touches
+the rules that read its channel. Feed it from ``parser.subscribe_samples``.
+"""
+import time
+from collections import deque
+
+SMART_HOME_RULES = [
+    {'name': 'temperature_high', 'channel': 'temperature', 'above': 35, 'near': 30, 'hysteresis': 1,
+     'severity': 'critical', 'message': "Temperature above 35°C"},
+    {'name': 'humidity_low', 'channel': 'humidity', 'below': 30, 'near': 40, 'hysteresis': 2,
+     'message': "Humidity below 30%"},
+    {'name': 'light_low', 'channel': 'light', 'below': 1, 'near': 2, 'hysteresis': 0.2,
+     'message': "Light level below 1V"},
+    {'name': 'gas_leak', 'channel': 'gas', 'above': 500, 'hysteresis': 25,
+     'severity': 'critical', 'message': "Gas level above 500"},
+    {'name': 'flame', 'channel': 'flame', 'below': 1000, 'hysteresis': 100,
+     'severity': 'critical', 'message': "Flame sensor below 1000"},
+    {'name': 'temperature_rising', 'channel': 'temperature', 'rise': 0.1, 'window': 60,
+     'message': "Temperature rising faster than 6°C/min"},
+]
+
+PET_FEEDER_RULES = [
+    {'name': 'food_low', 'channel': 'food_distance', 'above': 15, 'near': 10, 'hysteresis': 1, 'for_seconds': 5,
+     'message': "Food container distance above 15 cm"},
+]
+
+DEFAULT_RULES = {
+    'smarthome': SMART_HOME_RULES,
+    'petfeeder': PET_FEEDER_RULES,
+}
+
+# How a reading stands against the rules on its channel, from best to worst
+OK = 'ok'
+NEAR = 'near'
+ALERT = 'alert'
+LEVELS = (OK, NEAR, ALERT)
+
+
+def rule_spec(name, device=None):
+    """The built-in rule called name, e.g. to share its threshold; searches every device unless given one."""
+    for rules_device, rules in DEFAULT_RULES.items():
+        if device is None or device == rules_device:
+            for spec in rules:
+                if spec['name'] == name:
+                    return spec
+    raise KeyError(name)
+
+
+class ThresholdRule:
+    def __init__(self, name, channel, above=None, below=None, near=None, hysteresis=0.0, for_seconds=0.0,
+                 severity='warning', message=None):
+        if above is None and below is None:
+            raise ValueError(f"Rule '{name}' needs 'above' or 'below'")
+        if near is not None and above is not None and below is not None:
+            raise ValueError(f"Rule '{name}' has both 'above' and 'below', so 'near' has no side")
+        self.name = name
+        self.channel = channel
+        self.above = above
+        self.below = below
+        self.near = near
+        self.hysteresis = hysteresis
+        self.for_seconds = for_seconds
+        self.severity = severity
+        self.message = message or name
+        self.active = False
+        self.pending_since = None
+        self.last_value = None
+
+    def measure(self, value, ts):
+        return value
+
+    def triggered(self, value):
+        return ((self.above is not None and value > self.above) or
+                (self.below is not None and value < self.below))
+
+    def cleared(self, value):
+        return ((self.above is None or value <= self.above - self.hysteresis) and
+                (self.below is None or value >= self.below + self.hysteresis))
+
+    def level(self, value):
+        """How a reading stands against this rule, at once: ALERT past the threshold, NEAR past ``near``, else OK."""
+        if self.triggered(value):
+            return ALERT
+        near = self.near
+        if near is not None and (value > near if self.above is not None else value < near):
+            return NEAR
+        return OK
+
+    def update(self, value, ts):
+        """Feed one sample; returns True when the alert fires, False when it clears, None otherwise."""
+        value = self.measure(value, ts)
+        self.last_value = value
+        changing = self.cleared(value) if self.active else self.triggered(value)
+        if not changing:
+            self.pending_since = None
+            return None
+        if self.for_seconds:
+            if self.pending_since is None:
+                self.pending_since = ts
+            if ts - self.pending_since < self.for_seconds:
+                return None
+            self.pending_since = None
+        self.active = not self.active
+        return self.active
+
+
+class RateRule(ThresholdRule):
+    """Fires on the rate of change (units per second) over a sliding window."""
+
+    def __init__(self, name, channel, rise=None, fall=None, window=60.0, min_span=None, **options):
+        super().__init__(name, channel, above=rise, below=None if fall is None else -fall, **options)
+        self.window = window
+        self.min_span = window / 2 if min_span is None else min_span
+        self.samples = deque()
+
+    def measure(self, value, ts):
+        samples = self.samples
+        samples.append((ts, value))
+        while ts - samples[0][0] > self.window:
+            samples.popleft()
+        first_ts, first_value = samples[0]
+        # Two samples a second apart are no measure of a trend over a minute
+        if ts <= first_ts or ts - first_ts < self.min_span:
+            return 0.0
+        return (value - first_value) / (ts - first_ts)
+
+    def level(self, value):
+        # A single reading says nothing about its rate of change
+        return None
+
+
+def build_rule(spec, prefix=''):
+    """Build a rule from its dict spec; prefix namespaces name and channel, e.g. per device."""
+    options = dict(spec)
+    name = prefix + options.pop('name')
+    channel = prefix + options.pop('channel')
+    if 'rise' in options or 'fall' in options:
+        return RateRule(name, channel, **options)
+    return ThresholdRule(name, channel, **options)
+
+
+class AlertEngine:
+    """Evaluates rules incrementally and notifies subscribers when an alert fires or clears.
+
+    Subscribers receive a dict: name, channel, active, value, severity, message, ts.
+    """
+
+    def __init__(self, rules=(), clock=time.monotonic):
+        self.clock = clock
+        self.rules = {}
+        # channel -> rules reading it; the only rules a sample can affect
+        self.index = {}
+        self.subscribers = []
+        self.active = {}
+        self.evaluations = 0
+
+    @classmethod
+    def for_device(cls, device, prefix='', **options):
+        engine = cls(**options)
+        engine.add_rules(DEFAULT_RULES.get(device, ()), prefix)
+        return engine
+
+    def add_rules(self, specs, prefix=''):
+        for spec in specs:
+            self.add_rule(build_rule(spec, prefix))
+
+    def add_rule(self, rule):
+        if rule.name in self.rules:
+            raise ValueError(f"Rule '{rule.name}' is already registered")
+        self.rules[rule.name] = rule
+        self.index.setdefault(rule.channel, []).append(rule)
+        return rule
+
+    def remove_rule(self, name):
+        rule = self.rules.pop(name)
+        rules = self.index[rule.channel]
+        rules.remove(rule)
+        if not rules:
+            del self.index[rule.channel]
+        self.active.pop(name, None)
+        return rule
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def is_active(self, name):
+        return name in self.active
+
+    def level(self, channel, value):
+        """The worst LEVELS entry value reaches on the rules reading channel, or None without a value or a rule.
+
+        Only reads the rules' limits, so a view may call it from its own thread.
+        """
+        if value is None:
+            return None
+        worst = None
+        for rule in self.index.get(channel, ()):
+            level = rule.level(value)
+            if level is not None and (worst is None or LEVELS.index(level) > LEVELS.index(worst)):
+                worst = level
+        return worst
+
+    def feed(self, channel, value, ts=None):
+        rules = self.index.get(channel)
+        if not rules:
+            return
+        if ts is None:
+            ts = self.clock()
+        self.evaluations += len(rules)
+        for rule in rules:
+            changed = rule.update(value, ts)
+            if changed is not None:
+                self.notify(rule, changed, value, ts)
+
+    def notify(self, rule, active, value, ts):
+        event = {
+            'name': rule.name,
+            'channel': rule.channel,
+            'active': active,
+            'value': value,
+            'severity': rule.severity,
+            'message': rule.message,
+            'ts': ts,
+        }
+        if active:
+            self.active[rule.name] = event
+        else:
+            self.active.pop(rule.name, None)
+        for callback in self.subscribers:
+            callback(event)
+
+    def feeder(self, prefix=''):
+        """A parser sample callback that feeds this engine, with channels namespaced by prefix."""
+        if not prefix:
+            return self.feed
+
+        def feed(channel, value):
+            self.feed(prefix + channel, value)
+        return feed
@@ -0,0 +1,364 @@
+"""Batch analysis of recorded serial logs, spread over every core.
+
+    python -m monitor_core.analyze logs/site-a/ --device smarthome
+    python -m monitor_core.analyze feeder-*.log.gz --device auto --per-file --json
+
+Reads plain text logs (one firmware line per line), gzip-compressed logs
+(.gz) and --record captures (.shcap); directories are searched recursively.
+Every line goes through the same grammar parser as in the monitors, and the
+samples it emits are aggregated per channel (count, min, mean, max) and
+counted against the device's alert rules (or --rules FILE): ``over`` is the
+number of readings past a rule's threshold, ``fires`` the number of times the
+alert would have fired. The logs carry no wall-clock time, so ``for_seconds``
+debounces are not applied and rate-of-change rules are left out.
+
+Plain files are cut into --chunk-mb byte ranges; a range owns every line that
+starts inside it, so each line is parsed exactly once. Gzip streams and
+captures cannot be entered in the middle and are one task each. Tasks run on
+a ProcessPoolExecutor and their partial results are merged in file order.
+A chunk cannot know whether an alert was active when it begins, so it
+follows both possibilities until a reading settles it; the merge then picks
+the right one, and the counts match a single sequential pass.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from monitor_core.alerts import DEFAULT_RULES, RateRule, build_rule
+from monitor_core.capture import read_capture
+from monitor_core.grammar import REGISTRY, detect_device, load_grammar, parser_class, register
+from monitor_core.parsers import AUTO
+
+DEFAULT_CHUNK_MB = 64
+BLOCK_SIZE = 1 << 22
+# Bytes read from the start of a file to find its boot banner with --device auto
+SNIFF_BYTES = 1 << 16
+CAPTURE_SUFFIX = '.shcap'
+
+
+def is_split(path):
+    return not path.endswith(('.gz', CAPTURE_SUFFIX))
+
+
+def split_lines(data):
+    """The non-blank lines of a block of bytes, decoded and stripped like the serial reader does."""
+    return [line.strip() for line in data.decode('utf-8', errors='replace').split('\n') if line and not line.isspace()]
+
+
+def read_range(f, start, stop):
+    """Yield batches of the lines that start in the byte range [start, stop) of f."""
+    if start:
+        # Whatever line was begun before start belongs to the previous range
+        f.seek(start - 1)
+        f.readline()
+    position = f.tell()
+    tail = b''
+    while position < stop:
+        block = f.read(min(BLOCK_SIZE, stop - position))
+        if not block:
+            break
+        position += len(block)
+        if position >= stop:
+            data = tail + block
+            # The line running over the end of the range is still ours; one that ends exactly at
+            # stop is complete, and the line after it belongs to the next range
+            if not data.endswith(b'\n'):
+                data += f.readline()
+            yield split_lines(data)
+            return
+        data = tail + block
+        cut = data.rfind(b'\n') + 1
+        tail = data[cut:]
+        if cut:
+            yield split_lines(data[:cut])
+    if tail:
+        yield split_lines(tail)
+
+
+def read_lines(path, start=0, stop=None):
+    """Yield batches of lines from a plain log's byte range, a gzip log or a capture."""
+    if path.endswith(CAPTURE_SUFFIX):
+        batch = []
+        for offset_ns, line in read_capture(path):
+            line = line.strip()
+            if line:
+                batch.append(line)
+                if len(batch) >= 65536:
+                    yield batch
+                    batch = []
+        yield batch
+    elif path.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            yield from read_range(f, 0, float('inf'))
+    else:
+        with open(path, 'rb') as f:
+            yield from read_range(f, start, os.path.getsize(path) if stop is None else stop)
+
+
+def sniff_device(path):
+    """The registered device whose boot banner appears near the start of path, or None."""
+    read = 0
+    for batch in read_lines(path, 0, SNIFF_BYTES if is_split(path) else None):
+        for line in batch:
+            device = detect_device(line)
+            if device is not None:
+                return device
+            read += len(line) + 1
+            if read >= SNIFF_BYTES:
+                return None
+    return None
+
+
+class AlertCounter:
+    """Counts an above/below rule's readings past the threshold and its firings within one chunk.
+
+    The alert may be active or not when the chunk begins, so both runs are
+    followed until a reading leaves them in the same state; they agree from
+    there on, and only the first is updated.
+    """
+
+    def __init__(self, rule):
+        self.triggered = rule.triggered
+        self.cleared = rule.cleared
+        self.over = 0
+        self.fires = [0, 0]
+        self.active = [False, True]
+        self.split = True
+        self.fires_at_join = 0
+
+    def update(self, value):
+        triggered = self.triggered(value)
+        if triggered:
+            self.over += 1
+        active = self.active
+        for run in (0, 1) if self.split else (0,):
+            if active[run]:
+                if self.cleared(value):
+                    active[run] = False
+            elif triggered:
+                active[run] = True
+                self.fires[run] += 1
+        if self.split and active[0] == active[1]:
+            self.split = False
+            self.fires_at_join = self.fires[0]
+
+    def summary(self):
+        """(over, (fires, active at the end) when starting inactive, and the same when starting active)."""
+        if self.split:
+            return self.over, (self.fires[0], self.active[0]), (self.fires[1], self.active[1])
+        joined = self.fires[0] - self.fires_at_join
+        return self.over, (self.fires[0], self.active[0]), (self.fires[1] + joined, self.active[0])
+
+
+def rule_specs(rules, device):
+    return DEFAULT_RULES.get(device, ()) if rules is None else rules
+
+
+def register_grammars(paths):
+    for path in paths:
+        register(parser_class(load_grammar(path)))
+
+
+def analyze_chunk(task):
+    """Parse one task's lines; returns its partial result."""
+    path, start, stop, device, rules = task
+    parser = REGISTRY[device]()
+    channels = {}
+    counters = {}
+    by_channel = {}
+
+    def add_rules(device):
+        for spec in rule_specs(rules, device):
+            rule = build_rule(spec)
+            if isinstance(rule, RateRule) or rule.name in counters:
+                continue
+            counters[rule.name] = counter = AlertCounter(rule)
+            by_channel.setdefault(rule.channel, []).append(counter.update)
+
+    def on_sample(channel, value):
+        entry = channels.get(channel)
+        if entry is None:
+            channels[channel] = [1, value, value, value]
+        else:
+            entry[0] += 1
+            entry[1] += value
+            if value < entry[2]:
+                entry[2] = value
+            elif value > entry[3]:
+                entry[3] = value
+        updates = by_channel.get(channel)
+        if updates:
+            for update in updates:
+                update(value)
+
+    add_rules(device)
+    if device == AUTO:
+        parser.subscribe_device(add_rules)
+    parser.subscribe_samples(on_sample)
+    state = parser.initial_state()
+    process = parser.process
+    lines = matched = 0
+    for batch in read_lines(path, start, stop):
+        lines += len(batch)
+        for line in batch:
+            if process(line, state):
+                matched += 1
+    return {
+        'path': path,
+        'device': parser.device,
+        'bytes': (stop - start) if stop is not None else os.path.getsize(path),
+        'lines': lines,
+        'matched': matched,
+        'channels': channels,
+        'alerts': {name: counter.summary() for name, counter in counters.items()},
+    }
+
+
+def find_logs(paths):
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in os.walk(path):
+                found.extend(os.path.join(directory, name) for name in names)
+        else:
+            found.append(path)
+    return sorted(found)
+
+
+def plan(paths, device, rules, chunk_bytes):
+    """The tasks for paths, in file order and, within a file, in byte order."""
+    tasks = []
+    for path in paths:
+        file_device = device
+        if device == AUTO:
+            # Detect once here so the file's ranges are parsed as that board from their first line
+            file_device = sniff_device(path) or AUTO
+        if is_split(path) and file_device != AUTO:
+            size = os.path.getsize(path)
+            for start in range(0, max(size, 1), chunk_bytes):
+                tasks.append((path, start, min(start + chunk_bytes, size), file_device, rules))
+        else:
+            tasks.append((path, 0, None, file_device, rules))
+    return tasks
+
+
+def merge(results, per_file=False):
+    """Combine partial results, given in task order, per device (or per file)."""
+    groups = {}
+    # Alert state where the previous chunk of the same file ended
+    states = {}
+    for result in results:
+        key = result['path'] if per_file else result['device']
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {'device': result['device'], 'files': set(), 'bytes': 0, 'lines': 0,
+                                   'matched': 0, 'channels': {}, 'alerts': {}}
+        group['files'].add(result['path'])
+        for name in ('bytes', 'lines', 'matched'):
+            group[name] += result[name]
+        for channel, (count, total, low, high) in result['channels'].items():
+            entry = group['channels'].get(channel)
+            if entry is None:
+                group['channels'][channel] = [count, total, low, high]
+            else:
+                entry[0] += count
+                entry[1] += total
+                entry[2] = min(entry[2], low)
+                entry[3] = max(entry[3], high)
+        for name, (over, inactive, active) in result['alerts'].items():
+            was_active = states.get((result['path'], name), False)
+            fires, states[(result['path'], name)] = active if was_active else inactive
+            entry = group['alerts'].setdefault(name, {'over': 0, 'fires': 0})
+            entry['over'] += over
+            entry['fires'] += fires
+
+    report = {}
+    for key, group in groups.items():
+        report[key] = {
+            'device': group['device'],
+            'files': len(group['files']),
+            'bytes': group['bytes'],
+            'lines': group['lines'],
+            'matched': group['matched'],
+            'channels': {channel: {'count': count, 'min': low, 'mean': total / count, 'max': high}
+                         for channel, (count, total, low, high) in sorted(group['channels'].items())},
+            'alerts': dict(sorted(group['alerts'].items())),
+        }
+    return report
+
+
+def analyze(paths, device='smarthome', rules=None, jobs=None, chunk_bytes=DEFAULT_CHUNK_MB << 20,
+            per_file=False, grammars=()):
+    """Analyze the logs under paths on jobs processes (default: one per core); returns the merged report."""
+    tasks = plan(find_logs(paths), device, rules, chunk_bytes)
+    if jobs == 1:
+        results = [analyze_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(jobs, initializer=register_grammars, initargs=(tuple(grammars),)) as pool:
+            results = list(pool.map(analyze_chunk, tasks))
+    return merge(results, per_file)
+
+
+def print_report(report, elapsed, jobs):
+    for key, group in report.items():
+        parsed = group['matched'] / group['lines'] * 100 if group['lines'] else 0.0
+        print(f"{key}: {group['files']} files, {group['lines']:,} lines ({parsed:.1f}% parsed), "
+              f"{group['bytes'] / 1e6:,.1f} MB")
+        if group['channels']:
+            print(f"  {'channel':16}{'count':>12}{'min':>10}{'mean':>10}{'max':>10}")
+            for channel, stats in group['channels'].items():
+                print(f"  {channel:16}{stats['count']:12,}{stats['min']:10.2f}{stats['mean']:10.2f}{stats['max']:10.2f}")
+        if group['alerts']:
+            print(f"  {'alert':24}{'over':>12}{'fires':>10}")
+            for name, counts in group['alerts'].items():
+                print(f"  {name:24}{counts['over']:12,}{counts['fires']:10,}")
+    total = sum(group['bytes'] for group in report.values())
+    print(f"{total / 1e6:,.1f} MB in {elapsed:.2f} s ({total / 1e6 / elapsed:,.1f} MB/s, --jobs {jobs})",
+          file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='monitor_core.analyze', description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+', metavar='PATH', help="log files, captures or directories")
+    parser.add_argument('--device', default='smarthome',
+                        help=f"board type of the logs, or '{AUTO}' to read it from each file's boot banner")
+    parser.add_argument('--grammar', action='append', metavar='FILE', default=[],
+                        help="JSON (or YAML) line grammar for another board type (repeatable)")
+    parser.add_argument('--rules', metavar='FILE', help="JSON list of alert rules to count instead of the built-in ones")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="worker processes (default: one per core)")
+    parser.add_argument('--chunk-mb', type=int, default=DEFAULT_CHUNK_MB,
+                        help="size of the byte ranges plain logs are split into")
+    parser.add_argument('--per-file', action='store_true', help="report every file separately")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        register_grammars(args.grammar)
+    except Exception as e:
+        print(f"error: could not load grammar: {e}", file=sys.stderr)
+        return 2
+    if args.device not in REGISTRY:
+        print(f"error: unknown --device '{args.device}', expected one of {sorted(REGISTRY)}", file=sys.stderr)
+        return 2
+    rules = None
+    if args.rules:
+        with open(args.rules, encoding='utf-8') as f:
+            rules = json.load(f)
+
+    started = time.perf_counter()
+    report = analyze(args.paths, args.device, rules, jobs=args.jobs, chunk_bytes=args.chunk_mb << 20,
+                     per_file=args.per_file, grammars=args.grammar)
+    elapsed = time.perf_counter() - started
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report, elapsed, args.jobs)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+"""Record serial sessions to a file and replay them in place of a real port.
+
+A capture is a gzip stream that starts with MAGIC and then holds one frame
+per line:
+
+    offset_ns  uint64   monotonic nanoseconds since the recording started
+    length     uint32   length of the UTF-8 encoded line
+    line       bytes
+
+ReplaySerial implements the subset of the ``serial.Serial`` interface the
+monitors use (``read``, ``readline``, ``in_waiting``, ``timeout``,
+``is_open``, ``close``), so a capture can be fed through the engine at the
+original pace, N times faster, or as fast as the parser can go.
+"""
+import gzip
+import struct
+import threading
+import time
+
+MAGIC = b'SHCAP1\n'
+FRAME = struct.Struct('<QI')
+
+
+class CaptureWriter:
+    def __init__(self, path, compresslevel=6):
+        self.file = gzip.open(path, 'wb', compresslevel=compresslevel)
+        self.file.write(MAGIC)
+        self.started = time.monotonic_ns()
+        self.lines = 0
+
+    def write_line(self, line, offset_ns=None):
+        data = line.encode('utf-8')
+        if offset_ns is None:
+            offset_ns = time.monotonic_ns() - self.started
+        self.file.write(FRAME.pack(offset_ns, len(data)))
+        self.file.write(data)
+        self.lines += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_capture(path, block_size=1 << 20):
+    """Yield (offset_ns, line) for every frame in a capture file."""
+    header_size = FRAME.size
+    unpack_from = FRAME.unpack_from
+    with gzip.open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a serial capture")
+        # Frames are sliced out of large decompressed blocks rather than read one by one
+        buffer = b''
+        pos = 0
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            buffer = buffer[pos:] + block
+            pos = 0
+            end = len(buffer)
+            while pos + header_size <= end:
+                offset_ns, length = unpack_from(buffer, pos)
+                start = pos + header_size
+                if start + length > end:
+                    break
+                yield offset_ns, buffer[start:start + length].decode('utf-8', errors='replace')
+                pos = start + length
+
+
+class ReplaySerial:
+    """Serves a capture through a serial.Serial-like interface.
+
+    ``speed`` scales the recorded timing (1.0 = real time, 10.0 = ten times
+    faster); ``None`` releases every line immediately. After the last line
+    ``finished`` is set and reads behave like an idle port: they wait out the
+    timeout and return nothing.
+    """
+
+    def __init__(self, path, speed=1.0, timeout=1):
+        self.path = path
+        self.speed = speed
+        self.timeout = timeout
+        self.is_open = True
+        self.frames = read_capture(path)
+        self.buffer = bytearray()
+        self.next_frame = None
+        self.started = None
+        self.finished = threading.Event()
+        self.lines_served = 0
+
+    def fileno(self):
+        # No descriptor to select on; SerialLineReader falls back to blocking reads
+        raise OSError("replay ports have no file descriptor")
+
+    def release_due(self):
+        """Move every frame whose replay time has come into the buffer."""
+        if self.started is None:
+            self.started = time.monotonic_ns()
+        now = time.monotonic_ns() - self.started
+        while not self.finished.is_set():
+            if self.next_frame is None:
+                self.next_frame = next(self.frames, None)
+                if self.next_frame is None:
+                    self.finished.set()
+                    break
+            offset_ns, line = self.next_frame
+            if self.speed is not None and offset_ns / self.speed > now:
+                return (offset_ns / self.speed - now) / 1e9
+            self.buffer += line.encode('utf-8') + b'\n'
+            self.lines_served += 1
+            self.next_frame = None
+            if self.speed is None and len(self.buffer) >= 65536:
+                break
+        return None
+
+    @property
+    def in_waiting(self):
+        self.release_due()
+        return len(self.buffer)
+
+    def read(self, size=1):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while self.is_open:
+            wait = self.release_due()
+            if self.buffer:
+                data = bytes(self.buffer[:size])
+                del self.buffer[:size]
+                return data
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return b''
+                wait = remaining if wait is None else min(wait, remaining)
+            if wait is None:
+                wait = 0.05
+            time.sleep(wait)
+        return b''
+
+    def readline(self):
+        line = bytearray()
+        while not line.endswith(b'\n'):
+            data = self.read(1)
+            if not data:
+                break
+            line += data
+        return bytes(line)
+
+    def close(self):
+        self.is_open = False
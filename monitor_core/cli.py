@@ -0,0 +1,492 @@
+"""Headless command line front end for the monitoring engine.
+
+    python -m monitor_core --device smarthome --port /dev/ttyUSB0
+    python -m monitor_core --device auto --port /dev/ttyUSB0
+    python -m monitor_core --grammar greenhouse.json --device greenhouse --port /dev/ttyUSB0
+    python -m monitor_core --list-ports
+    python -m monitor_core --hub smarthome:/dev/ttyUSB0 --hub petfeeder:/dev/ttyUSB1
+    python -m monitor_core --port /dev/ttyUSB0 --record session.shcap
+    python -m monitor_core --replay session.shcap --speed max --quiet
+    python -m monitor_core --port /dev/ttyUSB0 --dashboard-port 8080
+    python -m monitor_core --port /dev/ttyUSB0 --journal journal/
+    python -m monitor_core --port /dev/ttyUSB0 --firebase https://<project>.firebaseio.com --firebase-auth TOKEN
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+from monitor_core.alerts import AlertEngine, DEFAULT_RULES
+from monitor_core.engine import MonitorEngine, open_serial, list_serial_ports, DEFAULT_BAUD
+from monitor_core.parsers import PARSERS, AUTO
+from monitor_core.serial_reader import DEFAULT_READ_TIMEOUT
+
+
+def parse_speed(text):
+    if text == 'max':
+        return None
+    speed = float(text)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog='monitor_core', description="Headless ESP32 serial monitor")
+    parser.add_argument('--device', default='smarthome',
+                        help=f"board type whose log format to parse: {', '.join(sorted(PARSERS))}, "
+                             f"or one added with --grammar; '{AUTO}' picks it from the boot banner")
+    parser.add_argument('--grammar', action='append', metavar='FILE', default=[],
+                        help="JSON (or YAML) line grammar for another board type (repeatable)")
+    parser.add_argument('--port', help="serial port, e.g. /dev/ttyUSB0 or COM3")
+    parser.add_argument('--baud', type=int, default=DEFAULT_BAUD)
+    parser.add_argument('--read-timeout', type=float, default=DEFAULT_READ_TIMEOUT,
+                        help="seconds a read may block before re-checking for shutdown")
+    parser.add_argument('--echo', action='store_true', help="print every raw line")
+    parser.add_argument('--list-ports', action='store_true', help="list serial ports and exit")
+    parser.add_argument('--reconnect', action='store_true',
+                        help="keep reopening --port with backoff when the board resets or is unplugged")
+    parser.add_argument('--store', metavar='DIR',
+                        help="append numeric sensor readings to a time-series store in DIR")
+    parser.add_argument('--access-log', metavar='FILE',
+                        help="journal every RFID scan and access decision to a SQLite database")
+    parser.add_argument('--feeding-rollups', metavar='FILE',
+                        help="keep daily and weekly pet feeder rollups in a SQLite database")
+    parser.add_argument('--journal', metavar='DIR',
+                        help="journal every line to DIR and rebuild the state from it on startup")
+    parser.add_argument('--journal-interval', type=float, default=0.05,
+                        help="seconds between the journal's batched fsyncs")
+    parser.add_argument('--record', metavar='FILE', help="record every raw line to a capture file")
+    parser.add_argument('--replay', metavar='FILE', help="read from a capture file instead of a serial port")
+    parser.add_argument('--speed', type=parse_speed, default=1.0,
+                        help="replay speed: 1 for real time, N for N times faster, 'max' for no pacing")
+    parser.add_argument('--quiet', action='store_true', help="do not print state changes or alerts")
+    parser.add_argument('--rules', metavar='FILE',
+                        help="JSON list of alert rules to use instead of the built-in ones")
+    parser.add_argument('--firebase', metavar='URL',
+                        help="upload the boards' Firebase writes from this gateway, batched, to the database at URL")
+    parser.add_argument('--firebase-auth', metavar='TOKEN', help="database secret or ID token for --firebase")
+    parser.add_argument('--firebase-window', type=float, default=1.0,
+                        help="seconds over which writes to the same path are coalesced into one upload")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="serve Prometheus metrics at http://HOST:PORT/metrics")
+    parser.add_argument('--metrics-host', default='127.0.0.1', help="interface for --metrics-port")
+    parser.add_argument('--dashboard-port', type=int, metavar='PORT',
+                        help="serve a live dashboard for any number of browsers at http://HOST:PORT/")
+    parser.add_argument('--dashboard-host', default='127.0.0.1', help="interface for --dashboard-port")
+    parser.add_argument('--profile-stages', action='store_true',
+                        help="time read/queue/parse/apply per line and print p50/p99 per stage on exit")
+    parser.add_argument('--profile', choices=('cprofile', 'sample'),
+                        help="capture a cProfile of the reader thread or sample all threads; report on exit")
+    parser.add_argument('--profile-out', metavar='FILE',
+                        help="where --profile writes its data (default monitor.prof / monitor.collapsed)")
+    parser.add_argument('--hub', action='append', metavar='DEVICE:PORT', default=[],
+                        help="monitor several boards from one process (repeatable)")
+    parser.add_argument('--stats-interval', type=float, default=10.0,
+                        help="seconds between aggregate throughput reports in hub mode")
+    return parser
+
+
+def open_store(args):
+    if not args.store:
+        return None
+    from monitor_core.timeseries import TimeSeriesStore
+    return TimeSeriesStore(args.store)
+
+
+def open_access_log(args):
+    if not args.access_log:
+        return None
+    from monitor_core.accesslog import AccessLog
+    access_log = AccessLog(args.access_log)
+    access_log.subscribe_errors(lambda message: print(message, file=sys.stderr))
+    return access_log.start()
+
+
+def open_feeding_rollups(args):
+    if not args.feeding_rollups:
+        return None
+    from monitor_core.feeding import FeedingRollups
+    rollups = FeedingRollups(args.feeding_rollups)
+    rollups.subscribe_errors(lambda message: print(message, file=sys.stderr))
+    return rollups
+
+
+def open_journal(args, engine, name=None):
+    """Rebuild engine's state from --journal, then journal its lines; one subdirectory per hub port."""
+    if not args.journal:
+        return None
+    from monitor_core.journal import EventJournal
+    from monitor_core.timeseries import safe_channel_name
+    directory = args.journal if name is None else os.path.join(args.journal, safe_channel_name(name))
+    journal = EventJournal(directory, interval=args.journal_interval)
+    journal.subscribe_errors(lambda message: print(message, file=sys.stderr))
+    recovered = journal.recover(engine)
+    if recovered['bytes']:
+        print(f"{name + ': ' if name else ''}state recovered from the journal, {recovered['replayed']} lines "
+              f"replayed in {recovered['seconds'] * 1e3:.0f} ms"
+              + (f", {recovered['truncated']} bytes of torn tail cut off" if recovered['truncated'] else ''),
+              file=sys.stderr)
+    return journal.attach(engine)
+
+
+def open_firebase_sink(args):
+    if not args.firebase:
+        return None
+    from monitor_core.firebase import FirebaseSink, RestBackend
+    sink = FirebaseSink(RestBackend(args.firebase, auth=args.firebase_auth), window=args.firebase_window)
+    sink.subscribe_errors(lambda message: print(message, file=sys.stderr))
+    sink.start()
+    return sink
+
+
+def open_metrics(args):
+    if args.metrics_port is None:
+        return None, None
+    from monitor_core.metrics import MetricsRegistry, MetricsServer
+    registry = MetricsRegistry()
+    server = MetricsServer(registry, args.metrics_host, args.metrics_port).start()
+    print(f"metrics at {server.url}", file=sys.stderr)
+    return registry, server
+
+
+def open_dashboard(args):
+    if args.dashboard_port is None:
+        return None
+    from monitor_core.dashboard import DashboardServer
+    dashboard = DashboardServer(args.dashboard_host, args.dashboard_port).start()
+    print(f"dashboard at {dashboard.url}", file=sys.stderr)
+    return dashboard
+
+
+def start_profile_capture(args, owner, loop_name):
+    """Start the opt-in --profile capture around owner's loop; returns a callback that writes the report."""
+    if args.profile == 'cprofile':
+        import cProfile
+        from monitor_core.profiling import profile_calls, cprofile_report
+        profile = cProfile.Profile()
+        setattr(owner, loop_name, profile_calls(getattr(owner, loop_name), profile))
+
+        def finish():
+            path = args.profile_out or 'monitor.prof'
+            profile.dump_stats(path)
+            print(cprofile_report(profile), file=sys.stderr)
+            print(f"cProfile data written to {path}", file=sys.stderr)
+        return finish
+    if args.profile == 'sample':
+        from monitor_core.profiling import SamplingProfiler, finish_profile
+        sampler = SamplingProfiler().start()
+        return lambda: finish_profile(sampler, args.profile_out or 'monitor.collapsed')
+    return lambda: None
+
+
+def open_stage_profiler(args):
+    if not args.profile_stages:
+        return None
+    from monitor_core.profiling import StageProfiler
+    return StageProfiler()
+
+
+def print_stage_report(profiler):
+    if profiler is not None:
+        print("stage latency:\n" + profiler.report(), file=sys.stderr)
+
+
+def load_grammars(args):
+    """Register the board types of the --grammar files; returns an error message, or None."""
+    from monitor_core.grammar import load_grammar, parser_class, register
+    for path in args.grammar:
+        try:
+            register(parser_class(load_grammar(path)))
+        except Exception as e:
+            return f"error: could not load grammar {path}: {e}"
+    return None
+
+
+def load_rules(args, device_type):
+    if args.rules:
+        with open(args.rules, encoding='utf-8') as f:
+            return json.load(f)
+    return DEFAULT_RULES.get(device_type, ())
+
+
+def rules_on_detection(args, alerts, port_name=None):
+    """For --device auto: add the alert rules of each board type the first time its banner is seen."""
+    added = set()
+
+    def on_device(device):
+        print(f"detected a {device} board" + (f" on {port_name}" if port_name else ""), file=sys.stderr)
+        if device not in added and not args.rules:
+            added.add(device)
+            alerts.add_rules(load_rules(args, device), prefix=port_name + '.' if port_name else '')
+    return on_device
+
+
+def print_alert(event):
+    record = dict(event)
+    record['alert'] = record.pop('name')
+    print(json.dumps(record, ensure_ascii=False), flush=True)
+
+
+def state_printer(state, device=None):
+    """A state subscriber that prints the whole state as JSON whenever a line changed it."""
+    def print_state(changes):
+        # Only emit a snapshot when something other than the timestamp changed
+        if len(changes) > 1 or 'last_update' not in changes:
+            record = {'device': device, **state} if device else state
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+
+    return print_state
+
+
+def wait_for_signal(poll, interval=0.5):
+    """Block until SIGINT/SIGTERM or until poll() returns False."""
+    stopped = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    while not stopped.wait(interval):
+        if not poll():
+            break
+
+
+def run_hub(args):
+    from monitor_core.hub import MonitorHub
+    from monitor_core.timeseries import safe_channel_name
+
+    hub = MonitorHub(read_timeout=args.read_timeout)
+    hub.profiler = open_stage_profiler(args)
+    store = open_store(args)
+    access_log = open_access_log(args)
+    rollups = open_feeding_rollups(args)
+    # One alert engine for the whole fleet; rule names and channels are prefixed per port
+    alerts = AlertEngine()
+    if not args.quiet:
+        alerts.subscribe(print_alert)
+    sink = open_firebase_sink(args)
+    registry, metrics_server = open_metrics(args)
+    dashboard = open_dashboard(args)
+    if registry is not None:
+        registry.gauge('monitor_hub_devices', "Boards currently attached to the hub").labels().set_function(
+            lambda: len(hub.devices))
+    ports = []
+    journals = []
+    for spec in args.hub:
+        device_type, sep, port_name = spec.partition(':')
+        if not sep or device_type not in PARSERS:
+            print(f"error: --hub expects DEVICE:PORT with DEVICE in {sorted(PARSERS)}, got '{spec}'",
+                  file=sys.stderr)
+            return 2
+        try:
+            port = open_serial(port_name, args.baud)
+        except Exception as e:
+            print(f"Could not open serial port {port_name}: {e}", file=sys.stderr)
+            return 1
+        ports.append(port)
+
+        device = hub.add_device(port_name, device_type, port)
+        journal = open_journal(args, device.engine, port_name)
+        if journal is not None:
+            journals.append(journal)
+        if store is not None:
+            store.attach(device.engine, prefix=port_name + '.')
+        if access_log is not None:
+            device.engine.parser.subscribe_events(access_log.event_recorder(device=port_name))
+        if rollups is not None and device_type in ('petfeeder', AUTO):
+            device.engine.parser.subscribe_events(rollups.event_recorder(device=port_name))
+        alerts.add_rules(load_rules(args, device_type), prefix=port_name + '.')
+        if device_type == AUTO:
+            device.engine.parser.subscribe_device(rules_on_detection(args, alerts, port_name))
+        if registry is not None:
+            from monitor_core.metrics import instrument_engine
+            instrument_engine(registry, device.engine, port_name, bytes_read=lambda device=device: device.bytes_read)
+        if sink is not None:
+            device.engine.subscribe_lines(sink.line_writer(prefix='devices/' + safe_channel_name(port_name)))
+        device.engine.parser.subscribe_samples(alerts.feeder(prefix=port_name + '.'))
+        device.engine.subscribe_errors(
+            lambda message, name=port_name: print(f"[{name}] {message}", file=sys.stderr))
+        if dashboard is not None:
+            dashboard.add_engine(device.engine, port_name)
+        if not args.quiet:
+            device.engine.state.subscribe(state_printer(device.engine.current_data, port_name))
+        if args.echo:
+            device.engine.subscribe_lines(lambda line, name=port_name: print(f"[{name}] {line}", flush=True))
+
+    hub.subscribe_disconnects(lambda device: print(f"{device.name} disconnected", file=sys.stderr))
+    finish_capture = start_profile_capture(args, hub, 'run')
+    hub.start()
+
+    next_report = [time.monotonic() + args.stats_interval]
+
+    def report():
+        if time.monotonic() >= next_report[0]:
+            stats = hub.stats()
+            print(f"hub: {stats['devices']} devices, {stats['lines']} lines, "
+                  f"{stats['lines_per_sec']:.1f} lines/s", file=sys.stderr)
+            next_report[0] += args.stats_interval
+        return hub.thread.is_alive()
+
+    try:
+        wait_for_signal(report)
+    finally:
+        hub.stop(timeout=args.read_timeout * 2)
+        for port in ports:
+            port.close()
+        for journal in journals:
+            journal.close()
+        if store is not None:
+            store.close()
+        if access_log is not None:
+            access_log.close()
+        if rollups is not None:
+            rollups.close()
+        if sink is not None:
+            sink.stop(timeout=args.read_timeout * 2)
+        if metrics_server is not None:
+            metrics_server.stop()
+        if dashboard is not None:
+            dashboard.stop(timeout=args.read_timeout * 2)
+        finish_capture()
+        print_stage_report(hub.profiler)
+    return 0
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+
+    if args.list_ports:
+        for name in list_serial_ports():
+            print(name)
+        return 0
+
+    error = load_grammars(args)
+    if error is None and args.device not in PARSERS:
+        error = f"error: unknown --device '{args.device}', expected one of {sorted(PARSERS)}"
+    if error is not None:
+        print(error, file=sys.stderr)
+        return 2
+
+    if args.hub:
+        return run_hub(args)
+
+    if not args.port and not args.replay:
+        print("error: --port or --replay is required", file=sys.stderr)
+        return 2
+
+    engine = MonitorEngine.for_device(args.device, read_timeout=args.read_timeout)
+    engine.profiler = open_stage_profiler(args)
+    # Recovered before anything else subscribes, so every view starts from the recovered state
+    journal = open_journal(args, engine)
+    store = open_store(args)
+    if store is not None:
+        store.attach(engine)
+    access_log = open_access_log(args)
+    if access_log is not None:
+        engine.parser.subscribe_events(access_log.event_recorder())
+    rollups = open_feeding_rollups(args)
+    if rollups is not None:
+        engine.parser.subscribe_events(rollups.event_recorder())
+
+    alerts = AlertEngine()
+    alerts.add_rules(load_rules(args, args.device))
+    if args.device == AUTO:
+        engine.parser.subscribe_device(rules_on_detection(args, alerts))
+    engine.parser.subscribe_samples(alerts.feed)
+    if not args.quiet:
+        engine.state.subscribe(state_printer(engine.current_data))
+        alerts.subscribe(print_alert)
+    engine.subscribe_errors(lambda message: print(message, file=sys.stderr))
+    if args.echo:
+        engine.subscribe_lines(lambda line: print(line, flush=True))
+
+    sink = open_firebase_sink(args)
+    if sink is not None:
+        engine.subscribe_lines(sink.line_writer())
+
+    registry, metrics_server = open_metrics(args)
+    if registry is not None:
+        from monitor_core.metrics import instrument_engine
+        instrument_engine(registry, engine, args.device)
+
+    dashboard = open_dashboard(args)
+    if dashboard is not None:
+        dashboard.add_engine(engine, args.device)
+
+    recorder = None
+    if args.record:
+        from monitor_core.capture import CaptureWriter
+        recorder = CaptureWriter(args.record)
+        engine.subscribe_lines(recorder.write_line)
+
+    lines = [0]
+
+    def count_line(line):
+        lines[0] += 1
+
+    engine.subscribe_lines(count_line)
+
+    port = None
+    manager = None
+    try:
+        if args.replay:
+            from monitor_core.capture import ReplaySerial
+            port = ReplaySerial(args.replay, speed=args.speed)
+        elif args.reconnect:
+            from monitor_core.connection import ConnectionManager, CONNECTING
+            manager = ConnectionManager(engine, args.port, args.baud)
+            manager.subscribe_status(
+                lambda status, message: print(message, file=sys.stderr) if status != CONNECTING else None)
+        else:
+            port = open_serial(args.port, args.baud)
+    except Exception as e:
+        print(f"Could not open serial port: {e}", file=sys.stderr)
+        return 1
+
+    finish_capture = start_profile_capture(args, engine, 'read_loop')
+    started = time.perf_counter()
+    if manager is not None:
+        manager.start()
+    else:
+        engine.start(port)
+    try:
+        if args.replay:
+            # Done once the capture is exhausted and the reader has taken the last bytes
+            wait_for_signal(lambda: engine.thread.is_alive() and not (port.finished.is_set() and not port.buffer),
+                            interval=0.01)
+        elif manager is not None:
+            wait_for_signal(manager.thread.is_alive)
+        else:
+            wait_for_signal(engine.thread.is_alive)
+    finally:
+        if manager is not None:
+            manager.stop(timeout=args.read_timeout * 2)
+        else:
+            engine.stop(timeout=args.read_timeout * 2)
+        elapsed = time.perf_counter() - started
+        if port is not None:
+            port.close()
+        if recorder is not None:
+            recorder.close()
+        if journal is not None:
+            journal.close()
+        if store is not None:
+            store.close()
+        if access_log is not None:
+            access_log.close()
+        if rollups is not None:
+            rollups.close()
+        if sink is not None:
+            sink.stop(timeout=args.read_timeout * 2)
+        if metrics_server is not None:
+            metrics_server.stop()
+        if dashboard is not None:
+            dashboard.stop(timeout=args.read_timeout * 2)
+        finish_capture()
+        print_stage_report(engine.profiler)
+
+    if args.replay:
+        print(f"replayed {lines[0]} lines in {elapsed:.2f} s "
+              f"({lines[0] / elapsed:,.0f} lines/s)", file=sys.stderr)
+    return 0
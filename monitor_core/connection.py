@@ -0,0 +1,211 @@
+"""Keep a MonitorEngine attached to its board across resets, unplugs and replugs.
+
+ConnectionManager owns a thread that opens the port (so a slow open never
+blocks a UI thread), runs the engine's read loop on it and, when the read
+loop returns because the port failed, reopens it with exponential backoff
+until the board is back. After every open it first waits ``settle`` seconds:
+opening the port pulses DTR, which resets an ESP32, and reading before the
+board is back up can lose its first lines. While waiting on POSIX it also stats the device
+node every ``probe_interval``, so a replugged board is reopened within about
+that long rather than at the end of the current backoff.
+
+PortWatcher polls the list of serial ports and reports additions and
+removals, which keeps port pickers current and can ``poke()`` a waiting
+manager.
+
+    manager = ConnectionManager(engine, '/dev/ttyUSB0')
+    manager.subscribe_status(lambda status, message: print(message))
+    manager.start()
+"""
+import os
+import threading
+import time
+
+from monitor_core.engine import DEFAULT_BAUD, open_serial, list_serial_ports
+
+CONNECTING = 'connecting'
+CONNECTED = 'connected'
+DISCONNECTED = 'disconnected'
+STOPPED = 'stopped'
+
+DEFAULT_MIN_BACKOFF = 0.1
+DEFAULT_MAX_BACKOFF = 5.0
+DEFAULT_PROBE_INTERVAL = 0.1
+DEFAULT_SETTLE = 2.0
+# A connection that lasted this long resets the backoff; shorter ones keep growing it
+STABLE_SECONDS = 5.0
+
+
+class ConnectionManager:
+    def __init__(self, engine, port_name, baud=DEFAULT_BAUD, opener=open_serial,
+                 min_backoff=DEFAULT_MIN_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF,
+                 probe_interval=DEFAULT_PROBE_INTERVAL, settle=DEFAULT_SETTLE):
+        self.engine = engine
+        self.port_name = port_name
+        self.baud = baud
+        self.opener = opener
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.probe_interval = probe_interval
+        self.settle = settle
+        # Device nodes like /dev/ttyUSB0 can be probed with a stat; COM3 cannot
+        self.probe_path = port_name if os.path.isabs(port_name) else None
+        self.status = STOPPED
+        self.status_subscribers = []
+        self.running = False
+        self.thread = None
+        self.wakeup = threading.Event()
+        self.attempts = 0
+        self.connects = 0
+        self.lost_at = None
+        self.last_reconnect_seconds = None
+
+    def subscribe_status(self, callback):
+        """Receive ``callback(status, message)`` on the manager thread at every transition."""
+        self.status_subscribers.append(callback)
+
+    def set_status(self, status, message):
+        self.status = status
+        for callback in self.status_subscribers:
+            callback(status, message)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self.running = False
+        self.engine.running = False
+        self.wakeup.set()
+        if self.thread is not None and timeout is not None:
+            self.thread.join(timeout)
+
+    def alive(self):
+        """True until the manager thread has exited; a stopped manager may still be finishing a read."""
+        return self.thread is not None and self.thread.is_alive()
+
+    def poke(self):
+        """Retry now instead of at the end of the current backoff, e.g. on a hot-plug event."""
+        self.wakeup.set()
+
+    def port_present(self):
+        return self.probe_path is not None and os.path.exists(self.probe_path)
+
+    def wait(self, seconds):
+        """Sleep up to seconds; return early when poked or when the device node appears."""
+        deadline = time.monotonic() + seconds
+        present = self.port_present()
+        while self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if self.wakeup.wait(min(remaining, self.probe_interval)):
+                self.wakeup.clear()
+                return
+            if not present and self.port_present():
+                return
+
+    def settle_wait(self):
+        """Sleep ``settle`` seconds after an open; only stop() cuts it short."""
+        deadline = time.monotonic() + self.settle
+        while self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self.wakeup.wait(remaining)
+            self.wakeup.clear()
+
+    def run(self):
+        backoff = self.min_backoff
+        while self.running:
+            self.set_status(CONNECTING, f"Opening {self.port_name}")
+            self.attempts += 1
+            try:
+                port = self.opener(self.port_name, self.baud)
+            except Exception as e:
+                self.set_status(DISCONNECTED, f"Could not open {self.port_name}: {e} (retrying in {backoff:.1f} s)")
+                self.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            self.settle_wait()
+            # stop() clears self.running before engine.running, so checking after setting is race-free
+            self.engine.running = True
+            if not self.running:
+                port.close()
+                break
+            self.connects += 1
+            if self.lost_at is not None:
+                self.last_reconnect_seconds = time.monotonic() - self.lost_at
+                self.lost_at = None
+            self.set_status(CONNECTED, f"Connected to {self.port_name}")
+            connected_at = time.monotonic()
+            self.engine.port = port
+            try:
+                error = self.engine.read_loop(port)
+            finally:
+                try:
+                    port.close()
+                except Exception:
+                    pass
+            if not self.running:
+                break
+            self.lost_at = time.monotonic()
+            self.set_status(DISCONNECTED, f"Lost {self.port_name}: {error} (reconnecting)")
+            if self.lost_at - connected_at >= STABLE_SECONDS:
+                backoff = self.min_backoff
+            elif self.port_present():
+                # Opens but fails straight away: back off rather than spin on a broken port
+                self.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+        self.set_status(STOPPED, f"Stopped reading {self.port_name}")
+
+    def stats(self):
+        return {
+            'status': self.status,
+            'attempts': self.attempts,
+            'connects': self.connects,
+            'last_reconnect_seconds': self.last_reconnect_seconds,
+        }
+
+
+class PortWatcher:
+    """Polls the serial port list every `interval` seconds and reports what changed."""
+
+    def __init__(self, interval=1.0, list_ports=list_serial_ports):
+        self.interval = interval
+        self.list_ports = list_ports
+        self.ports = set()
+        self.subscribers = []
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def subscribe(self, callback):
+        """Receive ``callback(ports, added, removed)`` (sets of names) whenever the list changes."""
+        self.subscribers.append(callback)
+
+    def scan(self):
+        try:
+            current = set(self.list_ports())
+        except Exception:
+            return
+        added = current - self.ports
+        removed = self.ports - current
+        self.ports = current
+        if added or removed:
+            for callback in self.subscribers:
+                callback(current, added, removed)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.scan()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
@@ -0,0 +1,279 @@
+"""Live dashboard in the browser: state changes streamed over Server-Sent Events.
+
+DashboardServer is an asyncio HTTP server on its own thread. ``/`` serves a
+small page that opens an EventSource on ``/events``; that stream starts with
+a snapshot of every device's state and then carries the changes the engines'
+state stores publish, so any number of browsers can watch the boards that
+one gateway reads.
+
+Changes from the reader threads are queued and coalesced on the event loop
+every ``interval`` seconds: each flush is serialized once and the same bytes
+are written to every client, so fan-out costs one buffer append per client.
+A client whose socket stops draining is cut off once ``max_buffer`` bytes
+are queued for it; EventSource reconnects on its own and starts again from a
+snapshot.
+
+    dashboard = DashboardServer(port=8080).start()
+    dashboard.add_engine(engine, 'smarthome')
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+
+DEFAULT_INTERVAL = 0.1
+DEFAULT_MAX_BUFFER = 1 << 20
+KEEPALIVE_SECONDS = 15
+
+SSE_HEADERS = (b"HTTP/1.1 200 OK\r\n"
+               b"Content-Type: text/event-stream\r\n"
+               b"Cache-Control: no-cache\r\n"
+               b"Connection: keep-alive\r\n\r\n"
+               b"retry: 1000\n\n")
+KEEPALIVE = b": keepalive\n\n"
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>ESP32 Monitor</title>
+<style>
+body { font-family: sans-serif; background: #1e1e1e; color: #eee; margin: 2em; }
+.device { display: inline-block; vertical-align: top; margin: 0 2em 2em 0; padding: 1em;
+          background: #2b2b2b; border-radius: 6px; }
+h2 { margin-top: 0; }
+td { padding: 0.2em 1em 0.2em 0; }
+td.value { font-weight: bold; }
+#status { color: #888; }
+</style></head>
+<body>
+<h1>ESP32 Monitor</h1>
+<p id="status">connecting...</p>
+<div id="devices"></div>
+<script>
+const devices = {};
+function show(device, state) {
+  let view = devices[device];
+  if (!view) {
+    const box = document.createElement('div');
+    box.className = 'device';
+    box.innerHTML = '<h2></h2><table></table>';
+    box.querySelector('h2').textContent = device;
+    document.getElementById('devices').appendChild(box);
+    view = devices[device] = {table: box.querySelector('table'), cells: {}};
+  }
+  for (const [key, value] of Object.entries(state)) {
+    let cell = view.cells[key];
+    if (!cell) {
+      const row = view.table.insertRow();
+      row.insertCell().textContent = key.replace(/_/g, ' ');
+      cell = view.cells[key] = row.insertCell();
+      cell.className = 'value';
+    }
+    cell.textContent = value;
+  }
+}
+function apply(event) {
+  for (const [device, state] of Object.entries(JSON.parse(event.data))) show(device, state);
+}
+const source = new EventSource('events');
+source.addEventListener('snapshot', apply);
+source.onmessage = apply;
+source.onopen = () => { document.getElementById('status').textContent = 'live'; };
+source.onerror = () => { document.getElementById('status').textContent = 'reconnecting...'; };
+</script>
+</body></html>
+"""
+
+
+def encode_event(data, event=None):
+    # json.dumps escapes newlines inside strings, so the payload is always a single data line
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    head = f"event: {event}\n" if event else ''
+    return f"{head}data: {text}\n\n".encode('utf-8')
+
+
+def http_response(status, content_type, body):
+    head = (f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+    return head.encode('ascii') + body
+
+
+class DashboardServer:
+    def __init__(self, host='127.0.0.1', port=8080, interval=DEFAULT_INTERVAL, max_buffer=DEFAULT_MAX_BUFFER):
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.max_buffer = max_buffer
+        # device -> state as last broadcast; owned by the event loop once it runs
+        self.states = {}
+        self.snapshot = None
+        # (device, changes) from the reader threads; append and popleft are atomic
+        self.pending = deque()
+        self.flush_scheduled = False
+        # Transports of the connected /events streams
+        self.clients = set()
+        self.updates = 0
+        self.dropped_clients = 0
+        self.loop = None
+        self.server = None
+        self.stopping = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.error = None
+
+    @property
+    def url(self):
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/"
+
+    def add_engine(self, engine, device):
+        """Stream a MonitorEngine's state as ``device``; call before the engine starts reading."""
+        self.states[device] = dict(engine.current_data)
+        self.snapshot = None
+        engine.state.subscribe(self.state_poster(device))
+
+    def state_poster(self, device):
+        """A state subscriber that queues the changes for the next flush; runs on the reader thread."""
+        pending = self.pending
+
+        def post_state(changes):
+            pending.append((device, changes))
+            if not self.flush_scheduled:
+                loop = self.loop
+                if loop is not None and not loop.is_closed():
+                    self.flush_scheduled = True
+                    loop.call_soon_threadsafe(self.schedule_flush)
+        return post_state
+
+    def schedule_flush(self):
+        if self.interval:
+            self.loop.call_later(self.interval, self.flush)
+        else:
+            self.flush()
+
+    def flush(self):
+        # Cleared before draining: a change queued after this is either drained now or schedules another flush
+        self.flush_scheduled = False
+        pending = self.pending
+        update = {}
+        for _ in range(len(pending)):
+            device, changes = pending.popleft()
+            merged = update.get(device)
+            if merged is None:
+                update[device] = dict(changes)
+            else:
+                merged.update(changes)
+        if not update:
+            return
+        states = self.states
+        for device, changes in update.items():
+            states.setdefault(device, {}).update(changes)
+        self.snapshot = None
+        self.updates += 1
+        self.broadcast(encode_event(update))
+
+    def broadcast(self, payload):
+        max_buffer = self.max_buffer
+        for transport in list(self.clients):
+            if transport.is_closing():
+                self.clients.discard(transport)
+            elif transport.get_write_buffer_size() > max_buffer:
+                transport.abort()
+                self.clients.discard(transport)
+                self.dropped_clients += 1
+            else:
+                transport.write(payload)
+
+    def snapshot_event(self):
+        # Cached until the next flush, so a burst of (re)connecting browsers is serialized once
+        if self.snapshot is None:
+            self.snapshot = encode_event(self.states, 'snapshot')
+        return self.snapshot
+
+    async def handle(self, reader, writer):
+        try:
+            request = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        parts = request.split(b'\r\n', 1)[0].decode('latin-1').split()
+        path = parts[1].split('?', 1)[0] if len(parts) >= 2 else ''
+        if parts and parts[0] != 'GET':
+            writer.write(http_response('405 Method Not Allowed', 'text/plain', b"GET only\n"))
+        elif path == '/events':
+            await self.stream(reader, writer)
+            return
+        elif path in ('/', '/index.html'):
+            writer.write(http_response('200 OK', 'text/html; charset=utf-8', PAGE.encode('utf-8')))
+        elif path == '/state':
+            body = json.dumps(self.states, ensure_ascii=False).encode('utf-8')
+            writer.write(http_response('200 OK', 'application/json', body))
+        else:
+            writer.write(http_response('404 Not Found', 'text/plain', b"not found\n"))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def stream(self, reader, writer):
+        transport = writer.transport
+        transport.write(SSE_HEADERS)
+        transport.write(self.snapshot_event())
+        self.clients.add(transport)
+        try:
+            # Browsers send nothing after the request, so EOF means the client went away
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(transport)
+            transport.close()
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        # A large backlog so hundreds of browsers reconnecting at once are not refused
+        self.server = await asyncio.start_server(self.handle, self.host, self.port, backlog=1024)
+        self.ready.set()
+        if self.pending:
+            self.flush_scheduled = True
+            self.schedule_flush()
+        while not self.stopping.is_set():
+            try:
+                await asyncio.wait_for(self.stopping.wait(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                self.broadcast(KEEPALIVE)
+        self.server.close()
+        for transport in list(self.clients):
+            transport.abort()
+        self.clients.clear()
+        await self.server.wait_closed()
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        except Exception as e:
+            self.error = e
+            self.ready.set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+        return self
+
+    def stop(self, timeout=None):
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self.stopping.set)
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def stats(self):
+        return {
+            'clients': len(self.clients),
+            'updates': self.updates,
+            'dropped_clients': self.dropped_clients,
+        }
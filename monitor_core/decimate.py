@@ -0,0 +1,70 @@
+"""Min/max decimation pyramid for plotting long sensor histories.
+
+Level 0 holds one (start, min, max) bucket per ``base_ns``; every level above
+merges ``fanout`` buckets of the one below. A chart that is N pixels wide
+picks the finest level whose buckets cover its time span in about N
+columns, so drawing a week costs the same as drawing ten minutes, and
+min/max envelopes keep short spikes visible at every zoom.
+"""
+from collections import deque
+
+SECOND = 1_000_000_000
+
+
+class MinMaxPyramid:
+    def __init__(self, base_ns=SECOND, fanout=4, levels=8, retention=4096):
+        self.widths = [base_ns * fanout ** level for level in range(levels)]
+        # Completed buckets per level, oldest first, bounded to `retention`
+        self.levels = [deque(maxlen=retention) for _ in range(levels)]
+        # The bucket currently being filled at each level: [start, min, max] or None
+        self.current = [None] * levels
+        # Monotonic count of buckets completed per level, so views can tell what is new
+        self.completed = [0] * levels
+
+    def add(self, ts_ns, value):
+        self.merge(0, ts_ns, value, value)
+
+    def merge(self, level, ts_ns, low, high):
+        width = self.widths[level]
+        start = ts_ns - ts_ns % width
+        current = self.current[level]
+        if current is not None and current[0] == start:
+            if low < current[1]:
+                current[1] = low
+            if high > current[2]:
+                current[2] = high
+            return
+        if current is not None:
+            self.levels[level].append(tuple(current))
+            self.completed[level] += 1
+            if level + 1 < len(self.widths):
+                self.merge(level + 1, current[0], current[1], current[2])
+        self.current[level] = [start, low, high]
+
+    def level_for(self, span_ns, columns):
+        """Finest level that fits span_ns into at most `columns` buckets."""
+        for level, width in enumerate(self.widths):
+            if span_ns <= width * columns:
+                return level
+        return len(self.widths) - 1
+
+    def latest(self, level, count):
+        """The last `count` completed buckets at `level`, oldest first."""
+        buckets = self.levels[level]
+        count = min(count, len(buckets))
+        return [buckets[i] for i in range(len(buckets) - count, len(buckets))]
+
+    def live(self, level):
+        """The in-progress bucket at `level`, including samples still held by finer levels."""
+        width = self.widths[level]
+        live = None
+        for current in self.current[:level + 1]:
+            if current is None:
+                continue
+            start = current[0] - current[0] % width
+            if live is None or start > live[0]:
+                live = [start, current[1], current[2]]
+            elif start == live[0]:
+                live[1] = min(live[1], current[1])
+                live[2] = max(live[2], current[2])
+        return tuple(live) if live is not None else None
@@ -0,0 +1,233 @@
+"""GUI-free monitoring engine: serial reader thread, line parser and state store.
+
+Nothing in this module imports tkinter, so it runs unchanged on a headless
+gateway, in CI, or behind the Tk views in the two monitor apps.
+"""
+import threading
+import time
+from datetime import datetime
+
+from monitor_core.parsers import PARSERS
+from monitor_core.serial_reader import SerialLineReader, DEFAULT_READ_TIMEOUT
+
+DEFAULT_BAUD = 115200
+
+MISSING = object()
+
+
+class StateStore:
+    """Holds the parsed device state and publishes what changed to subscribers.
+
+    ``publish()`` compares the state with what was last published and calls
+    each subscriber with only the changed keys, as ``{key: new value}``, and
+    calls nothing when nothing changed. A subscriber that passes ``keys`` is
+    only called when one of those keys changed, with just those keys, so a
+    subscriber to channels that stay idle costs nothing per line. Subscribers
+    must not modify the dict they are given.
+    """
+
+    def __init__(self, initial):
+        self.data = dict(initial)
+        self.published = dict(initial)
+        # Subscribers to every key, and key -> the subscribers to that key
+        self.subscribers = []
+        self.key_subscribers = {}
+
+    def subscribe(self, callback, keys=None):
+        if keys is None:
+            self.subscribers.append(callback)
+            return
+        for key in keys:
+            self.key_subscribers.setdefault(key, []).append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+        for key, callbacks in list(self.key_subscribers.items()):
+            if callback in callbacks:
+                callbacks.remove(callback)
+                if not callbacks:
+                    del self.key_subscribers[key]
+
+    def publish(self):
+        """Notify subscribers of the keys that changed since the last publish; returns the changes."""
+        data = self.data
+        published = self.published
+        # Many lines leave the state as it was, and a dict compare is much cheaper than the diff.
+        # With no subscribers nothing is diffed; the first subscriber then gets everything since.
+        if data == published or not (self.subscribers or self.key_subscribers):
+            return {}
+        changes = {key: value for key, value in data.items() if published.get(key, MISSING) != value}
+        published.update(changes)
+        for callback in self.subscribers:
+            callback(changes)
+        key_subscribers = self.key_subscribers
+        if key_subscribers:
+            # One call per subscriber, however many of its keys changed
+            selected = {}
+            for key, value in changes.items():
+                for callback in key_subscribers.get(key, ()):
+                    part = selected.get(callback)
+                    if part is None:
+                        part = selected[callback] = {}
+                    part[key] = value
+            for callback, part in selected.items():
+                callback(part)
+        return changes
+
+
+class MonitorEngine:
+    """Reads lines from a serial port, parses them and publishes the state.
+
+    Views subscribe to four streams:
+
+    * ``subscribe_lines(cb)``  - every raw line, after it has been parsed
+    * ``state.subscribe(cb, keys=None)`` - the state keys a parsed line changed
+    * ``subscribe_readings(cb, keys=None)`` - the same, for the numeric readings
+      as floats (``{'temperature': 25.5}``), for views that colour and format them
+    * ``subscribe_errors(cb)`` - read and parse errors as human readable messages
+
+    Callbacks run on the reader thread. ``line_observer``, when set, is called
+    as ``line_observer(seconds, ok)`` with the parse time of every line;
+    ``profiler`` (a profiling.StageProfiler) breaks that time into stages.
+    """
+
+    def __init__(self, parser, read_timeout=DEFAULT_READ_TIMEOUT):
+        self.parser = parser
+        self.read_timeout = read_timeout
+        self.state = StateStore(parser.initial_state())
+        self.current_data = self.state.data
+        # channel -> the last reading as a float, fed by the parser's samples once subscribed to
+        self.readings = StateStore({})
+        self.readings_fed = False
+        self.line_subscribers = []
+        self.error_subscribers = []
+        self.port = None
+        self.running = False
+        self.thread = None
+        self.reader = None
+        self.line_observer = None
+        self.profiler = None
+        self.parse_errors = 0
+        self.read_errors = 0
+        self.stamp_second = None
+        self.stamp_text = None
+
+    @classmethod
+    def for_device(cls, device, **options):
+        return cls(PARSERS[device](), **options)
+
+    def subscribe_lines(self, callback):
+        self.line_subscribers.append(callback)
+
+    def subscribe_errors(self, callback):
+        self.error_subscribers.append(callback)
+
+    def subscribe_readings(self, callback, keys=None):
+        if not self.readings_fed:
+            # Samples are only emitted when subscribed to, so engines nobody asks for readings skip them
+            self.parser.subscribe_samples(self.readings.data.__setitem__)
+            self.readings_fed = True
+        self.readings.subscribe(callback, keys)
+
+    def start(self, port):
+        """Start reading from an already opened serial port on a daemon thread."""
+        self.port = port
+        self.running = True
+        self.thread = threading.Thread(target=self.read_loop, args=(port,), daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        self.running = False
+        if self.thread is not None and timeout is not None:
+            self.thread.join(timeout)
+
+    def read_loop(self, port):
+        """Read and parse until stopped or until the port fails; returns that failure, or None.
+
+        A read that raises OSError (pyserial's SerialException included) means
+        the board was unplugged or the port closed under us: retrying the same
+        handle would only fail again, so the loop reports it and returns and
+        reconnecting is left to the caller (see connection.ConnectionManager).
+        """
+        # Blocks until bytes arrive (or read_timeout expires), then frames the whole chunk at once
+        reader = self.reader = SerialLineReader(port, read_timeout=self.read_timeout)
+        try:
+            while self.running:
+                try:
+                    lines = reader.read_lines()
+                    profiler = self.profiler
+                    if profiler is not None and lines:
+                        profiler.record('read', reader.last_read_seconds)
+                        for line in lines:
+                            profiler.record('queue', time.perf_counter() - reader.last_read_at)
+                            self.process_line(line)
+                        continue
+                    for line in lines:
+                        self.process_line(line)
+                except OSError as e:
+                    if self.running:
+                        self.read_errors += 1
+                        self.report_error(f"Serial port lost: {e}")
+                    return e
+                except Exception as e:
+                    if self.running:
+                        self.read_errors += 1
+                        self.report_error(f"Error decoding data: {e}")
+        finally:
+            reader.close()
+        return None
+
+    def process_line(self, line):
+        observer = self.line_observer
+        profiler = self.profiler
+        if observer is not None or profiler is not None:
+            started = time.perf_counter()
+        ok = True
+        try:
+            self.parser.process(line, self.current_data)
+            if profiler is not None:
+                parsed = time.perf_counter()
+            self.current_data['last_update'] = self.timestamp()
+            self.state.publish()
+            if self.readings_fed:
+                self.readings.publish()
+        except Exception as e:
+            ok = False
+            self.parse_errors += 1
+            self.report_error(f"Error processing line '{line}': {e}")
+        if observer is not None:
+            observer(time.perf_counter() - started, ok)
+
+        for callback in self.line_subscribers:
+            callback(line)
+
+        if profiler is not None and ok:
+            applied = time.perf_counter()
+            profiler.record('parse', parsed - started)
+            profiler.record('apply', applied - parsed)
+            profiler.line_applied(applied)
+
+    def timestamp(self):
+        # strftime is the most expensive step per line; the text only changes once a second
+        now = time.time()
+        second = int(now)
+        if second != self.stamp_second:
+            self.stamp_second = second
+            self.stamp_text = datetime.fromtimestamp(now).strftime("%H:%M:%S")
+        return self.stamp_text
+
+    def report_error(self, message):
+        for callback in self.error_subscribers:
+            callback(message)
+
+
+def open_serial(port, baud=DEFAULT_BAUD, timeout=1):
+    # pyserial is imported on first use so importing the engine stays cheap
+    import serial
+    return serial.Serial(port, baud, timeout=timeout)
+
+
+def list_serial_ports():
+    import serial.tools.list_ports
+    return [port.device for port in serial.tools.list_ports.comports()]
@@ -0,0 +1,104 @@
+"""Typed events emitted by the parsers, with numbers parsed once.
+
+The state dict keeps the display strings the CLI prints ("Normal (450)",
+"✅ Fed", ...). Events carry the same readings as numbers and booleans, so
+the access log, the rollups and history buffers hold a few slotted fields
+instead of string dicts. Views that colour readings take them as numbers
+from MonitorEngine.subscribe_readings rather than parsing the state's text.
+
+Fields that a line did not contain are None. ``ts`` is time.time() at parse.
+"""
+
+
+class Event:
+    __slots__ = ()
+    kind = 'event'
+
+    def as_dict(self):
+        return {'kind': self.kind, **{name: getattr(self, name) for name in self.__slots__}}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class EnvironmentReading(Event):
+    __slots__ = ('ts', 'temperature', 'humidity', 'light')
+    kind = 'environment'
+
+    def __init__(self, ts, temperature, humidity, light):
+        self.ts = ts
+        self.temperature = temperature
+        self.humidity = humidity
+        self.light = light
+
+
+class SecurityReading(Event):
+    __slots__ = ('ts', 'motion', 'door_open', 'gas')
+    kind = 'security'
+
+    def __init__(self, ts, motion, door_open, gas):
+        self.ts = ts
+        self.motion = motion
+        self.door_open = door_open
+        self.gas = gas
+
+
+class FlameReading(Event):
+    __slots__ = ('ts', 'value')
+    kind = 'flame'
+
+    def __init__(self, ts, value):
+        self.ts = ts
+        self.value = value
+
+
+class FoodLevelReading(Event):
+    __slots__ = ('ts', 'distance_cm')
+    kind = 'food_level'
+
+    def __init__(self, ts, distance_cm):
+        self.ts = ts
+        self.distance_cm = distance_cm
+
+
+class RfidEvent(Event):
+    """A card scan (authorized None) or the access decision that follows it."""
+    __slots__ = ('ts', 'uid', 'authorized')
+    kind = 'rfid'
+
+    def __init__(self, ts, uid, authorized):
+        self.ts = ts
+        self.uid = uid
+        self.authorized = authorized
+
+
+class FeedEvent(Event):
+    """A scheduled slot ('7am', '12pm', '7pm') that was fed or skipped."""
+    __slots__ = ('ts', 'slot', 'fed')
+    kind = 'feed'
+
+    def __init__(self, ts, slot, fed):
+        self.ts = ts
+        self.slot = slot
+        self.fed = fed
+
+
+class ServoEvent(Event):
+    """Servo 1 opening for an authorized card, or servo 2 dispensing food."""
+    __slots__ = ('ts', 'servo')
+    kind = 'servo'
+
+    def __init__(self, ts, servo):
+        self.ts = ts
+        self.servo = servo
+
+
+# By class name, for grammars that name the event their rules emit
+EVENT_TYPES = {event_type.__name__: event_type for event_type in (
+    EnvironmentReading, SecurityReading, FlameReading, FoodLevelReading, RfidEvent, FeedEvent, ServoEvent)}
@@ -0,0 +1,213 @@
+"""Daily and weekly feeding rollups, maintained incrementally from parser events.
+
+The firmware's 7am/12pm/7pm slot strings reset every midnight. FeedingRollups
+keeps, per local day and per ISO week (keyed by its Monday):
+
+    fed, skipped           scheduled slots fed or skipped because food was present
+    food_sum/count/min/max food container distance (cm) at the time of each slot
+    servo1, servo2         RFID door openings and food dispenser openings
+
+Every event adds to an in-memory delta for its day and week, which is O(1)
+and touches no history. At most once per ``window`` seconds (and before any
+query) the deltas are upserted into SQLite, one row per period, so the
+history view reads a few hundred pre-aggregated rows however many years of
+events went into them.
+
+    rollups = FeedingRollups('feeding.db')
+    parser.subscribe_events(rollups.event_recorder())
+    rollups.history('week', limit=12)
+
+Several feeders can share one database: each parser gets its own
+``event_recorder(device)`` and history() takes the same device name.
+"""
+import datetime
+import sqlite3
+import threading
+import time
+
+from monitor_core.accesslog import connect
+
+DEFAULT_WINDOW = 5.0
+
+PERIODS = ('day', 'week')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feeding_rollup (
+    device TEXT NOT NULL,
+    period TEXT NOT NULL,
+    start TEXT NOT NULL,
+    fed INTEGER NOT NULL,
+    skipped INTEGER NOT NULL,
+    food_sum REAL NOT NULL,
+    food_count INTEGER NOT NULL,
+    food_min REAL,
+    food_max REAL,
+    servo1 INTEGER NOT NULL,
+    servo2 INTEGER NOT NULL,
+    PRIMARY KEY (device, period, start)
+) WITHOUT ROWID;
+"""
+
+UPSERT = """
+INSERT INTO feeding_rollup (device, period, start, fed, skipped, food_sum, food_count, food_min, food_max, servo1, servo2)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (device, period, start) DO UPDATE SET
+    fed = fed + excluded.fed,
+    skipped = skipped + excluded.skipped,
+    food_sum = food_sum + excluded.food_sum,
+    food_count = food_count + excluded.food_count,
+    food_min = coalesce(min(food_min, excluded.food_min), food_min, excluded.food_min),
+    food_max = coalesce(max(food_max, excluded.food_max), food_max, excluded.food_max),
+    servo1 = servo1 + excluded.servo1,
+    servo2 = servo2 + excluded.servo2
+"""
+
+# Positions in a pending delta
+FED, SKIPPED, FOOD_SUM, FOOD_COUNT, FOOD_MIN, FOOD_MAX, SERVO1, SERVO2 = range(8)
+COUNTERS = (FED, SKIPPED, FOOD_SUM, FOOD_COUNT, SERVO1, SERVO2)
+
+
+def empty_delta():
+    return [0, 0, 0.0, 0, None, None, 0, 0]
+
+
+def merge_delta(delta, other):
+    for index in COUNTERS:
+        delta[index] += other[index]
+    if other[FOOD_MIN] is not None and (delta[FOOD_MIN] is None or other[FOOD_MIN] < delta[FOOD_MIN]):
+        delta[FOOD_MIN] = other[FOOD_MIN]
+    if other[FOOD_MAX] is not None and (delta[FOOD_MAX] is None or other[FOOD_MAX] > delta[FOOD_MAX]):
+        delta[FOOD_MAX] = other[FOOD_MAX]
+
+
+class FeedingRollups:
+    def __init__(self, path, window=DEFAULT_WINDOW):
+        self.path = path
+        self.window = window
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.error_subscribers = []
+        self.events = 0
+        self.flushes = 0
+        self.last_flush = time.monotonic()
+        # Day and week keys of the last event, recomputed only when the date changes
+        self.day = None
+        self.keys = None
+
+        self.write_lock = threading.Lock()
+        self.writer = connect(path)
+        self.writer.executescript(SCHEMA)
+        self.read_lock = threading.Lock()
+        self.reader = connect(path)
+
+    def subscribe_errors(self, callback):
+        self.error_subscribers.append(callback)
+
+    def period_keys(self, ts):
+        day = datetime.date.fromtimestamp(ts)
+        if day != self.day:
+            monday = day - datetime.timedelta(days=day.weekday())
+            self.day = day
+            self.keys = (('day', day.isoformat()), ('week', monday.isoformat()))
+        return self.keys
+
+    def add(self, device, ts, index, amount=1):
+        with self.lock:
+            for period, start in self.period_keys(ts):
+                key = (device, period, start)
+                delta = self.pending.get(key)
+                if delta is None:
+                    delta = self.pending[key] = empty_delta()
+                delta[index] += amount
+
+    def add_feed(self, device, ts, fed, level):
+        with self.lock:
+            for period, start in self.period_keys(ts):
+                key = (device, period, start)
+                delta = self.pending.get(key)
+                if delta is None:
+                    delta = self.pending[key] = empty_delta()
+                delta[FED if fed else SKIPPED] += 1
+                if level is not None:
+                    delta[FOOD_SUM] += level
+                    delta[FOOD_COUNT] += 1
+                    if delta[FOOD_MIN] is None or level < delta[FOOD_MIN]:
+                        delta[FOOD_MIN] = level
+                    if delta[FOOD_MAX] is None or level > delta[FOOD_MAX]:
+                        delta[FOOD_MAX] = level
+
+    def event_recorder(self, device=''):
+        """A parser event callback rolling up slot results and servo openings for device."""
+        # Latest food distance from this device, attributed to the next slot result
+        food_level = [None]
+
+        def record(event):
+            kind = event.kind
+            if kind == 'food_level':
+                food_level[0] = event.distance_cm
+                return
+            if kind == 'feed':
+                self.add_feed(device, event.ts, event.fed, food_level[0])
+            elif kind == 'servo':
+                self.add(device, event.ts, SERVO1 if event.servo == 1 else SERVO2)
+            else:
+                return
+            self.events += 1
+            if time.monotonic() - self.last_flush >= self.window:
+                self.flush()
+        return record
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        with self.lock:
+            pending = self.pending
+            if not pending:
+                return 0
+            self.pending = {}
+        rows = [key + tuple(delta) for key, delta in pending.items()]
+        try:
+            with self.write_lock:
+                self.writer.execute("BEGIN")
+                try:
+                    self.writer.executemany(UPSERT, rows)
+                    self.writer.execute("COMMIT")
+                except BaseException:
+                    self.writer.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            # Fold the deltas back in so nothing is counted twice or lost
+            with self.lock:
+                for key, delta in pending.items():
+                    newer = self.pending.get(key)
+                    if newer is not None:
+                        merge_delta(delta, newer)
+                    self.pending[key] = delta
+            for callback in self.error_subscribers:
+                callback(f"Feeding rollup write failed: {e}")
+            return 0
+        self.flushes += 1
+        return len(rows)
+
+    def close(self):
+        self.flush()
+        with self.write_lock:
+            self.writer.close()
+        with self.read_lock:
+            self.reader.close()
+
+    def history(self, period='day', limit=None, device=''):
+        """Newest first: [(start, fed, skipped, food_avg, food_min, food_max, servo1, servo2), ...]."""
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {PERIODS}, got '{period}'")
+        self.flush()
+        sql = ("SELECT start, fed, skipped, food_sum, food_count, food_min, food_max, servo1, servo2"
+               " FROM feeding_rollup WHERE device = ? AND period = ? ORDER BY start DESC")
+        params = [device, period]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.read_lock:
+            rows = self.reader.execute(sql, params).fetchall()
+        return [(start, fed, skipped, food_sum / food_count if food_count else None, food_min, food_max,
+                 servo1, servo2)
+                for start, fed, skipped, food_sum, food_count, food_min, food_max, servo1, servo2 in rows]
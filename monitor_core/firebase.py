@@ -0,0 +1,195 @@
+"""Gateway-side Firebase uploads, coalesced and batched.
+
+The firmwares push every value with its own ``Firebase.set*`` call and echo
+it as ``[OK] path = value``. FirebaseSink collects the same writes on the
+gateway instead: repeated writes to a path within ``window`` seconds collapse
+to the latest value, and everything pending goes out as one multi-path
+PATCH. The backend is pluggable; RestBackend talks to the Realtime Database
+REST API (or monitor_core.localdb for offline runs).
+"""
+import json
+import re
+import threading
+import urllib.parse
+import urllib.request
+
+OK_WRITE_RE = re.compile(r"^\[OK\]\s+(\S+)\s+=\s?(.*)$")
+INT_RE = re.compile(r"^-?\d+$")
+FLOAT_RE = re.compile(r"^-?\d+\.\d+$")
+
+DEFAULT_WINDOW = 1.0
+DEFAULT_MAX_BATCH = 500
+
+
+def normalize_path(path):
+    return path.strip('/')
+
+
+def typed_value(text):
+    # The firmware prints setInt/setFloat/setString values with %d/%.2f/%s
+    if INT_RE.match(text):
+        return int(text)
+    if FLOAT_RE.match(text):
+        return float(text)
+    return text
+
+
+def parse_firebase_write(line):
+    """Return (path, value) for an "[OK] path = value" line, else None."""
+    match = OK_WRITE_RE.match(line)
+    if match is None:
+        return None
+    return normalize_path(match.group(1)), typed_value(match.group(2).strip())
+
+
+class RestBackend:
+    """Realtime Database REST API: PATCH {url}/.json with {"a/b": value, ...}."""
+
+    def __init__(self, database_url, auth=None, timeout=10):
+        self.database_url = database_url.rstrip('/')
+        self.auth = auth
+        self.timeout = timeout
+        self.requests = 0
+
+    def url(self, path=''):
+        url = f"{self.database_url}/{path}.json" if path else f"{self.database_url}/.json"
+        if self.auth:
+            url += '?' + urllib.parse.urlencode({'auth': self.auth})
+        return url
+
+    def send(self, method, path, payload):
+        body = json.dumps(payload).encode('utf-8')
+        request = urllib.request.Request(self.url(path), data=body, method=method,
+                                         headers={'Content-Type': 'application/json'})
+        self.requests += 1
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    def patch(self, updates):
+        self.send('PATCH', '', updates)
+
+    def put(self, path, value):
+        self.send('PUT', path, value)
+
+
+class MemoryBackend:
+    """Applies updates to a nested dict; used when no database is configured."""
+
+    def __init__(self):
+        self.tree = {}
+        self.requests = 0
+
+    def patch(self, updates):
+        self.requests += 1
+        for path, value in updates.items():
+            set_path(self.tree, path, value)
+
+    def put(self, path, value):
+        self.requests += 1
+        set_path(self.tree, path, value)
+
+
+def set_path(tree, path, value):
+    keys = [key for key in path.split('/') if key]
+    if not keys:
+        return value
+    node = tree
+    for key in keys[:-1]:
+        child = node.get(key)
+        if not isinstance(child, dict):
+            child = node[key] = {}
+        node = child
+    if value is None:
+        node.pop(keys[-1], None)
+    else:
+        node[keys[-1]] = value
+    return tree
+
+
+class FirebaseSink:
+    """Coalesces writes per path and flushes them as one PATCH every `window` seconds."""
+
+    def __init__(self, backend, window=DEFAULT_WINDOW, max_batch=DEFAULT_MAX_BATCH):
+        self.backend = backend
+        self.window = window
+        self.max_batch = max_batch
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread = None
+        self.error_subscribers = []
+        self.writes = 0
+        self.coalesced = 0
+        self.flushes = 0
+
+    def subscribe_errors(self, callback):
+        self.error_subscribers.append(callback)
+
+    def put(self, path, value):
+        with self.lock:
+            if path in self.pending:
+                self.coalesced += 1
+            self.pending[path] = value
+            self.writes += 1
+            full = len(self.pending) >= self.max_batch
+        if full:
+            self.wakeup.set()
+
+    def line_writer(self, prefix=''):
+        """A line subscriber that queues every "[OK] path = value" write, under prefix."""
+        prefix = normalize_path(prefix)
+
+        def write(line):
+            if not line.startswith('[OK]'):
+                return
+            parsed = parse_firebase_write(line)
+            if parsed is not None:
+                path, value = parsed
+                self.put(f"{prefix}/{path}" if prefix else path, value)
+        return write
+
+    def flush(self):
+        with self.lock:
+            updates = self.pending
+            if not updates:
+                return 0
+            self.pending = {}
+        try:
+            self.backend.patch(updates)
+        except Exception as e:
+            # Keep the batch for the next flush, without overwriting anything newer
+            with self.lock:
+                updates.update(self.pending)
+                self.pending = updates
+            for callback in self.error_subscribers:
+                callback(f"Firebase upload failed: {e}")
+            return 0
+        self.flushes += 1
+        return len(updates)
+
+    def run(self):
+        while self.running:
+            self.wakeup.wait(self.window)
+            self.wakeup.clear()
+            self.flush()
+        self.flush()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        self.running = False
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def stats(self):
+        return {
+            'writes': self.writes,
+            'coalesced': self.coalesced,
+            'requests': self.flushes,
+            'pending': len(self.pending),
+        }
@@ -0,0 +1,582 @@
+"""Declarative line grammars for the boards' serial logs, compiled once into a matcher.
+
+A grammar is plain data, a Python dict or a JSON/YAML file read with
+load_grammar(), describing one board type:
+
+    {
+        'device': 'smarthome',
+        'banner': "=== ESP32 Smart Home System ===",   # printed at boot, see detect_device()
+        'channels': ['temperature', ...],                # numeric channels reported as samples
+        'state': {'temperature': '--', ...},             # initial display state
+        'rules': [rule, ...],
+    }
+
+A rule fires when one of its ``when`` markers occurs in a line. Its other
+keys say what to read from the line and what to do with it:
+
+    group     rules sharing a group are alternatives: when several match one
+              line, only the first listed runs (if/elif)
+    layout    regex with named groups for the whole line; a line it matches
+              in full is taken as this rule's line alone, fields from the groups
+    fields    {field: regex with one group}, searched in lines that do not
+              match the layout (by default the layout itself is searched)
+    types     {field: 'float' | 'int' | 'text' | {text: value}}, how a field
+              is converted for displays and events (default 'text')
+    const     {name: value}, constants for the event
+    recall    {field: state_key}, used when the field is missing from the line,
+              unless state_key still holds its initial value
+    require   [field, ...] that must be present, or the rule does nothing
+    set       {state_key: value}
+    stamp     [state_key, ...] set to the parser's clock ("HH:MM:SS")
+    store     [field, ...] or {state_key: field}, the field's text
+    map       {field: {text: display text}}
+    display   {field: {'above' or 'below': limit, 'then': text, 'else': format}}
+    samples   [field, ...] emitted as (field, float) samples
+    event     [EventType, field or const, ...], a monitor_core.events type
+              built from time.time() and those values
+    cases     [{'contains' / 'icontains': text, 'unless': {state_key: text},
+              ...const and effects}, ...]; the first case whose conditions
+              hold runs together with the rule's own effects, and if none
+              holds the rule does nothing
+
+Effects apply in that order: set, stamp, store, map, display, samples, event.
+
+Each grammar is compiled once, when its parser class is defined: the
+markers into one prefix-trie regex, the layouts into one alternation, and
+the rules into Python source with one specialised function per rule
+(``Grammar.source``), so a parsed line runs only the checks and
+assignments its rule names. New board types are new grammars, made known
+to --device and banner detection with register().
+"""
+import json
+import math
+import re
+import time
+from datetime import datetime
+
+from monitor_core.events import EVENT_TYPES
+
+# Lines whose rule selection is remembered; cleared when full
+MEMO_SIZE = 4096
+
+SPEC_KEYS = {'device', 'banner', 'channels', 'state', 'rules'}
+EFFECT_KEYS = ('set', 'stamp', 'store', 'map', 'display', 'samples', 'event')
+RULE_KEYS = {'when', 'group', 'layout', 'fields', 'types', 'const', 'recall', 'require', 'cases', *EFFECT_KEYS}
+CASE_KEYS = {'contains', 'icontains', 'unless', 'const', *EFFECT_KEYS}
+
+NAMED_GROUP_RE = re.compile(r"\(\?P<(\w+)>")
+GROUP_REFERENCE_RE = re.compile(r"\(\?P=(\w+)\)")
+
+# Parser classes by device, for --device, detect_device() and switching on a banner
+REGISTRY = {}
+
+
+def trie_pattern(markers):
+    """Build a regex that matches any of markers, factored into a prefix trie.
+
+    A flat ``a|b|c`` alternation makes the regex engine retry every marker at
+    every offset; the trie form lets it reject most offsets on the first
+    character. Where one marker is a prefix of another, the longer is preferred.
+    """
+    trie = {}
+    for marker in markers:
+        node = trie
+        for char in marker:
+            node = node.setdefault(char, {})
+        node[''] = None
+
+    def emit(node):
+        terminal = '' in node
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            return '(?:' + body + ')?'
+        return body
+
+    return emit(trie)
+
+
+def parse_float(text):
+    if text is None:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None  # e.g. "1.2.3" still matches [\d.]+
+
+
+def parse_int(text):
+    if text is None:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+def now_hms():
+    return datetime.now().strftime("%H:%M:%S")
+
+
+def as_list(value):
+    return [value] if isinstance(value, str) else list(value)
+
+
+def merge_effects(specs):
+    """Effects of a rule and of one of its cases: lists are joined, mappings updated, the case's event wins."""
+    merged = {}
+    for spec in specs:
+        for key in EFFECT_KEYS:
+            if key not in spec:
+                continue
+            value = spec[key]
+            if key == 'store' and not isinstance(value, dict):
+                value = {name: name for name in as_list(value)}
+            if key in ('stamp', 'samples'):
+                merged[key] = merged.get(key, []) + as_list(value)
+            elif key == 'event':
+                merged[key] = value
+            else:
+                merged[key] = {**merged.get(key, {}), **value}
+    return merged
+
+
+class Rule:
+    """One validated rule: markers, field extractors, and the effects of the rule or of each case."""
+
+    def __init__(self, spec, order, initial_state, where):
+        self.where = where
+        unknown = set(spec) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"{where}: unknown keys {sorted(unknown)}")
+        if not spec.get('when'):
+            raise ValueError(f"{where}: a rule needs 'when' markers")
+        self.markers = as_list(spec['when'])
+        self.order = order
+        self.group = spec.get('group', f"#{order}")
+        self.layout = spec.get('layout')
+        self.layout_pattern = re.compile(self.layout) if self.layout else None
+        self.layout_names = NAMED_GROUP_RE.findall(self.layout) if self.layout else []
+        if self.layout and len(self.layout_names) != self.layout_pattern.groups:
+            raise ValueError(f"{where}: every group in the layout must be named")
+        self.patterns = {name: re.compile(pattern) for name, pattern in spec.get('fields', {}).items()}
+        if self.layout and self.patterns and set(self.patterns) != set(self.layout_names):
+            raise ValueError(f"{where}: fields must name the same values as the layout's groups")
+        self.fields = list(self.layout_names) + [name for name in self.patterns if name not in self.layout_names]
+        for name in self.fields:
+            if not name.isidentifier():
+                raise ValueError(f"{where}: field name '{name}' is not an identifier")
+        self.const = dict(spec.get('const', {}))
+
+        self.types = {}
+        for name, kind in spec.get('types', {}).items():
+            self.check_field(name)
+            if kind not in ('float', 'int', 'text') and not isinstance(kind, dict):
+                raise ValueError(f"{where}: unknown type {kind!r} for '{name}'")
+            self.types[name] = kind
+        self.require = [self.check_field(name) for name in spec.get('require', ())]
+        self.recall = []
+        for name, key in spec.get('recall', {}).items():
+            self.check_field(name)
+            if key not in initial_state:
+                raise ValueError(f"{where}: recall from unknown state key '{key}'")
+            self.recall.append((name, key, initial_state[key]))
+
+        # With cases, the rule's own effects only ever run merged into one of them
+        self.cases = []
+        for number, case in enumerate(spec.get('cases', ())):
+            unknown = set(case) - CASE_KEYS
+            if unknown:
+                raise ValueError(f"{where}, case {number}: unknown keys {sorted(unknown)}")
+            const = {**self.const, **case.get('const', {})}
+            effects = merge_effects([spec, case])
+            self.check_effects(effects, const, f"{where}, case {number}")
+            self.cases.append((case, effects, const))
+        self.effects = None
+        if not self.cases:
+            self.effects = merge_effects([spec])
+            self.check_effects(self.effects, self.const, where)
+
+        # Fields that only the event reads are searched for only while someone listens for events
+        used = set(self.require)
+        for effects in [self.effects] if self.effects else [case[1] for case in self.cases]:
+            used |= set(effects.get('store', {}).values()) | set(effects.get('map', {}))
+            used |= set(effects.get('display', {})) | set(effects.get('samples', ()))
+        self.event_only = set() if self.layout else {name for name in self.fields if name not in used}
+
+    def check_field(self, name):
+        if name not in self.fields:
+            raise ValueError(f"{self.where}: unknown field '{name}'")
+        return name
+
+    def check_effects(self, effects, const, where):
+        for name in [*effects.get('store', {}).values(), *effects.get('map', {}), *effects.get('samples', ())]:
+            self.check_field(name)
+        for name, display in effects.get('display', {}).items():
+            if self.types.get(self.check_field(name)) not in ('float', 'int'):
+                raise ValueError(f"{where}: display field '{name}' needs a float or int type")
+            if ('above' in display) == ('below' in display):
+                raise ValueError(f"{where}: display for '{name}' needs exactly one of 'above' and 'below'")
+        if effects.get('event'):
+            event_name, *args = effects['event']
+            if event_name not in EVENT_TYPES:
+                raise ValueError(f"{where}: unknown event type '{event_name}'")
+            for name in args:
+                if name not in const:
+                    self.check_field(name)
+
+
+class Source:
+    """Python source generated for a grammar's rules, and the objects it refers to."""
+
+    def __init__(self):
+        self.lines = []
+        self.namespace = {'parse_float': parse_float, 'parse_int': parse_int, 'time': time.time}
+
+    def add(self, depth, text):
+        self.lines.append('    ' * depth + text)
+
+    def constant(self, value):
+        if value is None or isinstance(value, (bool, int, str)) or (isinstance(value, float) and math.isfinite(value)):
+            return repr(value)
+        name = f"K{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    def converted(self, rule, name, const):
+        if name in const:
+            return self.constant(const[name])
+        kind = rule.types.get(name, 'text')
+        if kind == 'float':
+            return f"parse_float(f_{name})"
+        if kind == 'int':
+            return f"parse_int(f_{name})"
+        if isinstance(kind, dict):
+            return f"{self.constant(kind)}.get(f_{name})"
+        return f"f_{name}"
+
+    def effects(self, rule, effects, const, depth):
+        start = len(self.lines)
+        for key, value in effects.get('set', {}).items():
+            self.add(depth, f"state[{key!r}] = {self.constant(value)}")
+        if effects.get('stamp'):
+            self.add(depth, "now = owner.clock()")
+            for key in effects['stamp']:
+                self.add(depth, f"state[{key!r}] = now")
+        for key, name in effects.get('store', {}).items():
+            if name in rule.require:
+                self.add(depth, f"state[{key!r}] = f_{name}")
+            else:
+                self.add(depth, f"if f_{name} is not None:")
+                self.add(depth + 1, f"state[{key!r}] = f_{name}")
+        for name, table in effects.get('map', {}).items():
+            self.add(depth, f"text = {self.constant(table)}.get(f_{name})")
+            self.add(depth, "if text is not None:")
+            self.add(depth + 1, f"state[{name!r}] = text")
+        for name, display in effects.get('display', {}).items():
+            above = 'above' in display
+            self.add(depth, f"number = {self.converted(rule, name, {})}")
+            self.add(depth, "if number is not None:")
+            self.add(depth + 1, f"state[{name!r}] = {self.constant(display['then'])} "
+                                f"if number {'>' if above else '<'} {self.constant(display['above' if above else 'below'])} "
+                                f"else {self.constant(display['else'])}.format(number)")
+        if effects.get('samples'):
+            self.add(depth, "if sample_subscribers:")
+            for name in effects['samples']:
+                self.add(depth + 1, f"number = parse_float(f_{name})")
+                self.add(depth + 1, "if number is not None:")
+                self.add(depth + 2, "for callback in sample_subscribers:")
+                self.add(depth + 3, f"callback({name!r}, number)")
+        if effects.get('event'):
+            event_name, *args = effects['event']
+            self.namespace[event_name] = EVENT_TYPES[event_name]
+            values = ''.join(', ' + self.converted(rule, name, const) for name in args)
+            self.add(depth, "if event_subscribers:")
+            self.add(depth + 1, f"event = {event_name}(time(){values})")
+            self.add(depth + 1, "for callback in event_subscribers:")
+            self.add(depth + 2, "callback(event)")
+        if len(self.lines) == start:
+            self.add(depth, "pass")
+
+    def body(self, rule, depth):
+        for name in rule.require:
+            self.add(depth, f"if f_{name} is None:")
+            self.add(depth + 1, "return")
+        for name, key, initial in rule.recall:
+            listening = " and event_subscribers" if name in rule.event_only else ""
+            self.add(depth, f"if f_{name} is None{listening}:")
+            self.add(depth + 1, f"f_{name} = state[{key!r}]")
+            self.add(depth + 1, f"if f_{name} == {self.constant(initial)}:")
+            self.add(depth + 2, f"f_{name} = None")
+        if rule.effects is not None:
+            self.effects(rule, rule.effects, rule.const, depth)
+            return
+        for number, (case, effects, const) in enumerate(rule.cases):
+            conditions = []
+            if 'contains' in case:
+                conditions.append(f"{case['contains']!r} in line")
+            if 'icontains' in case:
+                conditions.append(f"{case['icontains'].lower()!r} in line.lower()")
+            for key, text in case.get('unless', {}).items():
+                conditions.append(f"{text!r} not in state[{key!r}]")
+            if conditions:
+                self.add(depth, f"{'elif' if number else 'if'} {' and '.join(conditions)}:")
+            else:
+                self.add(depth, "else:" if number else "if True:")
+            self.effects(rule, effects, const, depth + 1)
+            if not conditions:
+                break  # later cases could never run
+
+    def rule(self, rule, depth):
+        """The rule's line function and, with a layout, its layout function."""
+        self.add(depth, f"def line_{rule.order}(line, state):")
+        if rule.patterns:
+            for name in rule.fields:
+                inner = depth + 1
+                if name in rule.event_only:
+                    self.add(depth + 1, "if event_subscribers:")
+                    inner += 1
+                self.add(inner, f"match = {self.constant(rule.patterns[name].search)}(line)")
+                self.add(inner, f"f_{name} = match.group(1) if match is not None else None")
+                if name in rule.event_only:
+                    self.add(depth + 1, "else:")
+                    self.add(depth + 2, f"f_{name} = None")
+        elif rule.layout:
+            self.add(depth + 1, f"match = {self.constant(rule.layout_pattern.search)}(line)")
+            self.add(depth + 1, "if match is None:")
+            self.add(depth + 2, ' = '.join(f"f_{name}" for name in rule.fields) + " = None")
+            self.add(depth + 1, "else:")
+            self.add(depth + 2, ''.join(f"f_{name}, " for name in rule.fields) + "= match.groups()")
+        self.body(rule, depth + 1)
+        if rule.layout:
+            self.add(depth, f"def layout_{rule.order}(values, line, state):")
+            self.add(depth + 1, ''.join(f"f_{name}, " for name in rule.fields) + "= values")
+            self.body(rule, depth + 1)
+
+    def text(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+class Grammar:
+    """A validated grammar: markers, one regex of all layouts, and its rules compiled to Python."""
+
+    def __init__(self, spec):
+        unknown = set(spec) - SPEC_KEYS
+        if unknown:
+            raise ValueError(f"grammar: unknown keys {sorted(unknown)}")
+        if 'device' not in spec:
+            raise ValueError("grammar: 'device' is required")
+        self.device = spec['device']
+        self.banner = spec.get('banner')
+        self.channels = tuple(spec.get('channels', ()))
+        self.initial_state = dict(spec.get('state', {}))
+        self.rules = []
+        markers = set()
+        stored = set()
+        for order, rule_spec in enumerate(spec.get('rules', ())):
+            rule = Rule(rule_spec, order, self.initial_state, f"{self.device} rule {order}")
+            for marker in rule.markers:
+                if marker in markers:
+                    raise ValueError(f"{rule.where}: marker {marker!r} is already used")
+                markers.add(marker)
+            for effects in [rule.effects] if rule.effects else [case[1] for case in rule.cases]:
+                stored.update(key for key, name in effects.get('store', {}).items() if key == name)
+            self.rules.append(rule)
+        # Channels whose state key holds the reading's own text, so state changes carry the reading;
+        # the others (e.g. gas, shown as "GAS LEAK!") are only available as samples
+        self.state_channels = tuple(channel for channel in self.channels if channel in stored)
+
+        # Every layout becomes one group of a single alternation; lastindex is the
+        # group of the layout that matched, and its fields are the groups after it
+        alternatives = []
+        self.layout_groups = {}
+        index = 0
+        for rule in self.rules:
+            if not rule.layout:
+                continue
+            index += 1
+            prefix = f"r{rule.order}_"
+            body = NAMED_GROUP_RE.sub(lambda match: f"(?P<{prefix}{match.group(1)}>", rule.layout)
+            body = GROUP_REFERENCE_RE.sub(lambda match: f"(?P={prefix}{match.group(1)})", body)
+            alternatives.append(f"({body})")
+            self.layout_groups[rule.order] = (index, index + rule.layout_pattern.groups)
+            index += rule.layout_pattern.groups
+        self.layout_pattern = re.compile('|'.join(alternatives)) if alternatives else None
+
+        source = Source()
+        source.add(0, "def bind(owner, sample_subscribers, event_subscribers):")
+        for rule in self.rules:
+            source.rule(rule, 1)
+        source.add(1, "return {" + ', '.join(
+            f"{rule.order}: (line_{rule.order}, {f'layout_{rule.order}' if rule.layout else None})"
+            for rule in self.rules) + "}")
+        self.source = source.text()
+        exec(compile(self.source, f"<grammar {self.device}>", 'exec'), source.namespace)
+        self.bind = source.namespace['bind']
+
+
+class GrammarParser:
+    """Line parser driven by a grammar (see the module docstring).
+
+    A line is handled by the first of:
+
+    1. a memo of recent lines that matched no layout, mapping each to the
+       rule functions selected for it, so repeated status lines skip the scan
+    2. a fullmatch of the combined layouts, which picks the rule and
+       captures its fields in one regex call
+    3. a scan for every marker, keeping one rule per group, in rule order
+
+    Subclasses set SPEC to a grammar dict; parser_class() makes one for a
+    grammar loaded at run time. With ``detect=True`` the parser switches to
+    another registered board's grammar when that board's banner appears,
+    resetting the state it is handed to that board's initial state.
+    """
+
+    SPEC = None
+    DEVICE = None
+    CHANNELS = ()
+    INITIAL_STATE = {}
+    grammar = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.SPEC is not None:
+            cls.grammar = Grammar(cls.SPEC)
+            cls.DEVICE = cls.grammar.device
+            cls.CHANNELS = cls.grammar.channels
+            cls.INITIAL_STATE = cls.grammar.initial_state
+
+    def __init__(self, clock=None, detect=False):
+        self.sample_subscribers = []
+        self.event_subscribers = []
+        self.device_subscribers = []
+        # Returns the "HH:MM:SS" string for stamp effects
+        self.clock = clock or now_hms
+        self.detect = detect
+        self.bind(self.grammar)
+
+    def bind(self, grammar):
+        self.grammar = grammar
+        self.device = grammar.device
+        self.CHANNELS = grammar.channels
+        self.INITIAL_STATE = grammar.initial_state
+        self.memo = {}
+        self.dispatch = {}
+        self.layouts = [None] * (max((start for start, stop in grammar.layout_groups.values()), default=0) + 1)
+        functions = grammar.bind(self, self.sample_subscribers, self.event_subscribers)
+        for rule in grammar.rules:
+            on_line, on_layout = functions[rule.order]
+            for marker in rule.markers:
+                self.dispatch[marker] = (rule.order, rule.group, on_line)
+            if on_layout is not None:
+                start, stop = grammar.layout_groups[rule.order]
+                self.layouts[start] = (on_layout, start, stop)
+        # Every registered board's banner is a marker too
+        for device, parser_type in REGISTRY.items():
+            banner = parser_type.grammar.banner
+            if banner and banner not in self.dispatch:
+                self.dispatch[banner] = (-1, '#banner', self.banner_action(device))
+        self.layout_fullmatch = grammar.layout_pattern.fullmatch if grammar.layout_pattern else None
+        self.findall = re.compile(trie_pattern(self.dispatch)).findall if self.dispatch else None
+
+    def initial_state(self):
+        return dict(self.INITIAL_STATE)
+
+    def subscribe_samples(self, callback):
+        """Receive ``callback(channel, value)`` for every numeric reading parsed."""
+        self.sample_subscribers.append(callback)
+
+    def emit_sample(self, channel, value):
+        for callback in self.sample_subscribers:
+            callback(channel, value)
+
+    def subscribe_events(self, callback):
+        """Receive ``callback(event)`` for every typed event (see monitor_core.events)."""
+        self.event_subscribers.append(callback)
+
+    def emit_event(self, event):
+        for callback in self.event_subscribers:
+            callback(event)
+
+    def subscribe_device(self, callback):
+        """Receive ``callback(device)`` whenever a registered board's boot banner is parsed."""
+        self.device_subscribers.append(callback)
+
+    def banner_action(self, device):
+        def on_banner(line, state):
+            if self.detect and device != self.device:
+                self.bind(REGISTRY[device].grammar)
+                state.clear()
+                state.update(self.INITIAL_STATE)
+            for callback in self.device_subscribers:
+                callback(device)
+        return on_banner
+
+    def process(self, line, state):
+        """Apply every matching rule to state; return False if nothing matched."""
+        actions = self.memo.get(line)
+        if actions is None:
+            if self.layout_fullmatch is not None:
+                match = self.layout_fullmatch(line)
+                if match is not None:
+                    on_layout, start, stop = self.layouts[match.lastindex]
+                    on_layout(match.groups()[start:stop], line, state)
+                    return True
+            actions = self.select(line)
+            memo = self.memo
+            if len(memo) >= MEMO_SIZE:
+                memo.clear()
+            memo[line] = actions
+        for action in actions:
+            action(line, state)
+        return bool(actions)
+
+    def select(self, line):
+        """The functions for the markers in line, one per group, in rule order."""
+        found = self.findall(line) if self.findall is not None else ()
+        if not found:
+            return ()
+        if len(found) == 1:
+            # Nearly every firmware line carries exactly one marker
+            return (self.dispatch[found[0]][2],)
+        selected = {}
+        for marker in found:
+            order, group, action = self.dispatch[marker]
+            if group not in selected or order < selected[group][0]:
+                selected[group] = (order, action)
+        return tuple(action for order, action in sorted(selected.values(), key=lambda item: item[0]))
+
+
+def parser_class(spec, name=None):
+    """A GrammarParser subclass for spec, e.g. one read with load_grammar()."""
+    name = name or ''.join(part.title() for part in re.split(r"\W+", spec.get('device', ''))) + 'Parser'
+    return type(name, (GrammarParser,), {'SPEC': spec})
+
+
+def register(parser_type):
+    """Make a board type known to MonitorEngine.for_device(), --device and banner detection."""
+    REGISTRY[parser_type.DEVICE] = parser_type
+    return parser_type
+
+
+def detect_device(line):
+    """The registered device whose boot banner line is, or None."""
+    line = line.strip()
+    for device, parser_type in REGISTRY.items():
+        if parser_type.grammar.banner == line:
+            return device
+    return None
+
+
+def load_grammar(path):
+    """Read a grammar from a JSON file, or a YAML file when PyYAML is installed."""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError(f"PyYAML is needed to read {path}; install it or use a JSON grammar") from None
+            return yaml.safe_load(f)
+        return json.load(f)
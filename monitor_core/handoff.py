@@ -0,0 +1,166 @@
+"""Bounded handoff of work from the background threads to the UI thread.
+
+Background threads never touch UI-owned data. They post calls into a
+Handoff, and the UI thread runs them in batches on its own timer
+(tkui.HandoffPump). Several threads post: the serial reader (lines, state,
+samples, alerts), the error callbacks of the journals and stores, the
+PortWatcher and the ConnectionManager. Posting takes no lock: each producer
+thread gets a lane of its own, a deque only it appends to and only the
+consumer pops from, with counters only it writes. Calls from one thread run
+in the order they were posted; the consumer takes the lanes in turn.
+
+Backpressure policy, once ``max_items`` calls are waiting in a lane:
+
+* any plain post may be dropped and is counted in ``dropped``: console
+  lines, error messages, samples, alerts, port and connection status. The
+  UI shows the count instead of stalling the reader
+* state arrives as the changes the state store publishes, so a dropped
+  delta is not lost: its keys are kept, sent with the next delta, and
+  applied by the pump (flush_unsent) as soon as the queue has drained, so
+  the UI state catches up even when the lines stop
+"""
+import threading
+from collections import deque
+
+DEFAULT_MAX_ITEMS = 10000
+
+
+class Lane:
+    """One producer thread's queue and counters."""
+    __slots__ = ('items', 'posted', 'dropped', 'high_water')
+
+    def __init__(self):
+        self.items = deque()
+        self.posted = 0
+        self.dropped = 0
+        self.high_water = 0
+
+
+class StatePoster:
+    """A state subscriber that posts ``apply(delta)``, with the changes of any dropped deltas merged in.
+
+    The merge of dropped changes is the only part that locks, and only while
+    some are waiting: the reader posts the merge with its next delta, or the
+    UI thread takes it once everything posted before it has run.
+    """
+
+    def __init__(self, handoff, apply):
+        self.handoff = handoff
+        self.apply = apply
+        self.unsent = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, changes):
+        if self.unsent:
+            with self.lock:
+                if self.unsent:
+                    self.unsent.update(changes)
+                    changes = dict(self.unsent)
+                if self.handoff.post(self.apply, changes):
+                    self.unsent.clear()
+                else:
+                    self.unsent.update(changes)
+        elif not self.handoff.post(self.apply, changes):
+            with self.lock:
+                self.unsent.update(changes)
+
+    def flush(self):
+        """UI thread, with the queue empty: apply the changes still waiting after a drop."""
+        if not self.unsent:
+            return False
+        with self.lock:
+            changes = dict(self.unsent)
+            self.unsent.clear()
+        if changes:
+            self.apply(changes)
+        return bool(changes)
+
+
+class Handoff:
+    def __init__(self, max_items=DEFAULT_MAX_ITEMS):
+        self.max_items = max_items
+        # Appended to once per producer thread; list.append is atomic
+        self.lanes = []
+        self.local = threading.local()
+        self.posters = []
+        # Written by the consumer only
+        self.next_lane = 0
+        self.drained = 0
+
+    def new_lane(self):
+        lane = self.local.lane = Lane()
+        self.lanes.append(lane)
+        return lane
+
+    def post(self, function, *args):
+        """Producer side, from any thread: queue function(*args); returns False if it was dropped."""
+        lane = getattr(self.local, 'lane', None) or self.new_lane()
+        items = lane.items
+        depth = len(items)
+        if depth >= self.max_items:
+            lane.dropped += 1
+            return False
+        items.append((function, args))
+        lane.posted += 1
+        if depth >= lane.high_water:
+            lane.high_water = depth + 1
+        return True
+
+    def state_poster(self, apply):
+        """A state subscriber that posts ``apply(delta)``; see StatePoster."""
+        poster = StatePoster(self, apply)
+        self.posters.append(poster)
+        return poster
+
+    def drain(self, limit=None):
+        """Consumer side: run up to `limit` queued calls, each lane's in order; returns how many ran."""
+        lanes = list(self.lanes)
+        ran = 0
+        for offset in range(len(lanes)):
+            items = lanes[(self.next_lane + offset) % len(lanes)].items
+            count = len(items) if limit is None else min(limit - ran, len(items))
+            popleft = items.popleft
+            for _ in range(count):
+                function, args = popleft()
+                function(*args)
+            ran += count
+            if limit is not None and ran >= limit:
+                break
+        if lanes:
+            # The next drain starts at the next lane, so one busy producer cannot starve the others
+            self.next_lane = (self.next_lane + 1) % len(lanes)
+        self.drained += ran
+        return ran
+
+    def flush_unsent(self):
+        """Consumer side: once the queue is empty, apply state changes whose post was dropped."""
+        if self.depth():
+            return False
+        flushed = False
+        for poster in self.posters:
+            flushed |= poster.flush()
+        return flushed
+
+    def depth(self):
+        return sum(len(lane.items) for lane in list(self.lanes))
+
+    @property
+    def posted(self):
+        return sum(lane.posted for lane in list(self.lanes))
+
+    @property
+    def dropped(self):
+        return sum(lane.dropped for lane in list(self.lanes))
+
+    @property
+    def high_water(self):
+        return max((lane.high_water for lane in list(self.lanes)), default=0)
+
+    def stats(self):
+        return {
+            'depth': self.depth(),
+            'posted': self.posted,
+            'drained': self.drained,
+            'dropped': self.dropped,
+            'high_water': self.high_water,
+        }
@@ -0,0 +1,140 @@
+"""Monitor many ESP32 serial ports from one thread.
+
+Every port is registered with a single selector. When a port becomes
+readable its buffered bytes are read in one call, framed into lines and run
+through that device's MonitorEngine (same parser and state store as the
+single-port apps), so one event loop serves dozens of boards.
+
+The selector needs real file descriptors, so the hub runs on POSIX hosts.
+"""
+import os
+import selectors
+import threading
+import time
+
+from monitor_core.engine import MonitorEngine
+from monitor_core.serial_reader import LineFramer, DEFAULT_READ_TIMEOUT, DEFAULT_CHUNK_SIZE
+
+
+class HubDevice:
+    def __init__(self, name, device_type, port, engine):
+        self.name = name
+        self.device_type = device_type
+        self.port = port
+        self.fd = port.fileno()
+        self.engine = engine
+        self.framer = LineFramer()
+        self.bytes_read = 0
+        self.lines_read = 0
+
+
+class MonitorHub:
+    def __init__(self, read_timeout=DEFAULT_READ_TIMEOUT, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.read_timeout = read_timeout
+        self.chunk_size = chunk_size
+        self.selector = selectors.DefaultSelector()
+        self.devices = {}
+        self.running = False
+        self.thread = None
+        self.lines_total = 0
+        self.bytes_total = 0
+        self.started_at = None
+        self.disconnect_subscribers = []
+        # Optional profiling.StageProfiler, shared with every device engine
+        self.profiler = None
+
+    def add_device(self, name, device_type, port):
+        """Register an opened port; returns the HubDevice so callers can subscribe to its engine."""
+        if name in self.devices:
+            raise ValueError(f"Device '{name}' is already registered")
+        device = HubDevice(name, device_type, port, MonitorEngine.for_device(device_type))
+        device.engine.profiler = self.profiler
+        self.devices[name] = device
+        self.selector.register(device.fd, selectors.EVENT_READ, device)
+        return device
+
+    def remove_device(self, name):
+        device = self.devices.pop(name)
+        self.selector.unregister(device.fd)
+        return device
+
+    def subscribe_disconnects(self, callback):
+        self.disconnect_subscribers.append(callback)
+
+    def poll(self, timeout=None):
+        """Wait for readable ports once and process what arrived; returns lines processed."""
+        processed = 0
+        for key, _ in self.selector.select(self.read_timeout if timeout is None else timeout):
+            device = key.data
+            profiler = self.profiler
+            if profiler is not None:
+                started = time.perf_counter()
+            try:
+                data = os.read(device.fd, self.chunk_size)
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                # Counted on the engine, as its own read loop does, so monitor_read_errors_total sees it
+                device.engine.read_errors += 1
+                device.engine.report_error(f"Serial port lost: {e}")
+                data = b''
+
+            if not data:
+                # EOF / EIO: the board was unplugged or the port closed under us
+                self.remove_device(device.name)
+                for callback in self.disconnect_subscribers:
+                    callback(device)
+                continue
+
+            lines = device.framer.feed(data)
+            process_line = device.engine.process_line
+            if profiler is not None:
+                read_at = time.perf_counter()
+                profiler.record('read', read_at - started)
+                for line in lines:
+                    profiler.record('queue', time.perf_counter() - read_at)
+                    process_line(line)
+            else:
+                for line in lines:
+                    process_line(line)
+
+            device.bytes_read += len(data)
+            device.lines_read += len(lines)
+            self.bytes_total += len(data)
+            processed += len(lines)
+        self.lines_total += processed
+        return processed
+
+    def run(self):
+        self.started_at = time.monotonic()
+        while self.running:
+            if not self.devices:
+                time.sleep(self.read_timeout)
+                continue
+            self.poll()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        self.running = False
+        if self.thread is not None and timeout is not None:
+            self.thread.join(timeout)
+
+    def close(self):
+        self.stop()
+        self.selector.close()
+
+    def state_table(self):
+        return {name: dict(device.engine.current_data) for name, device in self.devices.items()}
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            'devices': len(self.devices),
+            'lines': self.lines_total,
+            'bytes': self.bytes_total,
+            'lines_per_sec': self.lines_total / elapsed if elapsed else 0.0,
+        }
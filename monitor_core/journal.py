@@ -0,0 +1,388 @@
+"""Crash-safe journal of every line a monitor parses, with group commit.
+
+If the process dies, the state and the console can be rebuilt from here:
+every raw line is appended as a record, and replaying the lines through the
+parser yields the same state (and events) the live engine had. A directory
+holds numbered segment files, each starting with MAGIC and then records:
+
+    length   uint32  size of the body
+    crc      uint32  zlib.crc32 of the body
+    body     kind (uint8), ts_ns (int64, time.time_ns()), payload
+
+LINE records carry the UTF-8 line; a STATE record carries the engine's
+state as JSON. The reader thread only appends the line and its timestamp
+to a pending list; a writer thread encodes everything pending and writes it
+with one write and one fsync every ``interval`` seconds. A crash loses at
+most the last interval's lines, and a torn record at the end is detected by
+its length or checksum and cut off. If the disk stalls and ``max_pending``
+records pile up, the oldest are dropped and reported to the error
+subscribers, and a new segment starts with a checkpoint, so recovery never
+replays across the gap.
+
+Once a segment passes ``segment_bytes`` the next one starts with a STATE
+checkpoint taken on the reader thread, so recovery reads only the newest
+segment, whatever the size of the journal. Retention prunes all but the
+newest ``keep_segments`` segments, which only hold console history.
+Segments are never compacted (rewritten as a checkpoint plus the lines
+after it): each one is already written in that form, so rewriting would
+only shorten the console history recovery can show.
+
+    journal = EventJournal('journal')
+    recovered = journal.recover(engine)
+    journal.attach(engine)
+"""
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+
+from monitor_core.parsers import PARSERS
+
+MAGIC = b'SHJRNL1\n'
+FRAME = struct.Struct('<II')
+BODY = struct.Struct('<Bq')
+LINE = 1
+STATE = 2
+
+DEFAULT_INTERVAL = 0.05
+DEFAULT_SEGMENT_BYTES = 16 << 20
+DEFAULT_KEEP_SEGMENTS = 8
+DEFAULT_CONSOLE_LINES = 1000
+# Past this many unwritten lines the writer is woken early instead of waiting out the interval
+WAKE_PENDING = 50000
+# Past this many the oldest tenth is dropped, so a stalled disk cannot exhaust memory
+DEFAULT_MAX_PENDING = 1000000
+# Frame and body headers, for sizing segments before the lines are encoded
+RECORD_OVERHEAD = FRAME.size + BODY.size
+
+fdatasync = getattr(os, 'fdatasync', os.fsync)
+
+
+def encode_record(kind, ts_ns, payload):
+    body = BODY.pack(kind, ts_ns) + payload
+    return FRAME.pack(len(body), zlib.crc32(body)) + body
+
+
+def read_segment(path):
+    """Return ([(kind, ts_ns, payload), ...], valid_end, size) for one segment file.
+
+    Reading stops at the first record that is cut short or fails its
+    checksum; valid_end is the offset just past the last good record.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    size = len(data)
+    if not data.startswith(MAGIC):
+        return [], 0, size
+    records = []
+    view = memoryview(data)
+    frame_size = FRAME.size
+    body_size = BODY.size
+    unpack_frame = FRAME.unpack_from
+    unpack_body = BODY.unpack_from
+    crc32 = zlib.crc32
+    pos = len(MAGIC)
+    while pos + frame_size <= size:
+        length, crc = unpack_frame(data, pos)
+        start = pos + frame_size
+        end = start + length
+        if length < body_size or end > size or crc32(view[start:end]) != crc:
+            break
+        kind, ts_ns = unpack_body(data, start)
+        records.append((kind, ts_ns, data[start + body_size:end]))
+        pos = end
+    view.release()
+    return records, pos, size
+
+
+def sync_directory(directory):
+    # Makes a new segment's directory entry durable; not possible (or needed) on Windows
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class EventJournal:
+    def __init__(self, directory, interval=DEFAULT_INTERVAL, segment_bytes=DEFAULT_SEGMENT_BYTES,
+                 keep_segments=DEFAULT_KEEP_SEGMENTS, max_pending=DEFAULT_MAX_PENDING):
+        self.directory = directory
+        self.interval = interval
+        self.segment_bytes = segment_bytes
+        self.keep_segments = max(1, keep_segments)
+        self.max_pending = max(10, max_pending)
+        os.makedirs(directory, exist_ok=True)
+        self.engine = None
+        # (ts_ns, line) pairs, and encoded checkpoints, each of which starts a new segment. Only the
+        # reader thread appends; both threads popleft, which is atomic, so it needs no lock
+        self.pending = deque()
+        self.segment_used = 0
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread = None
+        self.error_subscribers = []
+        # Owned by the writer thread
+        self.file = None
+        self.segment = None
+        self.synced_size = 0
+        self.appended = 0
+        self.dropped = 0
+        self.written = 0
+        self.flushes = 0
+        self.pruned = 0
+
+    def subscribe_errors(self, callback):
+        self.error_subscribers.append(callback)
+
+    def segment_path(self, index):
+        return os.path.join(self.directory, f"{index:08d}.journal")
+
+    def segments(self):
+        return sorted(int(name[:-8]) for name in os.listdir(self.directory)
+                      if name.endswith('.journal') and name[:-8].isdigit())
+
+    def recover(self, engine, console_lines=DEFAULT_CONSOLE_LINES):
+        """Rebuild engine's state from the journal; call before the engine starts reading.
+
+        The newest checkpoint is loaded and the lines after it are run
+        through a fresh parser of the engine's type, with no subscribers, so
+        nothing downstream sees them twice. A torn tail is cut off. Returns
+        stats, including the last ``console_lines`` lines for the console.
+        """
+        started = time.perf_counter()
+        segments = self.segments()
+        records = []
+        read = 0
+        truncated = 0
+        for position in range(len(segments) - 1, -1, -1):
+            path = self.segment_path(segments[position])
+            records, valid_end, size = read_segment(path)
+            read += valid_end
+            if valid_end < size:
+                truncated += size - valid_end
+                with open(path, 'r+b') as f:
+                    f.truncate(valid_end)
+            if records and records[0][0] == STATE:
+                break
+            # Only a segment that crashed before its first checkpoint was synced can lack one
+            os.remove(path)
+            records = []
+
+        lines = deque(maxlen=console_lines)
+        replayed = 0
+        errors = 0
+        if records:
+            checkpoint = json.loads(records[0][2].decode('utf-8'))
+            stamp = [None, None]
+
+            def clock():
+                return stamp[1]
+
+            parser = type(engine.parser)(clock=clock)
+            device = checkpoint.get('device')
+            if device != parser.device and device in PARSERS:
+                parser.bind(PARSERS[device].grammar)
+            state = checkpoint['state']
+            process = parser.process
+            for kind, ts_ns, payload in records[1:]:
+                if kind != LINE:
+                    continue
+                second = ts_ns // 1000000000
+                if second != stamp[0]:
+                    stamp[0] = second
+                    stamp[1] = datetime.fromtimestamp(second).strftime("%H:%M:%S")
+                line = payload.decode('utf-8', errors='replace')
+                try:
+                    process(line, state)
+                    state['last_update'] = stamp[1]
+                except Exception:
+                    errors += 1
+                lines.append(line)
+                replayed += 1
+            if engine.parser.detect and parser.device != engine.parser.device:
+                engine.parser.bind(parser.grammar)
+            engine.current_data.clear()
+            engine.current_data.update(state)
+            # Already the state subscribers start from: the first line must not re-send every recovered key
+            engine.state.published = dict(state)
+        return {
+            'lines': list(lines),
+            'replayed': replayed,
+            'errors': errors,
+            'bytes': read,
+            'truncated': truncated,
+            'seconds': time.perf_counter() - started,
+        }
+
+    def attach(self, engine):
+        """Journal every line engine parses from now on and start the writer; call before the engine starts."""
+        self.engine = engine
+        engine.subscribe_lines(self.append_line)
+        return self.start()
+
+    def checkpoint_record(self):
+        engine = self.engine
+        payload = json.dumps({'device': engine.parser.device, 'state': engine.current_data}, ensure_ascii=False)
+        return encode_record(STATE, time.time_ns(), payload.encode('utf-8'))
+
+    def append_line(self, line):
+        """A line subscriber: queue the line for the next group commit."""
+        pending = self.pending
+        pending.append((time.time_ns(), line))
+        self.appended += 1
+        # Counted in characters: segments only need to be about segment_bytes long
+        self.segment_used += len(line) + RECORD_OVERHEAD
+        if len(pending) >= self.max_pending:
+            self.drop_oldest()
+        if self.segment_used >= self.segment_bytes:
+            # Taken here, on the reader thread, the checkpoint matches exactly the lines before it
+            # One item, so the writer and drop_oldest() can never take the checkpoint apart from its segment
+            checkpoint = self.checkpoint_record()
+            pending.append(checkpoint)
+            self.segment_used = len(checkpoint)
+        if len(pending) >= WAKE_PENDING:
+            self.wakeup.set()
+
+    def drop_oldest(self):
+        """Reader thread, when the writer is max_pending records behind: drop the oldest tenth."""
+        pending = self.pending
+        popleft = pending.popleft
+        dropped = 0
+        try:
+            for _ in range(self.max_pending // 10):
+                if type(popleft()) is tuple:
+                    dropped += 1
+        except IndexError:
+            # The writer took the rest meanwhile
+            pass
+        self.dropped += dropped
+        # Replaying lines on top of an older checkpoint would skip the dropped ones: start a new
+        # segment with a checkpoint taken after the gap
+        self.segment_used = self.segment_bytes
+        for callback in self.error_subscribers:
+            callback(f"Journal writer fell behind: dropped the {dropped} oldest lines ({self.dropped} in total)")
+
+    def open_segment(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        segments = self.segments()
+        index = segments[-1] + 1 if segments else 1
+        self.file = open(self.segment_path(index), 'wb')
+        self.file.write(MAGIC)
+        self.file.flush()
+        fdatasync(self.file.fileno())
+        sync_directory(self.directory)
+        self.segment = index
+        self.synced_size = len(MAGIC)
+
+    def write(self, data):
+        self.file.write(data)
+        self.file.flush()
+        fdatasync(self.file.fileno())
+        self.synced_size += len(data)
+
+    def flush(self):
+        """Write and fsync everything pending; returns the number of records written."""
+        pending = self.pending
+        popleft = pending.popleft
+        batch = []
+        try:
+            for _ in range(len(pending)):
+                batch.append(popleft())
+        except IndexError:
+            # The reader dropped the oldest records meanwhile
+            pass
+        if not batch:
+            return 0
+        done = 0
+        rotated = False
+        try:
+            while done < len(batch):
+                if type(batch[done]) is bytes:
+                    self.open_segment()
+                    rotated = True
+                end = done + 1
+                while end < len(batch) and type(batch[end]) is not bytes:
+                    end += 1
+                self.write(b''.join(
+                    item if type(item) is bytes else encode_record(LINE, item[0], item[1].encode('utf-8'))
+                    for item in batch[done:end]))
+                done = end
+        except OSError as e:
+            # Cut back to the last synced record so a retry never lands behind a torn one
+            try:
+                self.file.truncate(self.synced_size)
+                self.file.seek(self.synced_size)
+            except (OSError, AttributeError, ValueError):
+                pass
+            pending.extendleft(reversed(batch[done:]))
+            for callback in self.error_subscribers:
+                callback(f"Journal write failed: {e}")
+            return 0
+        written = len(batch)
+        self.written += written
+        self.flushes += 1
+        if rotated:
+            self.prune()
+        return written
+
+    def prune(self):
+        """Delete all but the newest keep_segments segments; the newest checkpoint makes them redundant."""
+        for index in self.segments()[:-self.keep_segments]:
+            try:
+                os.remove(self.segment_path(index))
+                self.pruned += 1
+            except OSError as e:
+                for callback in self.error_subscribers:
+                    callback(f"Journal pruning failed: {e}")
+
+    def run(self):
+        while self.running:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            self.flush()
+        self.flush()
+
+    def start(self):
+        # Every run starts a segment of its own, led by a checkpoint of the state it starts from
+        checkpoint = self.checkpoint_record()
+        self.open_segment()
+        self.write(checkpoint)
+        self.segment_used = self.synced_size
+        self.prune()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self.running = False
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def close(self):
+        self.stop()
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def stats(self):
+        return {
+            'appended': self.appended,
+            'dropped': self.dropped,
+            'written': self.written,
+            'flushes': self.flushes,
+            'pending': len(self.pending),
+            'segment': self.segment,
+            'pruned': self.pruned,
+        }
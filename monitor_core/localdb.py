@@ -0,0 +1,151 @@
+"""Local stand-in for the Firebase Realtime Database REST API.
+
+Serves one in-memory JSON tree over HTTP with the subset of the REST API the
+monitors use: GET, PUT, PATCH (multi-path updates), POST (push) and DELETE
+on ``/<path>.json``. It counts requests per method, so benchmarks and offline
+runs can point RestBackend at it instead of a real project.
+
+    python -m monitor_core.localdb --port 9000
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from monitor_core.firebase import set_path
+
+
+class DatabaseHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def db_path(self):
+        path = self.path.split('?', 1)[0]
+        if not path.endswith('.json'):
+            return None
+        return path[:-len('.json')].strip('/')
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_method(self, method):
+        path = self.db_path()
+        if path is None:
+            self.reply(404, {'error': "paths must end in .json"})
+            return
+        try:
+            body = self.read_body() if method != 'GET' and method != 'DELETE' else None
+        except ValueError:
+            self.reply(400, {'error': "invalid JSON"})
+            return
+        self.reply(200, self.server.database.apply(method, path, body))
+
+    def do_GET(self):
+        self.handle_method('GET')
+
+    def do_PUT(self):
+        self.handle_method('PUT')
+
+    def do_PATCH(self):
+        self.handle_method('PATCH')
+
+    def do_POST(self):
+        self.handle_method('POST')
+
+    def do_DELETE(self):
+        self.handle_method('DELETE')
+
+
+class LocalRealtimeDatabase:
+    def __init__(self, host='127.0.0.1', port=0):
+        self.tree = {}
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.server = ThreadingHTTPServer((host, port), DatabaseHandler)
+        self.server.database = self
+        self.thread = None
+        self.push_counter = 0
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def get(self, path=''):
+        node = self.tree
+        for key in path.split('/'):
+            if not key:
+                continue
+            if not isinstance(node, dict) or key not in node:
+                return None
+            node = node[key]
+        return node
+
+    def apply(self, method, path, body):
+        with self.lock:
+            self.requests[method] = self.requests.get(method, 0) + 1
+            if method == 'GET':
+                return self.get(path)
+            if method == 'PUT':
+                self.put(path, body)
+                return body
+            if method == 'PATCH':
+                for child, value in body.items():
+                    self.put(f"{path}/{child}" if path else child, value)
+                return body
+            if method == 'POST':
+                self.push_counter += 1
+                name = f"-{time.time_ns():x}{self.push_counter:04d}"
+                self.put(f"{path}/{name}" if path else name, body)
+                return {'name': name}
+            self.put(path, None)
+            return None
+
+    def put(self, path, value):
+        if path.strip('/'):
+            set_path(self.tree, path, value)
+        else:
+            self.tree = value if isinstance(value, dict) else {}
+
+    def request_count(self):
+        return sum(self.requests.values())
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='monitor_core.localdb', description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    args = parser.parse_args(argv)
+
+    database = LocalRealtimeDatabase(args.host, args.port)
+    print(f"Serving a local Realtime Database at {database.url}")
+    try:
+        database.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        database.server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,309 @@
+"""Prometheus text-format metrics for the monitors, without extra dependencies.
+
+Counters, gauges and histograms live in a MetricsRegistry and are served by
+MetricsServer at ``/metrics``. Every series is written by a single thread
+(the reader thread that owns its device), so updates are plain attribute
+increments with no locks; a scrape that races an update sees a value at most
+one observation old. Values that already exist elsewhere, like the reader's
+byte count or the engine's status fields, are read at scrape time (by a
+series function or a registry collector) and cost nothing per line.
+
+    registry = MetricsRegistry()
+    instrument_engine(registry, engine, 'smarthome')
+    MetricsServer(registry, port=9108).start()
+"""
+import bisect
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Per-line parse time: from a few microseconds (fast path) to pathological lines
+LINE_SECONDS_BUCKETS = (5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 5e-3, 0.025)
+
+# State fields exported as monitor_status; each has a handful of values, so the label stays small
+STATUS_KEYS = ('wifi_status', 'firebase_status', 'motion', 'door', 'relay_status', 'food_alert',
+               'food_present', 'access_status')
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values, extra=()):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class CounterChild:
+    __slots__ = ('value', 'function')
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def set_function(self, function):
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class GaugeChild(CounterChild):
+    __slots__ = ()
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class HistogramChild:
+    __slots__ = ('upper_bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, upper_bounds):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * len(upper_bounds)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        # upper_bounds ends in +Inf, so every value lands in a bucket
+        self.counts[bisect.bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    TYPE = 'untyped'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *values):
+        """The series for these label values, created on first use."""
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self.lock:
+                child = self.children.setdefault(values, self.new_child())
+        return child
+
+    def new_child(self):
+        raise NotImplementedError
+
+    def render(self, out):
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} {self.TYPE}")
+        for values, child in list(self.children.items()):
+            out.append(f"{self.name}{format_labels(self.labelnames, values)} {format_value(child.get())}")
+
+
+class Counter(Metric):
+    TYPE = 'counter'
+
+    def new_child(self):
+        return CounterChild()
+
+
+class Gauge(Metric):
+    TYPE = 'gauge'
+
+    def new_child(self):
+        return GaugeChild()
+
+
+class Histogram(Metric):
+    TYPE = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LINE_SECONDS_BUCKETS):
+        super().__init__(name, help, labelnames)
+        bounds = sorted(buckets)
+        if bounds[-1] != math.inf:
+            bounds.append(math.inf)
+        self.upper_bounds = tuple(bounds)
+
+    def new_child(self):
+        return HistogramChild(self.upper_bounds)
+
+    def render(self, out):
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} {self.TYPE}")
+        for values, child in list(self.children.items()):
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds, list(child.counts)):
+                cumulative += count
+                labels = format_labels(self.labelnames, values, (('le', format_value(bound)),))
+                out.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labelnames, values)
+            out.append(f"{self.name}_sum{labels} {format_value(child.sum)}")
+            out.append(f"{self.name}_count{labels} {child.count}")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        # Called before every render to update series from state kept elsewhere
+        self.collectors = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        # Registering a name twice returns the existing family, so several devices can share it
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is None:
+                self.metrics[metric.name] = metric
+                return metric
+        if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+            raise ValueError(f"Metric '{metric.name}' is already registered with a different type or labels")
+        return existing
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LINE_SECONDS_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def render(self):
+        # Scrapes are served on several threads; the lock keeps each collector's series to one writer
+        with self.lock:
+            for collector in self.collectors:
+                collector()
+        out = []
+        for metric in list(self.metrics.values()):
+            metric.render(out)
+        return '\n'.join(out) + '\n'
+
+
+def instrument_engine(registry, engine, device, bytes_read=None):
+    """Export a MonitorEngine's throughput, errors, parse latency, sensor values and status fields.
+
+    ``bytes_read`` returns the device's byte count at scrape time; by default
+    it is read from the engine's serial reader.
+    """
+    lines = registry.counter('monitor_lines_total', "Lines parsed", ('device',)).labels(device)
+    parse_errors = registry.counter('monitor_parse_errors_total', "Lines whose parsing raised",
+                                    ('device',)).labels(device)
+    read_errors = registry.counter('monitor_read_errors_total', "Serial read or decode errors",
+                                   ('device',)).labels(device)
+    seconds = registry.histogram('monitor_line_processing_seconds', "Time to parse a line and publish the state",
+                                 ('device',)).labels(device)
+    sensors = registry.gauge('monitor_sensor_value', "Latest numeric sensor reading", ('device', 'channel'))
+
+    if bytes_read is None:
+        def bytes_read():
+            reader = engine.reader
+            return reader.bytes_read if reader is not None else 0
+    # Parse errors are reported to the error subscribers too, so read errors are the engine's own count
+    read_errors.set_function(lambda: engine.read_errors)
+    registry.counter('monitor_bytes_read_total', "Bytes read from the serial port",
+                     ('device',)).labels(device).set_function(bytes_read)
+
+    # Every parsed line is observed once, so the line count is the histogram's count
+    lines.set_function(lambda: seconds.count)
+    counts = seconds.counts
+    upper_bounds = seconds.upper_bounds
+    bisect_left = bisect.bisect_left
+
+    def observe_line(elapsed, ok):
+        # HistogramChild.observe, inlined: this runs for every line
+        counts[bisect_left(upper_bounds, elapsed)] += 1
+        seconds.sum += elapsed
+        seconds.count += 1
+        if not ok:
+            parse_errors.value += 1
+
+    channel_gauges = {channel: sensors.labels(device, channel) for channel in engine.parser.CHANNELS}
+
+    def record_sample(channel, value):
+        gauge = channel_gauges.get(channel)
+        if gauge is None:
+            gauge = channel_gauges[channel] = sensors.labels(device, channel)
+        gauge.value = value
+
+    # One series per value a status field has had: 1 for the current value, 0 for the earlier ones.
+    # Read from the engine's state at scrape time: a state subscriber would make every line pay for the diff.
+    status = registry.gauge('monitor_status', "Current value of a status field", ('device', 'field', 'value'))
+    current = {}
+
+    def collect_status():
+        current_data = engine.current_data
+        for key in STATUS_KEYS:
+            value = current_data.get(key)
+            if value is None:
+                continue
+            gauge = status.labels(device, key, value)
+            previous = current.get(key)
+            if previous is not gauge:
+                if previous is not None:
+                    previous.value = 0
+                current[key] = gauge
+            gauge.value = 1
+
+    engine.line_observer = observe_line
+    engine.parser.subscribe_samples(record_sample)
+    registry.add_collector(collect_status)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer:
+    def __init__(self, registry, host='127.0.0.1', port=9108):
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.registry = registry
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,213 @@
+"""The built-in boards' line grammars and their parsers.
+
+Both boards share the WiFi rules, which accept every spelling either
+firmware prints. See monitor_core/grammar.py for the rule keys.
+"""
+from monitor_core.alerts import rule_spec
+from monitor_core.grammar import GrammarParser, REGISTRY, register, now_hms
+
+NUMBER = r"[\d.]+"
+# The display text switches at the alert rules' thresholds, which are kept only there
+GAS_LEAK = rule_spec('gas_leak', 'smarthome')
+FLAME = rule_spec('flame', 'smarthome')
+# Stricter than the unauthorized-line pattern below, which also matches the "D" in "UID"
+CARD_UID = r"\b([0-9A-F]{2}(?::[0-9A-F]{2})+)\b"
+
+WIFI_RULES = [
+    {'group': 'wifi', 'when': ["Connected to WiFi", "Connected to Wi-Fi", "WiFi connected"],
+     'set': {'wifi_status': "Connected"}},
+    {'group': 'wifi', 'when': ["Failed to connect", "WiFi connection failed"],
+     'set': {'wifi_status': "Failed"}},
+]
+
+SMART_HOME = {
+    'device': 'smarthome',
+    'banner': "=== ESP32 Smart Home System ===",
+    'channels': ['temperature', 'humidity', 'light', 'gas', 'flame'],
+    'state': {
+        'temperature': '--',
+        'humidity': '--',
+        'light': '--',
+        'motion': 'No Motion',
+        'door': 'Closed',
+        'gas': 'Normal',
+        'flame': 'Normal',
+        'wifi_status': 'Unknown',
+        'firebase_status': 'Unknown',
+        'last_update': 'Never'
+    },
+    'rules': WIFI_RULES + [
+        {'group': 'firebase', 'when': "Firebase.ready(): true", 'set': {'firebase_status': "Ready"}},
+        {'group': 'firebase', 'when': "Firebase.ready(): false", 'set': {'firebase_status': "Not Ready"}},
+        {'group': 'firebase', 'when': ["Firebase signup OK", "Firebase signup successful"],
+         'set': {'firebase_status': "Connected"}},
+        # "Environment -> Temp: 25.50°C  Humidity: 60.00%  Light: 3.25V"
+        {'when': "Environment ->",
+         'layout': rf"Environment -> Temp:\s*(?P<temperature>{NUMBER})\S*\s+Humidity:\s*(?P<humidity>{NUMBER})\S*"
+                   rf"\s+Light:\s*(?P<light>{NUMBER})\S*",
+         'fields': {'temperature': rf"Temp:\s*({NUMBER})", 'humidity': rf"Humidity:\s*({NUMBER})",
+                    'light': rf"Light:\s*({NUMBER})"},
+         'types': {'temperature': 'float', 'humidity': 'float', 'light': 'float'},
+         'store': ['temperature', 'humidity', 'light'],
+         'samples': ['temperature', 'humidity', 'light'],
+         'event': ['EnvironmentReading', 'temperature', 'humidity', 'light']},
+        # "Security -> Motion: YES | Door: OPEN | Gas: 450"
+        {'when': "Security ->",
+         'layout': rf"Security -> Motion: (?P<motion>YES|NO) \| Door: (?P<door>OPEN|CLOSED) \| Gas:\s*(?P<gas>{NUMBER})",
+         'fields': {'motion': r"Motion: (YES|NO)", 'door': r"Door: (OPEN|CLOSED)", 'gas': rf"\|\s*Gas:\s*({NUMBER})"},
+         'types': {'motion': {'YES': True, 'NO': False}, 'door': {'OPEN': True, 'CLOSED': False}, 'gas': 'float'},
+         'map': {'motion': {'YES': "Motion YES", 'NO': "No Motion"}, 'door': {'OPEN': "OPEN", 'CLOSED': "Closed"}},
+         'display': {'gas': {'above': GAS_LEAK['above'], 'then': "GAS LEAK!", 'else': "Normal ({:.0f})"}},
+         'samples': ['gas'],
+         'event': ['SecurityReading', 'motion', 'door', 'gas']},
+        # "| flame: 1234"
+        {'when': "| flame:",
+         'layout': rf"\|\s*flame:\s*(?P<flame>{NUMBER})",
+         'types': {'flame': 'float'},
+         'require': ['flame'],
+         'display': {'flame': {'below': FLAME['below'], 'then': "FIRE DETECTED!", 'else': "Normal ({:.0f})"}},
+         'samples': ['flame'],
+         'event': ['FlameReading', 'flame']},
+        # "| status: Detected" or "| status: norm"
+        {'when': "| status:",
+         'cases': [
+             {'contains': "Detected", 'set': {'flame': "FIRE DETECTED!"}},
+             # Don't override if already detected
+             {'contains': "norm", 'unless': {'flame': "FIRE"}, 'set': {'flame': "Normal"}},
+         ]},
+        {'when': "Door Opened - Alarm Triggered", 'set': {'door': "OPEN - ALARM!"}},
+        {'when': "Fire Detected - Alarm Triggered", 'set': {'flame': "FIRE DETECTED - ALARM!"}},
+    ],
+}
+
+FED = "✅ Fed"
+SKIPPED = "⏭️ Skipped"
+
+
+def feeding_slot(slot, markers):
+    key = 'feeding_' + slot
+    return {'when': markers, 'const': {'slot': slot},
+            'cases': [
+                {'contains': "Fed", 'set': {key: FED}, 'const': {'fed': True}},
+                {'contains': "Skipped", 'set': {key: SKIPPED}, 'const': {'fed': False}},
+            ],
+            'event': ['FeedEvent', 'slot', 'fed']}
+
+
+PET_FEEDER = {
+    'device': 'petfeeder',
+    'banner': "=== ESP32 Pet Feeder System ===",
+    'channels': ['food_distance', 'ir_sensor'],
+    'state': {
+        'food_distance': '--',
+        'food_alert': 'Unknown',
+        'food_present': 'Unknown',
+        'ir_sensor': '--',
+        'relay_status': 'OFF',
+        'last_access': 'Never',
+        'last_feed': 'Never',
+        'last_uid': '--',
+        'access_status': '--',
+        'unauthorized_uid': '--',
+        'feeding_7am': '--',
+        'feeding_12pm': '--',
+        'feeding_7pm': '--',
+        'wifi_status': 'Unknown',
+        'firebase_status': 'Unknown',
+        'last_update': 'Never'
+    },
+    'rules': WIFI_RULES + [
+        {'when': "Firebase.ready():",
+         'cases': [
+             {'icontains': "true", 'set': {'firebase_status': "Ready (true)"}},
+             {'set': {'firebase_status': "Not Ready (false)"}},
+         ]},
+        {'when': "RFID Detected:",
+         'layout': r"RFID Detected:\s*(?P<last_uid>[A-F0-9:]+)",
+         'require': ['last_uid'],
+         'const': {'authorized': None},
+         'store': ['last_uid'],
+         'event': ['RfidEvent', 'last_uid', 'authorized']},
+        # The decision lines rarely repeat the UID; the event falls back to the last card scanned
+        {'group': 'authorized', 'when': ["Authorized ID detected", "✅ Authorized"],
+         'fields': {'uid': CARD_UID},
+         'recall': {'uid': 'last_uid'},
+         'const': {'authorized': True},
+         'set': {'access_status': "Authorized"},
+         'event': ['RfidEvent', 'uid', 'authorized']},
+        {'group': 'unauthorized', 'when': ["Unauthorized UID", "❌ Unauthorized"],
+         'fields': {'unauthorized_uid': r"([A-F0-9:]+)", 'uid': CARD_UID},
+         'recall': {'uid': 'last_uid'},
+         'const': {'authorized': False},
+         'set': {'access_status': "Unauthorized"},
+         'store': ['unauthorized_uid'],
+         'event': ['RfidEvent', 'uid', 'authorized']},
+        {'when': "Opening Servo 1", 'const': {'servo': 1}, 'stamp': ['last_access'],
+         'event': ['ServoEvent', 'servo']},
+        # "Scheduled feeding time" only announces the feed; the servo opens on the next line
+        {'group': 'feed', 'when': "Scheduled feeding time", 'stamp': ['last_feed']},
+        {'group': 'feed', 'when': "Opening Servo 2", 'const': {'servo': 2}, 'stamp': ['last_feed'],
+         'event': ['ServoEvent', 'servo']},
+        {'when': "Relay:",
+         'cases': [
+             {'contains': "ON", 'set': {'relay_status': "ON"}},
+             {'set': {'relay_status': "OFF"}},
+         ]},
+        {'when': ["Food container distance:", "food container distance:"],
+         'layout': r"[Ff]ood container distance:\s*(?P<food_distance>\d+)\s*cm",
+         'fields': {'food_distance': r"distance:\s*(\d+)\s*cm"},
+         'types': {'food_distance': 'int'},
+         'require': ['food_distance'],
+         'store': ['food_distance'],
+         'samples': ['food_distance'],
+         'event': ['FoodLevelReading', 'food_distance']},
+        {'group': 'food_alert', 'when': ["Food level low", "Food level Low"], 'set': {'food_alert': "Food level low"}},
+        {'group': 'food_alert', 'when': ["Food level OK", "Food Status: Normal"], 'set': {'food_alert': "OK"}},
+        {'when': "IR Sensor:",
+         'layout': r"IR Sensor:\s*(?P<ir_sensor>\d+)",
+         'require': ['ir_sensor'],
+         'store': ['ir_sensor'],
+         'samples': ['ir_sensor']},
+        {'when': "Food Present:",
+         'cases': [
+             {'contains': "Yes", 'set': {'food_present': "Yes"}},
+             {'set': {'food_present': "No"}},
+         ]},
+        feeding_slot('7am', ["7 AM:", "7am"]),
+        feeding_slot('12pm', ["12 PM:", "12pm"]),
+        feeding_slot('7pm', ["7 PM:", "7pm"]),
+        # Firebase debug messages, e.g. "[OK] /petFeeder/lastFeed = 12:00:03"
+        {'when': "[OK]",
+         'fields': {'value': r"=\s*(.*\S)"},
+         'require': ['value'],
+         'cases': [
+             {'contains': "/petFeeder/lastAccess", 'store': {'last_access': 'value'}},
+             {'contains': "/petFeeder/lastFeed", 'store': {'last_feed': 'value'}},
+         ]},
+    ],
+}
+
+
+class SmartHomeParser(GrammarParser):
+    SPEC = SMART_HOME
+
+
+class PetFeederParser(GrammarParser):
+    SPEC = PET_FEEDER
+
+
+class AutoDetectParser(GrammarParser):
+    """Parses nothing until a board's boot banner names its type, then parses as that board."""
+    SPEC = {'device': 'auto', 'state': {'last_update': 'Never'}}
+
+    def __init__(self, clock=None):
+        super().__init__(clock=clock or now_hms, detect=True)
+
+
+register(SmartHomeParser)
+register(PetFeederParser)
+register(AutoDetectParser)
+
+# Device type -> parser class; grammars registered later (e.g. --grammar) appear here too
+PARSERS = REGISTRY
+AUTO = AutoDetectParser.DEVICE
@@ -0,0 +1,177 @@
+"""Where does a line's time go? Per-stage latency and opt-in profilers.
+
+StageProfiler keeps the last ``window`` durations of each stage a line goes
+through and reports p50/p99/max:
+
+    read         reading one chunk from the port (per chunk, not per line)
+    queue        from that chunk's read to the start of parsing this line
+    parse        parser.process
+    apply        stamping, publishing the state and running line subscribers
+    render_wait  from the oldest line not yet on screen to its frame starting
+                 (the Tk ``after`` queue)
+    render       the frame itself: console flush and label reconfiguration
+
+Attach it with ``engine.profiler = profiler`` (and ``renderer.profiler`` in
+the Tk apps); when unset the hot path does no timing at all.
+
+For whole-process profiles there are two opt-in capture modes, both written
+when the monitor exits: cProfile on the reader thread (``profile_calls``) and
+SamplingProfiler, which samples every thread's stack and writes collapsed
+stacks that flame graph tools read.
+"""
+import collections
+import io
+import os
+import pstats
+import sys
+import threading
+
+STAGES = ('read', 'queue', 'parse', 'apply', 'render_wait', 'render')
+DEFAULT_WINDOW = 4096
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def format_seconds(seconds):
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.1f}us"
+
+
+class StageProfiler:
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.samples = {stage: collections.deque(maxlen=window) for stage in STAGES}
+        self.counts = dict.fromkeys(STAGES, 0)
+        # perf_counter of the oldest applied line that has not been rendered yet
+        self.unrendered_since = None
+
+    def record(self, stage, seconds):
+        self.samples[stage].append(seconds)
+        self.counts[stage] += 1
+
+    def line_applied(self, now):
+        if self.unrendered_since is None:
+            self.unrendered_since = now
+
+    def render_started(self, now):
+        since = self.unrendered_since
+        if since is not None:
+            self.unrendered_since = None
+            self.record('render_wait', now - since)
+
+    def summary(self):
+        """{stage: {'count', 'p50', 'p99', 'max'}} over the retained window."""
+        result = {}
+        for stage in STAGES:
+            ordered = sorted(self.samples[stage])
+            if not ordered:
+                continue
+            result[stage] = {
+                'count': self.counts[stage],
+                'p50': percentile(ordered, 0.50),
+                'p99': percentile(ordered, 0.99),
+                'max': ordered[-1],
+            }
+        return result
+
+    def report(self):
+        lines = [f"{'stage':12}{'count':>10}{'p50':>11}{'p99':>11}{'max':>11}"]
+        for stage, stats in self.summary().items():
+            lines.append(f"{stage:12}{stats['count']:10,}{format_seconds(stats['p50']):>11}"
+                         f"{format_seconds(stats['p99']):>11}{format_seconds(stats['max']):>11}")
+        return '\n'.join(lines)
+
+
+def profile_calls(function, profile):
+    """Wrap function so cProfile records it on whichever thread runs it."""
+    def profiled(*args, **kwargs):
+        profile.enable()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+    return profiled
+
+
+def cprofile_report(profile, limit=25):
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+class SamplingProfiler:
+    """Samples the stack of every other thread every `interval` seconds."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='sampling-profiler', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def report(self, limit=25):
+        own_time = collections.Counter()
+        total_time = collections.Counter()
+        for stack, count in self.stacks.items():
+            own_time[stack[-1]] += count
+            for function in set(stack[1:]):
+                total_time[function] += count
+        total = sum(self.stacks.values()) or 1
+        lines = [f"{self.samples} samples every {self.interval * 1e3:g} ms",
+                 f"{'own':>7}{'total':>8}  function"]
+        for function, count in own_time.most_common(limit):
+            lines.append(f"{count / total:7.1%}{total_time[function] / total:8.1%}  {function}")
+        return '\n'.join(lines)
+
+    def write_collapsed(self, path):
+        """One "thread;outer;...;inner count" line per stack (flamegraph.pl, speedscope)."""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+
+def profiler_from_env(variable='MONITOR_PROFILE'):
+    """Start a SamplingProfiler when the variable names an output file, e.g. MONITOR_PROFILE=gui.collapsed."""
+    path = os.environ.get(variable)
+    if not path:
+        return None, None
+    return SamplingProfiler().start(), path
+
+
+def finish_profile(profiler, path):
+    if profiler is None:
+        return
+    profiler.stop()
+    profiler.write_collapsed(path)
+    print(profiler.report(), file=sys.stderr)
+    print(f"collapsed stacks written to {path}", file=sys.stderr)
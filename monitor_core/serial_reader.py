@@ -0,0 +1,124 @@
+import selectors
+import time
+
+# How long a single read waits for bytes before giving control back to the
+# caller so it can check its running flag.
+DEFAULT_READ_TIMEOUT = 0.5
+
+# Upper bound for one bulk read; at 115200 baud this is ~350 ms of traffic.
+DEFAULT_CHUNK_SIZE = 4096
+
+# A line longer than this without a newline is flushed as-is so a noisy or
+# mis-configured port cannot grow the buffer without bound.
+MAX_LINE_LENGTH = 8192
+
+
+class LineFramer:
+    """Incrementally splits a byte stream into decoded lines.
+
+    Bytes are accumulated in a single reusable bytearray. Every complete line
+    in the buffer is decoded in one pass straight out of a memoryview, and
+    whatever follows the last newline stays in the buffer for the next chunk.
+    """
+
+    def __init__(self, max_line_length=MAX_LINE_LENGTH):
+        self.buffer = bytearray()
+        self.max_line_length = max_line_length
+
+    def feed(self, data):
+        """Append data and return the list of complete, non-empty lines."""
+        buf = self.buffer
+        buf += data
+        end = buf.rfind(b'\n')
+        if end < 0:
+            if len(buf) <= self.max_line_length:
+                return []
+            end = len(buf) - 1
+
+        with memoryview(buf) as view:
+            text = str(view[:end + 1], 'utf-8', 'replace')
+        del buf[:end + 1]
+
+        return [line.strip() for line in text.split('\n') if line and not line.isspace()]
+
+    def flush(self):
+        """Return any trailing partial line and reset the buffer."""
+        if not self.buffer:
+            return []
+        text = self.buffer.decode('utf-8', errors='replace').strip()
+        self.buffer.clear()
+        return [text] if text else []
+
+
+class SerialLineReader:
+    """Event-driven, chunked line reader for a serial port.
+
+    On POSIX the port's file descriptor is registered with a selector, so the
+    reader sleeps in the kernel until bytes arrive instead of polling
+    ``in_waiting``. Ports without a ``fileno()`` (e.g. Windows) fall back to a
+    blocking read bounded by the port timeout, which also returns as soon as
+    data is available. Once woken, everything already buffered by the driver
+    is pulled in with a single ``read(n)`` and handed to a LineFramer.
+    """
+
+    def __init__(self, port, read_timeout=DEFAULT_READ_TIMEOUT, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.port = port
+        self.read_timeout = read_timeout
+        self.chunk_size = chunk_size
+        self.framer = LineFramer()
+        self.selector = None
+        self.bytes_read = 0
+        self.lines_read = 0
+        # perf_counter when the last chunk was framed, and how long reading it took
+        self.last_read_at = 0.0
+        self.last_read_seconds = 0.0
+
+        try:
+            fd = port.fileno()
+        except (AttributeError, OSError, ValueError):
+            fd = None
+
+        if fd is not None:
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(fd, selectors.EVENT_READ)
+        else:
+            port.timeout = read_timeout
+
+    def wait_readable(self):
+        if self.selector is None:
+            return True
+        return bool(self.selector.select(self.read_timeout))
+
+    def read_chunk(self):
+        if self.selector is None:
+            # Blocks for the first byte (bounded by the port timeout), then
+            # drains whatever else has already arrived.
+            data = self.port.read(1)
+            if data:
+                waiting = self.port.in_waiting
+                if waiting:
+                    data += self.port.read(min(waiting, self.chunk_size))
+            return data
+        waiting = self.port.in_waiting
+        return self.port.read(min(max(waiting, 1), self.chunk_size))
+
+    def read_lines(self):
+        """Return every complete line received so far; empty on timeout."""
+        if not self.wait_readable():
+            return []
+        # Without a selector this includes waiting for the first byte
+        started = time.perf_counter()
+        data = self.read_chunk()
+        if not data:
+            return []
+        self.bytes_read += len(data)
+        lines = self.framer.feed(data)
+        self.lines_read += len(lines)
+        self.last_read_at = time.perf_counter()
+        self.last_read_seconds = self.last_read_at - started
+        return lines
+
+    def close(self):
+        if self.selector is not None:
+            self.selector.close()
+            self.selector = None
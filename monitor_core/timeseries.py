@@ -0,0 +1,324 @@
+"""Append-only time-series storage for numeric sensor channels.
+
+Each channel is a directory of fixed-capacity segment files. A segment is a
+small header followed by two columns, memory-mapped for writing:
+
+    header      b'TSG1', capacity (u32), count (u32), reserved (u32)
+    timestamps  capacity x int64   nanoseconds since the epoch
+    values      capacity x float32
+
+Appending writes two array slots and bumps the count; no serialisation or
+syscalls happen per sample. Segments are named after their first timestamp,
+so a range query only opens the segments that overlap the range and binary
+searches the timestamp column inside them.
+
+attach() writes a reading only when it changes, so a series is a step
+function: each value holds until the next one. range() carries the value in
+force at the start of the window in as its first point, and downsample()
+weighs each level by how long it held, so a window in which nothing changed
+still has its reading.
+"""
+import bisect
+import mmap
+import os
+import re
+import struct
+import time
+
+from monitor_core.grammar import REGISTRY
+
+MAGIC = b'TSG1'
+HEADER = struct.Struct('<4sIII')
+TS_SIZE = 8
+VALUE_SIZE = 4
+
+# 65536 samples per segment: 768 KiB on disk, ~18 hours of one reading per second
+DEFAULT_SEGMENT_CAPACITY = 1 << 16
+
+
+def segment_size(capacity):
+    return HEADER.size + capacity * (TS_SIZE + VALUE_SIZE)
+
+
+class Segment:
+    """One memory-mapped segment file."""
+
+    def __init__(self, path, capacity=None, writable=False):
+        self.path = path
+        self.writable = writable
+        if capacity is not None and not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.truncate(segment_size(capacity))
+                f.write(HEADER.pack(MAGIC, capacity, 0, 0))
+
+        with open(path, 'r+b' if writable else 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, self.capacity, self.count, _ = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            self.map.close()
+            raise ValueError(f"{path} is not a time-series segment")
+
+        view = memoryview(self.map)
+        ts_end = HEADER.size + self.capacity * TS_SIZE
+        self.timestamps = view[HEADER.size:ts_end].cast('q')
+        self.values = view[ts_end:ts_end + self.capacity * VALUE_SIZE].cast('f')
+        view.release()
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+    @property
+    def first_ts(self):
+        return self.timestamps[0] if self.count else None
+
+    @property
+    def last_ts(self):
+        return self.timestamps[self.count - 1] if self.count else None
+
+    def append(self, ts, value):
+        index = self.count
+        self.timestamps[index] = ts
+        self.values[index] = value
+        self.count = index + 1
+        struct.pack_into('<I', self.map, 8, self.count)
+
+    def slice_bounds(self, start_ns, end_ns):
+        timestamps = self.timestamps[:self.count]
+        lo = 0 if start_ns is None else bisect.bisect_left(timestamps, start_ns)
+        hi = self.count if end_ns is None else bisect.bisect_left(timestamps, end_ns)
+        timestamps.release()
+        return lo, hi
+
+    def flush(self):
+        if self.writable:
+            self.map.flush()
+
+    def close(self):
+        self.timestamps.release()
+        self.values.release()
+        self.map.close()
+
+
+class Channel:
+    def __init__(self, directory, capacity):
+        self.directory = directory
+        self.capacity = capacity
+        os.makedirs(directory, exist_ok=True)
+        # Sorted first-timestamps of every segment, used to skip segments in range queries
+        self.segment_starts = sorted(int(name[:-4]) for name in os.listdir(directory) if name.endswith('.seg'))
+        self.tail = None
+        if self.segment_starts:
+            self.tail = Segment(self.segment_path(self.segment_starts[-1]), writable=True)
+            if self.tail.full:
+                self.tail.close()
+                self.tail = None
+        self.last_ts = None
+        if self.tail is not None:
+            self.last_ts = self.tail.last_ts
+
+    def segment_path(self, first_ts):
+        return os.path.join(self.directory, f"{first_ts:020d}.seg")
+
+    def append(self, ts, value):
+        # Timestamps must be non-decreasing for the binary searches to hold
+        if self.last_ts is not None and ts < self.last_ts:
+            ts = self.last_ts
+        if self.tail is None or self.tail.full:
+            if self.tail is not None:
+                self.tail.close()
+            if self.segment_starts and ts <= self.segment_starts[-1]:
+                # Segment names must stay unique and ordered
+                ts = self.segment_starts[-1] + 1
+            self.tail = Segment(self.segment_path(ts), capacity=self.capacity, writable=True)
+            self.segment_starts.append(ts)
+        self.tail.append(ts, value)
+        self.last_ts = ts
+
+    def value_before(self, ts):
+        """The last value written before ts, or None."""
+        index = bisect.bisect_left(self.segment_starts, ts) - 1
+        if index < 0:
+            return None
+        seg_start = self.segment_starts[index]
+        owned = self.tail is None or seg_start != self.segment_starts[-1]
+        segment = Segment(self.segment_path(seg_start)) if owned else self.tail
+        # The segment starts before ts, so at least its first sample qualifies
+        lo, _ = segment.slice_bounds(ts, None)
+        value = segment.values[lo - 1]
+        if owned:
+            segment.close()
+        return value
+
+    def segments_for(self, start_ns, end_ns):
+        starts = self.segment_starts
+        first = 0
+        if start_ns is not None:
+            first = max(0, bisect.bisect_right(starts, start_ns) - 1)
+        for seg_start in starts[first:]:
+            if end_ns is not None and seg_start >= end_ns:
+                break
+            if self.tail is not None and seg_start == starts[-1]:
+                yield self.tail, False
+            else:
+                yield Segment(self.segment_path(seg_start)), True
+
+    def close(self):
+        if self.tail is not None:
+            self.tail.flush()
+            self.tail.close()
+            self.tail = None
+
+
+class TimeSeriesStore:
+    """Columnar, memory-mapped store of (timestamp, float32) samples per channel."""
+
+    def __init__(self, directory, segment_capacity=DEFAULT_SEGMENT_CAPACITY):
+        self.directory = directory
+        self.segment_capacity = segment_capacity
+        self.channels = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def channel(self, name):
+        channel = self.channels.get(name)
+        if channel is None:
+            channel = Channel(os.path.join(self.directory, name), self.segment_capacity)
+            self.channels[name] = channel
+        return channel
+
+    def channel_names(self):
+        return sorted(entry.name for entry in os.scandir(self.directory) if entry.is_dir())
+
+    def append(self, name, value, ts_ns=None):
+        self.channel(name).append(time.time_ns() if ts_ns is None else ts_ns, value)
+
+    def range(self, name, start_ns=None, end_ns=None):
+        """Return (timestamps, values) lists for start_ns <= ts < end_ns.
+
+        The value in force at start_ns is carried in as a point at start_ns,
+        so a window in which the reading did not change still returns it.
+        """
+        timestamps, values = self.samples(name, start_ns, end_ns)
+        if start_ns is not None and (not timestamps or timestamps[0] > start_ns):
+            held = self.channel(name).value_before(start_ns)
+            if held is not None:
+                timestamps.insert(0, start_ns)
+                values.insert(0, held)
+        return timestamps, values
+
+    def samples(self, name, start_ns=None, end_ns=None):
+        """Return the (timestamps, values) written in start_ns <= ts < end_ns, without the carried value."""
+        timestamps = []
+        values = []
+        for segment, owned in self.channel(name).segments_for(start_ns, end_ns):
+            lo, hi = segment.slice_bounds(start_ns, end_ns)
+            timestamps.extend(segment.timestamps[lo:hi].tolist())
+            values.extend(segment.values[lo:hi].tolist())
+            if owned:
+                segment.close()
+        return timestamps, values
+
+    def downsample(self, name, bucket_ns, start_ns=None, end_ns=None):
+        """Aggregate a range into fixed buckets: [(bucket_start, min, max, mean, count), ...].
+
+        Each value holds until the next one, so min and max cover every level
+        in force during the bucket, the mean is weighted by how long each
+        level held, and count is the number of samples written in it. Buckets
+        in which nothing was written repeat the level still in force. Without
+        end_ns the last level holds to the end of its bucket.
+        """
+        timestamps, values = self.samples(name, start_ns, end_ns)
+        written = len(timestamps)
+        if start_ns is not None and (not timestamps or timestamps[0] > start_ns):
+            held = self.channel(name).value_before(start_ns)
+            if held is not None:
+                timestamps.insert(0, start_ns)
+                values.insert(0, held)
+        if not timestamps:
+            return []
+        last = timestamps[-1]
+        window_end = end_ns if end_ns is not None else last - last % bucket_ns + bucket_ns
+        first_written = len(timestamps) - written
+        buckets = []
+        current = None
+        for index, ts in enumerate(timestamps):
+            value = values[index]
+            until = timestamps[index + 1] if index + 1 < len(timestamps) else window_end
+            counted = index >= first_written
+            while True:
+                bucket = ts - ts % bucket_ns
+                if current is None or current[0] != bucket:
+                    if current is not None:
+                        buckets.append((current[0], current[1], current[2], current[3] / current[4], current[5]))
+                    current = [bucket, value, value, 0.0, 0, 0]
+                elif value < current[1]:
+                    current[1] = value
+                elif value > current[2]:
+                    current[2] = value
+                if counted:
+                    current[5] += 1
+                    counted = False
+                span_end = min(until, bucket + bucket_ns)
+                current[3] += value * (span_end - ts)
+                current[4] += span_end - ts
+                if span_end >= until:
+                    break
+                ts = span_end
+        buckets.append((current[0], current[1], current[2], current[3] / current[4], current[5]))
+        return buckets
+
+    def flush(self):
+        for channel in self.channels.values():
+            if channel.tail is not None:
+                channel.tail.flush()
+
+    def close(self):
+        for channel in self.channels.values():
+            channel.close()
+        self.channels.clear()
+
+    def recorder(self, prefix='', skip=()):
+        """A parser sample callback that appends a reading each time it changes, except the ``skip`` channels."""
+        prefix = safe_channel_name(prefix)
+        last = {}
+
+        def record(channel, value):
+            if channel not in skip and last.get(channel) != value:
+                last[channel] = value
+                self.append(prefix + channel, value)
+        return record
+
+    def state_recorder(self, prefix=''):
+        """A state subscriber that appends a reading each time one changes; text that is no number is skipped."""
+        prefix = safe_channel_name(prefix)
+
+        def record_changes(changes):
+            ts = time.time_ns()
+            for key, value in changes.items():
+                try:
+                    number = float(value)
+                except ValueError:
+                    continue
+                self.append(prefix + key, number, ts)
+        return record_changes
+
+    def attach(self, engine, prefix=''):
+        """Record an engine's numeric channels, one sample per change of value.
+
+        Channels whose state is the reading itself are recorded from the
+        state's change-only deltas for those keys. The rest (gas and flame,
+        whose state is display text) are recorded from the parser's samples,
+        skipping a reading equal to the last one, so every series is a step
+        function. A parser that detects its board may switch grammars, so
+        the keys cover every registered grammar.
+        """
+        keys = set(engine.parser.grammar.state_channels)
+        for parser_type in REGISTRY.values():
+            keys.update(parser_type.grammar.state_channels)
+        engine.state.subscribe(self.state_recorder(prefix), keys=sorted(keys))
+        engine.parser.subscribe_samples(self.recorder(prefix, skip=frozenset(keys)))
+
+
+def safe_channel_name(name):
+    # Channel names become directory names; port paths like /dev/ttyUSB0 must not nest
+    return re.sub(r'[^\w.-]', '_', name)
@@ -0,0 +1,627 @@
+"""Tk helpers shared by the Smart Home and Pet Feeder monitor windows."""
+import threading
+import time
+import tkinter as tk
+from collections import deque
+from tkinter import ttk, scrolledtext
+
+from monitor_core.accesslog import RESULT_NAMES, month_bounds
+from monitor_core.alerts import OK, NEAR, ALERT
+from monitor_core.decimate import MinMaxPyramid, SECOND
+
+DEFAULT_FPS = 30
+
+# Label colour for each AlertEngine.level(); None is a reading that has not arrived yet
+LEVEL_COLORS = {ALERT: 'red', NEAR: 'orange', OK: '#00ff00', None: 'white'}
+
+# Lines kept in the live data stream before the oldest are dropped
+DEFAULT_MAX_LINES = 5000
+
+
+class RenderScheduler:
+    """Coalesces redraw requests into at most one render per frame.
+
+    ``request()`` only sets a dirty flag; the first request in a frame also
+    queues a single Tk ``after`` callback, timed so renders never run more
+    often than ``fps``. However many lines arrive in a burst, the Tk event
+    queue holds at most one pending render.
+    """
+
+    def __init__(self, widget, render, fps=DEFAULT_FPS):
+        self.widget = widget
+        self.render = render
+        self.interval = 1.0 / fps
+        self.dirty = False
+        self.pending = False
+        self.last_render = 0.0
+        # Optional profiling.StageProfiler timing the after-queue wait and the render
+        self.profiler = None
+
+        # Counters for measuring how well bursts are coalesced
+        self.requests = 0
+        self.scheduled = 0
+        self.renders = 0
+
+    def request(self):
+        self.requests += 1
+        self.dirty = True
+        if self.pending:
+            return
+        self.pending = True
+        self.scheduled += 1
+        delay = self.interval - (time.monotonic() - self.last_render)
+        self.widget.after(max(0, int(delay * 1000)), self.run)
+
+    def run(self):
+        self.pending = False
+        if not self.dirty:
+            return
+        self.dirty = False
+        self.last_render = time.monotonic()
+        self.renders += 1
+        profiler = self.profiler
+        if profiler is None:
+            self.render()
+            return
+        started = time.perf_counter()
+        profiler.render_started(started)
+        self.render()
+        profiler.record('render', time.perf_counter() - started)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'scheduled': self.scheduled,
+            'renders': self.renders,
+        }
+
+
+class HandoffPump:
+    """Runs a handoff.Handoff's queued calls on the Tk thread.
+
+    Every ``interval_ms`` it drains at most ``batch`` calls, so a burst from
+    the reader is spread over several ticks instead of blocking the event
+    loop. Once the queue is empty, state changes whose post was dropped are
+    applied, so the UI state catches up even if no more lines arrive. When
+    the handoff has dropped posts since the last tick, ``on_drop(count)`` is
+    called with the number dropped.
+    """
+
+    def __init__(self, widget, handoff, interval_ms=int(1000 / DEFAULT_FPS), batch=2000, on_drop=None):
+        self.widget = widget
+        self.handoff = handoff
+        self.interval_ms = interval_ms
+        self.batch = batch
+        self.on_drop = on_drop
+        self.reported_drops = handoff.dropped
+        self.after_id = None
+
+    def start(self):
+        if self.after_id is None:
+            self.tick()
+
+    def tick(self):
+        self.handoff.drain(self.batch)
+        self.handoff.flush_unsent()
+        dropped = self.handoff.dropped
+        if dropped != self.reported_drops:
+            if self.on_drop is not None:
+                self.on_drop(dropped - self.reported_drops)
+            self.reported_drops = dropped
+        self.after_id = self.widget.after(self.interval_ms, self.tick)
+
+    def stop(self):
+        if self.after_id is not None:
+            self.widget.after_cancel(self.after_id)
+            self.after_id = None
+
+
+class LatencyPanel:
+    """Debug window showing the per-stage latency table, refreshed once a second."""
+
+    def __init__(self, parent, profiler, on_close=None, interval_ms=1000):
+        self.profiler = profiler
+        self.on_close = on_close
+        self.interval_ms = interval_ms
+        self.window = tk.Toplevel(parent)
+        self.window.title("🔬 Stage Latency")
+        self.window.configure(bg='#2b2b2b')
+        self.text = tk.Text(self.window, width=60, height=9, font=("Consolas", 10),
+                            bg='#1e1e1e', fg='#ffffff', state=tk.DISABLED)
+        self.text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.after_id = None
+        self.refresh()
+
+    def refresh(self):
+        self.text.config(state=tk.NORMAL)
+        self.text.delete('1.0', tk.END)
+        self.text.insert(tk.END, self.profiler.report())
+        self.text.config(state=tk.DISABLED)
+        self.after_id = self.window.after(self.interval_ms, self.refresh)
+
+    def lift(self):
+        self.window.lift()
+
+    def close(self):
+        if self.after_id is not None:
+            self.window.after_cancel(self.after_id)
+        self.window.destroy()
+        if self.on_close is not None:
+            self.on_close()
+
+
+class BackgroundCall:
+    """Runs blocking work (a database flush and query) on a worker thread for a window.
+
+    The worker never touches Tk: the window polls for the result on its own
+    timer and ``done(result, error)`` runs on the Tk thread. A newer run, or
+    cancel(), discards the result of the one before it.
+    """
+
+    def __init__(self, widget, poll_ms=20):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.generation = 0
+        self.after_id = None
+
+    def run(self, work, done):
+        self.cancel()
+        result = []
+
+        def call():
+            try:
+                result.append((work(), None))
+            except Exception as e:
+                result.append((None, e))
+
+        threading.Thread(target=call, daemon=True).start()
+        self.poll(self.generation, result, done)
+
+    def poll(self, generation, result, done):
+        self.after_id = None
+        if generation != self.generation:
+            return
+        if not result:
+            self.after_id = self.widget.after(self.poll_ms, self.poll, generation, result, done)
+            return
+        done(*result[0])
+
+    def cancel(self):
+        self.generation += 1
+        if self.after_id is not None:
+            self.widget.after_cancel(self.after_id)
+            self.after_id = None
+
+
+class AccessLogPanel:
+    """Window answering RFID questions from an accesslog.AccessLog: one card's
+    attempts this month, and unauthorized attempts per hour this month."""
+
+    def __init__(self, parent, access_log, uid='', on_close=None):
+        self.access_log = access_log
+        self.on_close = on_close
+        self.window = tk.Toplevel(parent)
+        self.window.title("📜 RFID Access Log")
+        self.window.configure(bg='#2b2b2b')
+
+        controls = ttk.Frame(self.window)
+        controls.pack(fill=tk.X, padx=10, pady=(10, 0))
+        ttk.Label(controls, text="UID:", style='Status.TLabel').pack(side=tk.LEFT)
+        self.uid_entry = ttk.Entry(controls, width=16)
+        self.uid_entry.insert(0, uid)
+        self.uid_entry.pack(side=tk.LEFT, padx=(10, 10))
+        self.uid_entry.bind('<Return>', lambda event: self.show_attempts())
+        ttk.Button(controls, text="🔎 This Month", command=self.show_attempts,
+                   style='Custom.TButton').pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(controls, text="🚫 Unauthorized per Hour", command=self.show_unauthorized,
+                   style='Custom.TButton').pack(side=tk.LEFT)
+
+        self.text = scrolledtext.ScrolledText(self.window, width=60, height=20, font=("Consolas", 10),
+                                              bg='#1e1e1e', fg='#ffffff', state=tk.DISABLED)
+        self.text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.status_label = ttk.Label(self.window, text="", style='Status.TLabel')
+        self.status_label.pack(anchor='w', padx=10, pady=(0, 10))
+        self.background = BackgroundCall(self.window)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+    def show_attempts(self):
+        uid = self.uid_entry.get().strip().upper()
+        self.query(lambda: self.access_log.attempts(uid, *month_bounds()),
+                   lambda rows: [f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))}  "
+                                 f"{RESULT_NAMES[authorized]:12} {device}" for ts, authorized, device in rows])
+
+    def show_unauthorized(self):
+        self.query(lambda: self.access_log.unauthorized_per_hour(*month_bounds()),
+                   lambda rows: [f"{time.strftime('%Y-%m-%d %H:00', time.localtime(hour))}  {count:6}"
+                                 for hour, count in rows])
+
+    def query(self, select, format_rows):
+        access_log = self.access_log
+
+        def work():
+            started = time.perf_counter()
+            # Include the batch the writer has not inserted yet; the flush waits on SQLite, so it runs here
+            access_log.flush()
+            rows = select()
+            return rows, access_log.count(), time.perf_counter() - started
+
+        self.status_label.config(text="Querying...")
+        self.background.run(work, lambda result, error: self.show(result, error, format_rows))
+
+    def show(self, result, error, format_rows):
+        if error is not None:
+            self.status_label.config(text=f"Query failed: {error}")
+            return
+        rows, total, elapsed = result
+        lines = format_rows(rows)
+        self.text.config(state=tk.NORMAL)
+        self.text.delete('1.0', tk.END)
+        self.text.insert(tk.END, '\n'.join(lines) if lines else "No matching attempts")
+        self.text.config(state=tk.DISABLED)
+        self.status_label.config(text=f"{len(lines)} rows in {elapsed * 1e3:.1f} ms ({total:,} in the log)")
+
+    def lift(self):
+        self.window.lift()
+
+    def close(self):
+        self.background.cancel()
+        self.window.destroy()
+        if self.on_close is not None:
+            self.on_close()
+
+
+class FeedingHistoryPanel:
+    """Window listing feeding.FeedingRollups per day or per week, newest first."""
+
+    def __init__(self, parent, rollups, on_close=None, limit=400):
+        self.rollups = rollups
+        self.on_close = on_close
+        self.limit = limit
+        self.window = tk.Toplevel(parent)
+        self.window.title("📊 Feeding History")
+        self.window.configure(bg='#2b2b2b')
+
+        controls = ttk.Frame(self.window)
+        controls.pack(fill=tk.X, padx=10, pady=(10, 0))
+        ttk.Label(controls, text="Per:", style='Status.TLabel').pack(side=tk.LEFT)
+        self.period_combo = ttk.Combobox(controls, state="readonly", values=["day", "week"], width=8)
+        self.period_combo.set("day")
+        self.period_combo.pack(side=tk.LEFT, padx=(10, 10))
+        self.period_combo.bind('<<ComboboxSelected>>', lambda event: self.refresh())
+        ttk.Button(controls, text="🔄 Refresh", command=self.refresh, style='Custom.TButton').pack(side=tk.LEFT)
+
+        self.text = scrolledtext.ScrolledText(self.window, width=78, height=20, font=("Consolas", 10),
+                                              bg='#1e1e1e', fg='#ffffff', state=tk.DISABLED)
+        self.text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.background = BackgroundCall(self.window)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    def refresh(self):
+        period = self.period_combo.get()
+        rollups, limit = self.rollups, self.limit
+        # history() flushes the pending rollups into SQLite first, so it runs on a worker
+        self.background.run(lambda: rollups.history(period, limit),
+                            lambda rows, error: self.show(period, rows, error))
+
+    def show(self, period, rows, error):
+        if error is not None:
+            self.set_text(f"Query failed: {error}")
+            return
+        lines = [f"{'week of' if period == 'week' else 'day':12}{'fed':>6}{'skipped':>9}"
+                 f"{'food avg':>10}{'min':>6}{'max':>6}{'servo 1':>9}{'servo 2':>9}"]
+        for start, fed, skipped, food_avg, food_min, food_max, servo1, servo2 in rows:
+            food = "--" if food_avg is None else f"{food_avg:.1f}"
+            lines.append(f"{start:12}{fed:6}{skipped:9}{food:>10}{food_min if food_min is not None else '--':>6}"
+                         f"{food_max if food_max is not None else '--':>6}{servo1:9}{servo2:9}")
+        self.set_text('\n'.join(lines))
+
+    def set_text(self, text):
+        self.text.config(state=tk.NORMAL)
+        self.text.delete('1.0', tk.END)
+        self.text.insert(tk.END, text)
+        self.text.config(state=tk.DISABLED)
+
+    def lift(self):
+        self.window.lift()
+
+    def close(self):
+        self.background.cancel()
+        self.window.destroy()
+        if self.on_close is not None:
+            self.on_close()
+
+
+class LabelUpdater:
+    """Calls ``config()`` on a label only when its text or colour changed."""
+
+    def __init__(self):
+        self.shown = {}
+        self.configs = 0
+
+    def set(self, label, text=None, foreground=None):
+        current = self.shown.setdefault(label, {})
+        changes = {}
+        if text is not None and current.get('text') != text:
+            changes['text'] = text
+        if foreground is not None and current.get('foreground') != foreground:
+            changes['foreground'] = foreground
+        if changes:
+            label.config(**changes)
+            current.update(changes)
+            self.configs += 1
+
+    def forget(self):
+        self.shown.clear()
+
+
+class LogConsole:
+    """Bounded, batched log view on top of a ScrolledText widget.
+
+    ``append()`` is cheap and safe to call from the serial thread: lines go
+    into a ring buffer and nothing touches Tk until ``flush()``, which the
+    render loop calls once per frame. A flush inserts every pending line with
+    a single ``insert`` and trims the oldest lines in one ``delete`` once the
+    widget holds more than ``max_lines``. Trimming waits for a small slack
+    above the cap so the delete is amortised over many frames.
+    """
+
+    def __init__(self, parent, max_lines=DEFAULT_MAX_LINES, **text_options):
+        self.text = scrolledtext.ScrolledText(parent, state=tk.DISABLED, **text_options)
+        self.max_lines = max_lines
+        self.trim_slack = max(1, max_lines // 10)
+        # Anything beyond max_lines in one frame would be trimmed straight away
+        self.pending = deque(maxlen=max_lines)
+        self.line_count = 0
+        self.autoscroll = True
+        self.dropped = 0
+
+    def pack(self, **options):
+        self.text.pack(**options)
+
+    def append(self, line):
+        if len(self.pending) == self.max_lines:
+            self.dropped += 1
+        self.pending.append(line)
+
+    def flush(self):
+        pending = self.pending
+        if not pending:
+            return
+        # popleft() keeps lines appended by the serial thread mid-flush for the next frame
+        lines = [pending.popleft() for _ in range(len(pending))]
+
+        self.text.config(state=tk.NORMAL)
+        self.text.insert(tk.END, '\n'.join(lines) + '\n')
+        self.line_count += len(lines)
+
+        excess = self.line_count - self.max_lines
+        if excess >= self.trim_slack:
+            self.text.delete('1.0', f'{excess + 1}.0')
+            self.line_count -= excess
+
+        if self.autoscroll:
+            self.text.see(tk.END)
+        self.text.config(state=tk.DISABLED)
+
+    def set_autoscroll(self, enabled):
+        self.autoscroll = enabled
+        if enabled:
+            self.text.see(tk.END)
+
+    def clear(self):
+        self.pending.clear()
+        self.line_count = 0
+        self.text.config(state=tk.NORMAL)
+        self.text.delete(1.0, tk.END)
+        self.text.config(state=tk.DISABLED)
+
+
+# Time spans offered by the trend charts, label -> nanoseconds
+TREND_SPANS = {
+    "10 min": 600 * SECOND,
+    "1 hour": 3600 * SECOND,
+    "1 day": 86400 * SECOND,
+    "1 week": 7 * 86400 * SECOND,
+    "4 weeks": 28 * 86400 * SECOND,
+}
+
+# Initial y-axis range per channel; widened automatically if a reading falls outside
+CHANNEL_RANGES = {
+    'temperature': (0.0, 50.0),
+    'humidity': (0.0, 100.0),
+    'light': (0.0, 5.0),
+    'gas': (0.0, 1000.0),
+    'flame': (0.0, 4095.0),
+    'food_distance': (0.0, 30.0),
+    'ir_sensor': (0.0, 1.0),
+}
+
+COLUMN_PX = 2
+
+
+class TrendChart:
+    """Rolling min/max chart of one channel, drawn from a MinMaxPyramid.
+
+    Each pyramid bucket is one vertical line on the canvas. When time moves
+    on, every existing line is shifted with a single ``move`` on the shared
+    tag, the new buckets are drawn at the right edge and lines that scrolled
+    off the left are deleted. The amount of drawing per frame therefore
+    depends on the canvas width, never on how much history the pyramid holds.
+    A full redraw only happens when the span, size or y-range changes.
+    """
+
+    def __init__(self, parent, pyramid, y_range, span_ns, height=110, color='#00ff00'):
+        self.canvas = tk.Canvas(parent, height=height, bg='#1e1e1e', highlightthickness=0)
+        self.pyramid = pyramid
+        self.y_min, self.y_max = y_range
+        self.span_ns = span_ns
+        self.color = color
+        self.items = deque()  # (bucket_start, canvas_id), oldest first
+        self.live_item = None
+        self.level = None
+        self.drawn_completed = 0
+        self.right_start = None
+        self.size = None
+        self.label_item = None
+
+    def pack(self, **options):
+        self.canvas.pack(**options)
+
+    def set_span(self, span_ns):
+        self.span_ns = span_ns
+        self.level = None
+
+    def geometry(self):
+        width = max(self.canvas.winfo_width(), 100)
+        height = max(self.canvas.winfo_height(), 20)
+        return width, height
+
+    def y(self, value, height):
+        fraction = (value - self.y_min) / (self.y_max - self.y_min)
+        return height - 4 - fraction * (height - 8)
+
+    def x(self, start, width):
+        bucket = self.pyramid.widths[self.level]
+        return width - COLUMN_PX - (self.right_start - start) // bucket * COLUMN_PX
+
+    def widen_range(self, low, high):
+        if low >= self.y_min and high <= self.y_max:
+            return False
+        margin = (max(high, self.y_max) - min(low, self.y_min)) * 0.1
+        self.y_min = min(self.y_min, low - margin)
+        self.y_max = max(self.y_max, high + margin)
+        return True
+
+    def draw_bucket(self, bucket, width, height):
+        start, low, high = bucket
+        x = self.x(start, width)
+        # A flat bucket still needs one pixel of height to be visible
+        y_low = self.y(low, height)
+        y_high = min(self.y(high, height), y_low - 1)
+        return self.canvas.create_line(x, y_low, x, y_high, fill=self.color, width=COLUMN_PX, tags='bucket')
+
+    def refresh(self):
+        width, height = self.geometry()
+        columns = width // COLUMN_PX
+        level = self.pyramid.level_for(self.span_ns, columns)
+        live = self.pyramid.live(level)
+        if live is None:
+            return
+
+        new_count = self.pyramid.completed[level] - self.drawn_completed
+        new_buckets = self.pyramid.latest(level, new_count) if new_count > 0 else []
+        if new_buckets or live:
+            lows = [b[1] for b in new_buckets] + [live[1]]
+            highs = [b[2] for b in new_buckets] + [live[2]]
+            widened = self.widen_range(min(lows), max(highs))
+        else:
+            widened = False
+
+        if level != self.level or (width, height) != self.size or widened or new_count >= columns:
+            self.redraw(level, live, width, height)
+            return
+
+        # Scroll everything drawn so far by however many columns time advanced
+        bucket = self.pyramid.widths[level]
+        shift = (live[0] - self.right_start) // bucket * COLUMN_PX
+        if shift:
+            self.canvas.move('bucket', -shift, 0)
+            self.right_start = live[0]
+
+        for b in new_buckets:
+            self.items.append((b[0], self.draw_bucket(b, width, height)))
+        self.drawn_completed = self.pyramid.completed[level]
+
+        while self.items and self.x(self.items[0][0], width) < 0:
+            self.canvas.delete(self.items.popleft()[1])
+
+        self.draw_live(live, width, height)
+
+    def redraw(self, level, live, width, height):
+        self.canvas.delete('all')
+        self.items.clear()
+        self.level = level
+        self.size = (width, height)
+        self.right_start = live[0]
+        self.live_item = None
+
+        columns = width // COLUMN_PX
+        for b in self.pyramid.latest(level, columns):
+            if self.x(b[0], width) >= 0:
+                self.items.append((b[0], self.draw_bucket(b, width, height)))
+        self.drawn_completed = self.pyramid.completed[level]
+
+        self.label_item = self.canvas.create_text(
+            4, 2, anchor='nw', fill='#888888', font=('Arial', 8),
+            text=f"{self.y_max:g}\n\n\n{self.y_min:g}")
+        self.draw_live(live, width, height)
+
+    def draw_live(self, live, width, height):
+        # The in-progress bucket is redrawn in place rather than appended
+        if self.live_item is not None:
+            self.canvas.delete(self.live_item)
+        self.live_item = self.draw_bucket(live, width, height)
+        self.canvas.itemconfigure(self.live_item, fill='#ffffff', tags=())
+
+
+class TrendPanel:
+    """Notebook with one TrendChart per numeric channel, fed by parser samples.
+
+    ``record()`` only updates the pyramids, stamping samples with
+    ``ts_ns`` when it is given (the read time, for samples handed over from
+    the serial thread); ``refresh()`` redraws the chart on the visible tab.
+    """
+
+    def __init__(self, parent, channels, labels=None, span="10 min"):
+        self.frame = ttk.Frame(parent)
+        controls = ttk.Frame(self.frame)
+        controls.pack(fill=tk.X)
+        ttk.Label(controls, text="Span:", style='Status.TLabel').pack(side=tk.LEFT)
+        self.span_combo = ttk.Combobox(controls, state="readonly", values=list(TREND_SPANS), width=8)
+        self.span_combo.set(span)
+        self.span_combo.pack(side=tk.LEFT, padx=(10, 0))
+        self.span_combo.bind('<<ComboboxSelected>>', self.on_span_changed)
+
+        self.notebook = ttk.Notebook(self.frame)
+        self.notebook.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
+        self.notebook.bind('<<NotebookTabChanged>>', lambda event: self.refresh())
+
+        labels = labels or {}
+        self.pyramids = {}
+        self.charts = {}
+        self.tabs = {}
+        for channel in channels:
+            tab = ttk.Frame(self.notebook)
+            self.notebook.add(tab, text=labels.get(channel, channel))
+            pyramid = MinMaxPyramid()
+            chart = TrendChart(tab, pyramid, CHANNEL_RANGES.get(channel, (0.0, 1.0)), TREND_SPANS[span])
+            chart.pack(fill=tk.BOTH, expand=True)
+            self.pyramids[channel] = pyramid
+            self.charts[channel] = chart
+            self.tabs[str(tab)] = channel
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def record(self, channel, value, ts_ns=None):
+        pyramid = self.pyramids.get(channel)
+        if pyramid is not None:
+            pyramid.add(time.time_ns() if ts_ns is None else ts_ns, value)
+
+    def on_span_changed(self, event=None):
+        span_ns = TREND_SPANS[self.span_combo.get()]
+        for chart in self.charts.values():
+            chart.set_span(span_ns)
+        self.refresh()
+
+    def refresh(self):
+        channel = self.tabs.get(self.notebook.select())
+        if channel is not None:
+            self.charts[channel].refresh()
+
+
+def pending_after_callbacks(widget):
+    """Number of Tk ``after`` callbacks currently queued for the interpreter."""
+    return len(widget.tk.splitlist(widget.tk.call('after', 'info')))
@@ -0,0 +1,510 @@
+"""Vectorized batch parsing of smart home sensor lines with NumPy, for backfills.
+
+    rows = parse_file('smarthome.log')        # or .gz, or a .shcap capture
+    rows['temp'], rows['gas'][rows['motion'] == 1], ...
+
+Every line that process_data_line reads a sensor value from (the
+"Environment ->", "Security ->" and "| flame:" lines) becomes one row of ROW:
+
+    ts      seconds since the recording started for captures, else NaN
+    temp, hum, light, gas, flame
+            the line's readings, NaN where the line has none
+    motion, door
+            1 (YES / OPEN), 0 (NO / CLOSED) or -1 where not reported
+
+NumPy is only needed for this module. A block of lines is searched as one
+byte array. Numbers are read 8 bytes at a time as one 64-bit word and
+computed as integer mantissa / 10**decimals, which is exactly what float()
+returns.
+
+Almost every sensor line is one of the firmware's own layouts, so those are
+read first (layout_rows): the markers are found from their ">" and "f"
+bytes, and a line that starts with one and matches its layout to the end
+is read at fixed offsets from the marker, without looking for field names.
+The other lines with a marker are few and are parsed by parse_line(),
+which reads a line the way process_data_line does. When they are not few,
+the block is searched field name by field name instead (Block), leaving to
+parse_line() only what that search cannot vouch for (a field named twice,
+non-ASCII text next to a number, a number of 8 characters or more, a gas
+or flame value float() rejects).
+"""
+import gzip
+import math
+import re
+
+import numpy as np
+
+from monitor_core.capture import read_capture
+
+ROW = np.dtype([('ts', 'f8'), ('temp', 'f8'), ('hum', 'f8'), ('light', 'f8'), ('gas', 'f8'),
+                ('flame', 'f8'), ('motion', 'i1'), ('door', 'i1')])
+
+RAW_ROW = np.dtype((np.void, ROW.itemsize))
+# A row with no readings
+EMPTY_ROW = np.array((math.nan,) * 6 + (-1, -1), ROW)
+
+ENVIRONMENT = b"Environment ->"
+SECURITY = b"Security ->"
+FLAME = b"| flame:"
+# The markers in the order of their kind in layout_rows, with the ">" or "f" each is found by
+LAYOUT_MARKERS = ((ENVIRONMENT, ENVIRONMENT.index(b">")), (SECURITY, SECURITY.index(b">")), (FLAME, FLAME.index(b"f")))
+MARKER_OFFSETS = np.array([0] + [at for _, at in LAYOUT_MARKERS])
+
+# process_data_line's patterns, for parse_line()
+TEMP_RE = re.compile(r"Temp:\s*([\d.]+)")
+HUMIDITY_RE = re.compile(r"Humidity:\s*([\d.]+)")
+LIGHT_RE = re.compile(r"Light:\s*([\d.]+)")
+GAS_RE = re.compile(r"\|\s*Gas:\s*([\d.]+)")
+FLAME_RE = re.compile(r"\|\s*flame:\s*([\d.]+)")
+
+# What \s skips inside one line (the newline ends it), and what [\d.] takes, in ASCII
+SPACE = np.zeros(256, bool)
+SPACE[[9, 11, 12, 13, 28, 29, 30, 31, 32]] = True
+NUMBER = np.zeros(256, bool)
+NUMBER[48:58] = True
+NUMBER[46] = True
+# Room for reading a whole layout past the last marker of a block
+PAD = 128
+POWERS = 10.0 ** np.arange(8)
+# Bytewise arithmetic on 64-bit words: every byte's top bit, every byte's lowest bit, ...
+HIGH = np.uint64(0x8080808080808080)
+LOW = ~HIGH
+PAIRS = np.uint64(0x000000FF000000FF)
+ONE, SEVEN, EIGHT, BYTE = np.uint64(1), np.uint64(7), np.uint64(8), np.uint64(255)
+ZEROS, DOTS, SLASHES, NINES = (np.uint64(ord(c) * 0x0101010101010101) for c in "0./9")
+# Lead bytes of U+0080-U+00FF are 0xC2 and 0xC3, which agree but for the lowest bit
+LATIN1_LEAD, LATIN1_MASK = np.uint64(0xC2), np.uint64(0xFE)
+# Bytes parsed at a time; bigger blocks fall out of the CPU caches
+BLOCK_SIZE = 1 << 20
+
+
+def number_or_nan(text):
+    try:
+        return float(text)
+    except ValueError:
+        return math.nan
+
+
+def parse_line(line):
+    """The row values (without ts) process_data_line reads from line, or None if it carries no reading."""
+    environment = "Environment ->" in line
+    security = "Security ->" in line
+    flame = "| flame:" in line
+    if not (environment or security or flame):
+        return None
+    row = [math.nan] * 5 + [-1, -1]
+    if environment:
+        for index, pattern in enumerate((TEMP_RE, HUMIDITY_RE, LIGHT_RE)):
+            match = pattern.search(line)
+            if match:
+                row[index] = number_or_nan(match.group(1))
+    if security:
+        row[5] = 1 if "Motion: YES" in line else 0 if "Motion: NO" in line else -1
+        row[6] = 1 if "Door: OPEN" in line else 0 if "Door: CLOSED" in line else -1
+        match = GAS_RE.search(line)
+        if match:
+            row[3] = number_or_nan(match.group(1))
+            if math.isnan(row[3]):
+                # float() raises here in process_data_line, so the flame check never runs
+                return tuple(row)
+    if flame:
+        match = FLAME_RE.search(line)
+        if match:
+            row[4] = number_or_nan(match.group(1))
+    return tuple(row)
+
+
+class Block:
+    """One block of lines as a byte array.
+
+    Every name searched for contains a ":" or a ">", so the block is scanned
+    once for those and newlines together, and a name is found by comparing
+    its bytes at those positions only. Each position carries its line
+    number, so finding the row a name is on is an array lookup. Lines with a
+    marker become rows, and the numbers of every field are then read in one
+    pass over all rows.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        # Newlines around the block, so that reads before or after a line never leave the array
+        buf = self.buf = np.empty(len(data) + 2 * PAD, np.uint8)
+        buf[:PAD] = buf[-PAD:] = 10
+        body = buf[PAD:-PAD]
+        body[:] = np.frombuffer(data, np.uint8)
+        hits = body == 10
+        # ":" and ">" are the only bytes that equal 62 once bit 2 is set; compared in place, to save a pass
+        anchor_hits = body | 4
+        np.equal(anchor_hits, 62, out=anchor_hits.view(bool))
+        hits |= anchor_hits.view(bool)
+        positions = np.flatnonzero(hits)
+        kinds = body[positions]
+        positions += PAD
+        self.newlines = positions[np.flatnonzero(kinds == 10)]
+        # The line of an anchor is the number of newlines before it: its index less the anchors before it
+        anchors = np.flatnonzero(kinds != 10)
+        lines = anchors - np.arange(len(anchors))
+        positions = positions[anchors]
+        kinds = kinds[anchors]
+        self.anchors = {}
+        for anchor in b":>":
+            at = np.flatnonzero(kinds == anchor)
+            found = positions[at]
+            self.anchors[anchor] = (found, buf[found - 1], lines[at])
+        # (anchor, byte before it) -> the positions and lines of that pair, shared by names that end alike
+        self.groups = {}
+        # The 8 bytes starting at each offset as one little-endian integer
+        self.words = np.ndarray((len(buf) - 7,), '<u8', buf, 0, (1,))
+
+    def find(self, needle):
+        """Start offsets of every occurrence of needle, and the line of each."""
+        anchor = next(byte for byte in needle if byte in b":>")
+        at = needle.index(anchor)
+        if at:
+            key = (anchor, needle[at - 1])
+            group = self.groups.get(key)
+            if group is None:
+                found, before, lines = self.anchors[anchor]
+                # Boolean masks index slower than the positions np.flatnonzero gives for them
+                keep = np.flatnonzero(before == key[1])
+                group = self.groups[key] = (found[keep], lines[keep])
+            found, lines = group
+        else:
+            found, _, lines = self.anchors[anchor]
+        found = found - at
+        # Compare eight bytes at a time, the last eight overlapping the ones before
+        for offset in sorted({*range(0, len(needle) - 8, 8), max(len(needle) - 8, 0)}):
+            chunk = needle[offset:offset + 8]
+            words = self.words[found + offset]
+            if len(chunk) < 8:
+                words &= (1 << 8 * len(chunk)) - 1
+            keep = np.flatnonzero(words == int.from_bytes(chunk, 'little'))
+            found, lines = found[keep], lines[keep]
+        return found, lines
+
+    def select(self, markers):
+        """Make the lines with any of markers the rows; the flags say which marker each row has."""
+        lines = [self.find(marker)[1] for marker in markers]
+        marked = np.zeros(len(self.newlines) + 1, bool)
+        for found in lines:
+            marked[found] = True
+        self.selected = np.flatnonzero(marked)
+        self.row_starts = np.concatenate(([PAD], self.newlines + 1))[self.selected]
+        self.row_ends = np.append(self.newlines, len(self.buf) - PAD)[self.selected]
+        # The row of each line, -1 for lines that are not rows
+        self.rows_by_line = np.full(len(marked), -1, np.intp)
+        self.rows_by_line[self.selected] = np.arange(len(self.selected))
+        self.fallback = np.zeros(len(self.selected), bool)
+        # Each with a False past the last row, for rows_by_line's -1
+        flags = []
+        for found in lines:
+            marked[:] = False
+            marked[found] = True
+            flags.append(np.append(marked[self.selected], False))
+        return flags
+
+    def choice(self, needle, yes, no):
+        """1 on rows containing needle + yes, else 0 on rows containing needle + no, else -1."""
+        found, lines = self.find(needle)
+        rows = self.rows_by_line[lines]
+        following = self.words[found + len(needle)]
+        choice = np.full(len(self.selected) + 1, -1, np.int8)
+        for value, word in ((0, no), (1, yes)):
+            choice[rows[(following & ((1 << 8 * len(word)) - 1)) == int.from_bytes(word, 'little')]] = value
+        return choice[:-1]
+
+    def fields(self, specs):
+        """The number after each needle (and \\s*) on the rows where it applies, NaN where there is none.
+
+        specs are (needle, applies, after_bar, strict). after_bar requires
+        "|" and optional spaces before needle, as in the gas and flame
+        patterns; strict sends rows whose number float() would reject to
+        the fallback, because process_data_line raises on them.
+        """
+        buf = self.buf
+        count = len(self.selected)
+        starts = []
+        targets = []
+        for index, (needle, applies, _, _) in enumerate(specs):
+            found, lines = self.find(needle)
+            # -1 (not a row) wraps around to the always-False flag past the last row
+            keep = np.flatnonzero(applies[self.rows_by_line[lines]])
+            starts.append(found[keep])
+            targets.append(self.rows_by_line[lines[keep]] + index * count)
+        start = np.concatenate(starts)
+        target = np.concatenate(targets)
+        sizes = [len(found) for found in starts]
+        position = start + np.repeat([len(spec[0]) for spec in specs], sizes)
+        strict = np.repeat([spec[3] for spec in specs], sizes)
+
+        # The regex would move on to a later occurrence when the first has no number; leave those to it
+        counts = np.bincount(target, minlength=len(specs) * count)
+        self.fallback |= (counts.reshape(len(specs), count) > 1).any(0)
+        single = counts[target] == 1
+        bars = np.repeat([spec[2] for spec in specs], sizes)
+        if bars.any():
+            bar = (buf[start - 1] == 124) | ((buf[start - 1] == 32) & (buf[start - 2] == 124)) | ~bars
+            self.fallback[target[~bar] % count] = True
+            single &= bar
+        keep = np.flatnonzero(single)
+        position, target, strict = position[keep], target[keep], strict[keep]
+
+        spaces = SPACE[buf[position]]
+        while spaces.any():
+            position += spaces
+            spaces &= SPACE[buf[position]]
+        numbers, _, odd, bad = read_numbers(self.words, position)
+        self.fallback[target[odd | (bad & strict)] % count] = True
+        values = np.full(len(specs) * count, np.nan)
+        values[target] = numbers
+        return values.reshape(len(specs), count)
+
+    def rows(self, ts=None):
+        environment, security, flame = self.select((ENVIRONMENT, SECURITY, FLAME))
+        rows = np.empty(len(self.selected), ROW)
+        rows['ts'] = np.nan if ts is None else np.asarray(ts, float)[self.selected]
+        rows['temp'], rows['hum'], rows['light'], rows['gas'], rows['flame'] = self.fields((
+            (b"Temp:", environment, False, False),
+            (b"Humidity:", environment, False, False),
+            (b"Light:", environment, False, False),
+            (b"Gas:", security, True, True),
+            (b"flame:", flame, True, True),
+        ))
+        security = security[:-1]
+        rows['motion'] = np.where(security, self.choice(b"Motion:", b" YES", b" NO"), -1)
+        rows['door'] = np.where(security, self.choice(b"Door:", b" OPEN", b" CLOSED"), -1)
+
+        fallback = np.flatnonzero(self.fallback)
+        if len(fallback):
+            data = self.data
+            texts = [data[start - PAD:end - PAD].decode('utf-8', errors='replace')
+                     for start, end in zip(self.row_starts[fallback].tolist(), self.row_ends[fallback].tolist())]
+            rows[fallback] = np.array([(ts,) + parse_line(text) for ts, text in
+                                       zip(rows['ts'][fallback].tolist(), texts)], ROW)
+        return rows
+
+
+def read_numbers(words, position):
+    """The [\\d.]+ at each position as float() reads it, NaN where there is none or float() rejects it.
+
+    Also returns its length, and says which positions to leave to
+    parse_line() (a non-ASCII character that \\s or \\d may match, or a
+    number of 8 characters or more) and which numbers float() rejects. The
+    number and the byte after it are read as one 64-bit word, all bytes at
+    once.
+    """
+    word = words[position]
+    # The top bit of each byte from "." to "9", other than "/"
+    low = word & LOW
+    number = ((low | HIGH) - DOTS) & ((NINES | HIGH) - low) & ~word & HIGH
+    slashes = word ^ SLASHES
+    number &= ((slashes & LOW) + LOW) | slashes
+    stop = number ^ HIGH
+    full = stop == 0
+    stop_bit = stop & -stop
+    # Every bit below the byte that ends the number, and the lowest bit of that byte
+    below = stop_bit - ONE
+    unit = stop_bit >> SEVEN
+    length = np.bitwise_count(below & HIGH)
+    # A byte from 128 up after the number is a non-ASCII character, which is only safe if it is in U+0080-U+00FF
+    odd = ((word & stop_bit) != 0) & (((word & unit * LATIN1_MASK) != unit * LATIN1_LEAD) | (length == 0)) | full
+    dot_bits = zero_bytes(word ^ DOTS) & below
+    dots = np.bitwise_count(dot_bits)
+    dot_bit = dot_bits & -dot_bits
+    # Close the gap the dot leaves, then read the digits as an 8-digit number with leading zeros;
+    # bytes above the digits are shifted out, whatever the subtraction left in them
+    before_dot = (dot_bit >> SEVEN) - ONE
+    digits = ((word & before_dot) | ((word >> EIGHT) & ~before_dot)) - ZEROS
+    count = length - dots
+    digits <<= (EIGHT - count) << np.uint64(3)
+    digits = digits * np.uint64(10) + (digits >> EIGHT)
+    digits = ((digits & PAIRS) * np.uint64(100 + (1000000 << 32)) +
+              ((digits >> np.uint64(16)) & PAIRS) * np.uint64(1 + (10000 << 32))) >> np.uint64(32)
+    decimals = ((count - np.bitwise_count((dot_bit - ONE) & HIGH)) * dots) & 7
+    bad = (length > 0) & ((dots > 1) | (count == 0))
+    values = np.where((length > 0) & ~bad & ~odd, digits / POWERS[decimals], np.nan)
+    return values, length, odd, bad
+
+
+def literal(words, at, text):
+    """Whether text starts at each offset in at, compared eight bytes at a time."""
+    matched = None
+    for offset in sorted({*range(0, len(text) - 8, 8), max(len(text) - 8, 0)}):
+        chunk = text[offset:offset + 8]
+        found = words[at + offset]
+        if len(chunk) < 8:
+            found &= (1 << 8 * len(chunk)) - 1
+        found = found == int.from_bytes(chunk, 'little')
+        matched = found if matched is None else matched & found
+    return matched
+
+
+def line_ends(words, at):
+    """Whether each line ends at at, with "\\n" or "\\r\\n"."""
+    pair = words[at] & 0xFFFF
+    return ((pair & 0xFF) == 10) | (pair == 0x0A0D)
+
+
+def layout_rows(data, ts=None):
+    """The ROW array for a block, reading the lines in the firmware's own layouts at fixed offsets.
+
+    Returns None when too many lines with a marker are in no layout, for
+    Block to search field by field; the rest are parsed by parse_line().
+    """
+    buf = np.empty(len(data) + 2 * PAD, np.uint8)
+    buf[:PAD] = buf[-PAD:] = 10
+    body = buf[PAD:-PAD]
+    body[:] = np.frombuffer(data, np.uint8)
+    words = np.ndarray((len(buf) - 7,), '<u8', buf, 0, (1,))
+    # Every marker has a ">" or an "f" at a fixed place: "Environment ->", "Security ->", "| flame:"
+    hits = body == 62
+    hits |= body == 102
+    candidates = np.flatnonzero(hits) + PAD
+    arrows = buf[candidates] == 62
+    arrows, letters = np.flatnonzero(arrows), np.flatnonzero(~arrows)
+    kinds = np.zeros(len(candidates), np.int8)
+    for kind, (marker, at) in enumerate(LAYOUT_MARKERS, 1):
+        among = arrows if marker[at] == 62 else letters
+        kinds[among[literal(words, candidates[among] - at, marker)]] = kind
+    marked = np.flatnonzero(kinds)
+    kinds = kinds[marked]
+    starts = candidates[marked] - MARKER_OFFSETS[kinds]
+    at_start = buf[starts - 1] == 10
+    result = np.empty(len(starts), ROW)
+    result.view(RAW_ROW)[:] = EMPTY_ROW.view(RAW_ROW)
+    read = np.zeros(len(starts), bool)
+
+    # "Environment -> Temp: 25.50°C  Humidity: 60.00%  Light: 3.25V"
+    rows = np.flatnonzero((kinds == 1) & at_start)
+    at = starts[rows] + 21
+    ok = literal(words, at - 8, b"> Temp: ")
+    for field, follows in (('temp', "°C  Humidity: ".encode()), ('hum', b"%  Light: "), ('light', b"V")):
+        numbers, length, odd, bad = read_numbers(words, at)
+        at = at + length
+        ok &= (length > 0) & ~odd & ~bad & literal(words, at, follows)
+        at = at + len(follows)
+        result[field][rows] = numbers
+    ok &= line_ends(words, at)
+    read[rows[ok]] = True
+
+    # "Security -> Motion: YES | Door: OPEN | Gas: 450"
+    rows = np.flatnonzero((kinds == 2) & at_start)
+    at = starts[rows] + 20
+    ok = literal(words, at - 9, b" Motion: ")
+    # Each choice is told apart by its first 8 bytes; the rest of its layout is then one more word
+    yes = literal(words, at, b"YES | Do")
+    ok &= yes | literal(words, at, b"NO | Doo")
+    ok &= literal(words, at + np.where(yes, 8, 7), b"or: ")
+    at = at + np.where(yes, 12, 11)
+    opened = literal(words, at, b"OPEN | G")
+    ok &= opened | literal(words, at, b"CLOSED |")
+    rest = words[at + 8]
+    ok &= np.where(opened, (rest & 0xFFFFFFFF) == int.from_bytes(b"as: ", 'little'),
+                   (rest & 0xFFFFFFFFFFFF) == int.from_bytes(b" Gas: ", 'little'))
+    at = at + np.where(opened, 12, 14)
+    numbers, length, odd, bad = read_numbers(words, at)
+    ok &= (length > 0) & ~odd & ~bad & line_ends(words, at + length)
+    result['motion'][rows] = yes
+    result['door'][rows] = opened
+    result['gas'][rows] = numbers
+    read[rows[ok]] = True
+
+    # "| flame: 1234"
+    rows = np.flatnonzero((kinds == 3) & at_start)
+    at = starts[rows] + 9
+    numbers, length, odd, bad = read_numbers(words, at)
+    ok = (buf[at - 1] == 32) & (length > 0) & ~odd & ~bad & line_ends(words, at + length)
+    result['flame'][rows] = numbers
+    read[rows[ok]] = True
+
+    others = np.flatnonzero(~read)
+    if len(others) > len(starts) // 8:
+        return None
+    positions = starts - PAD
+    if len(others):
+        keep = np.flatnonzero(read)
+        positions = positions[keep]
+        # The line of each marker off the layouts, once per line however many markers it has
+        lines = {}
+        for start in (starts[others] - PAD).tolist():
+            first = data.rfind(b'\n', 0, start) + 1
+            if first not in lines:
+                end = data.find(b'\n', start)
+                lines[first] = data[first:len(data) if end < 0 else end].decode('utf-8', errors='replace')
+        extra = np.array([(math.nan,) + parse_line(text) for text in lines.values()], ROW)
+        positions = np.concatenate((positions, list(lines)))
+        order = np.argsort(positions, kind='stable')
+        result = take(concatenate((take(result, keep), extra)), order)
+        positions = positions[order]
+    if ts is not None:
+        newlines = np.flatnonzero(body == 10)
+        result['ts'] = np.asarray(ts, float)[np.searchsorted(newlines, positions)]
+    return result
+
+
+def concatenate(parts):
+    """np.concatenate for ROW arrays; copying them as plain bytes is many times faster."""
+    return np.concatenate([part.view(RAW_ROW) for part in parts]).view(ROW)
+
+
+def take(rows, index):
+    """rows[index] for a ROW array, copied as plain bytes."""
+    return rows.view(RAW_ROW)[index].view(ROW)
+
+
+def zero_bytes(words):
+    """The top bit of each byte that is zero in words."""
+    low = ~HIGH
+    return ~(((words & low) + low) | words) & HIGH
+
+
+def parse_block(data, ts=None):
+    """The ROW array for data, a bytes object of '\\n'-separated lines; ts gives each line's time."""
+    if not data:
+        return np.empty(0, ROW)
+    if ts is not None:
+        ts = np.asarray(ts, float)
+    parts = []
+    line = start = 0
+    while start < len(data):
+        end = data.find(b'\n', start + BLOCK_SIZE)
+        end = len(data) if end < 0 else end
+        chunk = data[start:end]
+        lines = chunk.count(b'\n') + 1 if ts is not None else 0
+        chunk_ts = None if ts is None else ts[line:line + lines]
+        rows = layout_rows(chunk, chunk_ts)
+        parts.append(Block(chunk).rows(chunk_ts) if rows is None else rows)
+        line += lines
+        start = end + 1
+    return concatenate(parts) if len(parts) > 1 else parts[0]
+
+
+def blocks(f, size=BLOCK_SIZE):
+    """Read f in blocks of whole lines."""
+    tail = b''
+    while True:
+        block = f.read(size)
+        if not block:
+            break
+        data = tail + block
+        cut = data.rfind(b'\n') + 1
+        tail = data[cut:]
+        if cut:
+            yield data[:cut]
+    if tail:
+        yield tail
+
+
+def parse_file(path):
+    """The ROW array for a plain log, a gzip-compressed log (.gz) or a capture (.shcap)."""
+    if path.endswith('.shcap'):
+        offsets = []
+        lines = []
+        for offset_ns, line in read_capture(path):
+            offsets.append(offset_ns / 1e9)
+            lines.append(line.replace('\n', ' '))
+        return parse_block('\n'.join(lines).encode('utf-8'), offsets)
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        parts = [parse_block(block) for block in blocks(f)]
+    return concatenate(parts) if parts else np.empty(0, ROW)
@@ -0,0 +1,84 @@
+from monitor_core.alerts import AlertEngine, build_rule, rule_spec, OK, NEAR, ALERT
+from monitor_core.parsers import SmartHomeParser
+
+
+def feed(engine, channel, readings):
+    events = []
+    engine.subscribe(events.append)
+    for ts, value in readings:
+        engine.feed(channel, value, ts)
+    return [(event['name'], event['active']) for event in events]
+
+
+def test_a_step_at_startup_is_not_a_rising_rate():
+    engine = AlertEngine()
+    engine.add_rule(build_rule({'name': 'rising', 'channel': 'temperature', 'rise': 0.1, 'window': 60}))
+    assert feed(engine, 'temperature', [(0, 20.0), (1, 27.0), (2, 27.0), (10, 27.0)]) == []
+
+
+def test_a_sustained_rise_fires_once_the_window_is_half_full():
+    engine = AlertEngine()
+    engine.add_rule(build_rule({'name': 'rising', 'channel': 'temperature', 'rise': 0.1, 'window': 60}))
+    readings = [(ts, 20.0 + ts * 0.5) for ts in range(0, 40)]
+    events = feed(engine, 'temperature', readings)
+    assert events == [('rising', True)]
+    assert engine.active['rising']['ts'] == 30
+
+
+def test_hysteresis_keeps_a_jittering_reading_from_flapping():
+    engine = AlertEngine()
+    engine.add_rule(build_rule({'name': 'hot', 'channel': 'temperature', 'above': 35, 'hysteresis': 1}))
+    readings = [(0, 34.0), (1, 35.5), (2, 34.8), (3, 35.2), (4, 34.1), (5, 33.9), (6, 35.1)]
+    assert feed(engine, 'temperature', readings) == [('hot', True), ('hot', False), ('hot', True)]
+
+
+def test_a_below_rule_clears_above_the_limit_plus_hysteresis():
+    engine = AlertEngine()
+    engine.add_rule(build_rule({'name': 'dry', 'channel': 'humidity', 'below': 30, 'hysteresis': 2}))
+    readings = [(0, 29.0), (1, 31.0), (2, 32.0)]
+    assert feed(engine, 'humidity', readings) == [('dry', True), ('dry', False)]
+
+
+def test_debounce_ignores_a_condition_shorter_than_for_seconds():
+    engine = AlertEngine()
+    engine.add_rule(build_rule({'name': 'food_low', 'channel': 'food_distance', 'above': 15, 'for_seconds': 5}))
+    # A 4 s spike is ignored; the condition held from ts=10 fires at ts=15
+    readings = [(0, 16.0), (4, 16.0), (5, 10.0), (10, 16.0), (14, 16.0), (15, 16.0)]
+    assert feed(engine, 'food_distance', readings) == [('food_low', True)]
+    assert engine.active['food_low']['ts'] == 15
+
+
+def test_debounce_also_delays_clearing():
+    engine = AlertEngine()
+    engine.add_rule(build_rule({'name': 'food_low', 'channel': 'food_distance', 'above': 15, 'for_seconds': 5}))
+    readings = [(0, 16.0), (5, 16.0), (6, 10.0), (8, 16.0), (9, 10.0), (13, 10.0), (14, 10.0)]
+    assert feed(engine, 'food_distance', readings) == [('food_low', True), ('food_low', False)]
+    assert 'food_low' not in engine.active
+
+
+def test_a_falling_rate_fires_on_a_sustained_drop():
+    engine = AlertEngine()
+    engine.add_rule(build_rule({'name': 'falling', 'channel': 'temperature', 'fall': 0.1, 'window': 60}))
+    readings = [(ts, 30.0 - ts * 0.5) for ts in range(0, 40)]
+    assert feed(engine, 'temperature', readings) == [('falling', True)]
+
+
+def test_level_grades_a_reading_against_the_rules_on_its_channel_at_once():
+    engine = AlertEngine.for_device('smarthome')
+    level = engine.level
+    assert [level('temperature', value) for value in (25.0, 31.0, 36.0)] == [OK, NEAR, ALERT]
+    assert [level('humidity', value) for value in (50.0, 35.0, 20.0)] == [OK, NEAR, ALERT]
+    # No near level, and the rate rule on temperature has no say in it
+    assert [level('gas', value) for value in (450.0, 650.0)] == [OK, ALERT]
+    assert level('temperature', None) is None
+    assert level('motion', 1.0) is None
+
+
+def test_the_display_text_switches_at_the_alert_thresholds():
+    parser = SmartHomeParser()
+    state = parser.initial_state()
+    gas = rule_spec('gas_leak')['above']
+    parser.process(f"Security -> Motion: NO | Door: CLOSED | Gas: {gas}", state)
+    assert state['gas'] == f"Normal ({gas})"
+    parser.process(f"Security -> Motion: NO | Door: CLOSED | Gas: {gas + 1}", state)
+    assert state['gas'] == "GAS LEAK!"
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from monitor_core.analyze import analyze, read_lines
+
+LINES = [
+    "Environment -> Temp: 25.50°C  Humidity: 60.00%  Light: 3.25V",
+    "| flame: 900",
+    "| flame: 3000",
+    "| flame: 850",
+]
+
+
+@pytest.fixture
+def log(tmp_path):
+    path = tmp_path / 'session.log'
+    path.write_bytes(('\n'.join(LINES) + '\n').encode('utf-8'))
+    return str(path)
+
+
+def line_ends(path):
+    data = open(path, 'rb').read()
+    return [index + 1 for index, byte in enumerate(data) if byte == ord('\n')]
+
+
+def test_ranges_cut_right_after_a_newline_read_each_line_once(log):
+    size = os.path.getsize(log)
+    for stop in line_ends(log)[:-1]:
+        lines = [line for start, end in ((0, stop), (stop, size)) for batch in read_lines(log, start, end)
+                 for line in batch]
+        assert lines == LINES
+
+
+@pytest.mark.parametrize('chunk_bytes', list(range(1, 80)))
+def test_report_does_not_depend_on_chunk_size(log, chunk_bytes):
+    report = analyze([log], jobs=1, chunk_bytes=chunk_bytes)['smarthome']
+    assert report['lines'] == len(LINES)
+    assert report['channels']['flame']['count'] == 3
+    assert report['channels']['temperature']['count'] == 1
+    assert report == analyze([log], jobs=1, chunk_bytes=1 << 20)['smarthome']
@@ -0,0 +1,55 @@
+import time
+
+from monitor_core.connection import ConnectionManager
+from monitor_core.engine import MonitorEngine
+
+
+class FakePort:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_reading_starts_only_after_the_settle_delay():
+    engine = MonitorEngine.for_device('smarthome')
+    opened = []
+    read_at = []
+
+    def opener(port_name, baud):
+        opened.append(time.monotonic())
+        return FakePort()
+
+    def read_loop(port):
+        read_at.append(time.monotonic())
+        manager.running = False
+    engine.read_loop = read_loop
+    manager = ConnectionManager(engine, 'COM9', opener=opener, settle=0.2).start()
+    manager.thread.join(2)
+
+    assert not manager.alive()
+    assert read_at[0] - opened[0] >= 0.2
+
+
+def test_stop_cuts_the_settle_delay_short_and_closes_the_port():
+    engine = MonitorEngine.for_device('smarthome')
+    ports = []
+
+    def opener(port_name, baud):
+        ports.append(FakePort())
+        return ports[-1]
+
+    def read_loop(port):
+        raise AssertionError("read before the board settled")
+    engine.read_loop = read_loop
+    manager = ConnectionManager(engine, 'COM9', opener=opener, settle=30).start()
+    while not ports:
+        time.sleep(0.01)
+    started = time.monotonic()
+    manager.stop()
+    manager.thread.join(2)
+
+    assert not manager.alive()
+    assert time.monotonic() - started < 1
+    assert ports[0].closed
@@ -0,0 +1,40 @@
+from monitor_core.engine import MonitorEngine
+from monitor_core.metrics import MetricsRegistry, instrument_engine
+
+
+def test_a_line_that_fails_to_parse_is_reported_to_the_error_subscribers(capsys):
+    engine = MonitorEngine.for_device('smarthome')
+    registry = MetricsRegistry()
+    instrument_engine(registry, engine, 'smarthome')
+    messages = []
+    engine.subscribe_errors(messages.append)
+
+    def broken(line, state):
+        raise ValueError("bad reading")
+    engine.parser.process = broken
+    engine.process_line("Environment -> Temp: x")
+
+    assert messages == ["Error processing line 'Environment -> Temp: x': bad reading"]
+    assert capsys.readouterr().out == ''
+    assert engine.parse_errors == 1
+    body = registry.render()
+    assert 'monitor_parse_errors_total{device="smarthome"} 1' in body
+    assert 'monitor_read_errors_total{device="smarthome"} 0' in body
+
+
+def test_readings_are_published_as_numbers_when_they_change():
+    engine = MonitorEngine.for_device('smarthome')
+    changes = []
+    engine.subscribe_readings(changes.append)
+    gas = []
+    engine.subscribe_readings(gas.append, keys=['gas'])
+    for line in ["Environment -> Temp: 25.50°C  Humidity: 60.00%  Light: 3.25V",
+                 "Environment -> Temp: 26.00°C  Humidity: 60.00%  Light: 3.25V",
+                 "Security -> Motion: NO | Door: CLOSED | Gas: 650",
+                 "Security -> Motion: NO | Door: CLOSED | Gas: 650"]:
+        engine.process_line(line)
+
+    assert changes == [{'temperature': 25.5, 'humidity': 60.0, 'light': 3.25}, {'temperature': 26.0}, {'gas': 650.0}]
+    assert gas == [{'gas': 650.0}]
+    # The state keeps the display text
+    assert engine.current_data['gas'] == "GAS LEAK!"
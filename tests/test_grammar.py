@@ -0,0 +1,56 @@
+"""The compiled grammars against golden cases recorded from the regex parsers they replaced.
+
+tests/data/grammar_<device>.json holds a salted log (realistic firmware
+output plus malformed and multi-marker lines) with, for every line, what
+the reference parsers did: the return value, the state keys that changed,
+the samples and the events (timestamps aside). Stamped fields use a fixed
+clock of 12:00:00.
+"""
+import json
+import os
+
+import pytest
+
+from monitor_core.parsers import SmartHomeParser, PetFeederParser
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def clock():
+    return "12:00:00"
+
+
+def load(device):
+    with open(os.path.join(DATA, f'grammar_{device}.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def replay(parser, golden):
+    samples = []
+    events = []
+    parser.subscribe_samples(lambda channel, value: samples.append([channel, value]))
+    parser.subscribe_events(lambda event: events.append({k: v for k, v in event.as_dict().items() if k != 'ts'}))
+    state = parser.initial_state()
+    assert state == golden['initial']
+    for case in golden['cases']:
+        before = dict(state)
+        returned = parser.process(case['line'], state)
+        changes = {key: value for key, value in state.items() if before.get(key) != value}
+        assert (returned, changes, samples, events) == (
+            case['returned'], case['changes'], case['samples'], case['events']), case['line']
+        del samples[:], events[:]
+    return state
+
+
+@pytest.mark.parametrize('device, parser_type', [('smarthome', SmartHomeParser), ('petfeeder', PetFeederParser)])
+def test_grammar_matches_the_reference_parsers(device, parser_type):
+    replay(parser_type(clock=clock), load(device))
+
+
+def test_a_divergence_is_reported():
+    # A golden case that disagrees must fail, so the comparison above is not vacuous
+    golden = load('smarthome')
+    case = next(case for case in golden['cases'] if 'temperature' in case['changes'])
+    case['changes']['temperature'] = '99.99'
+    with pytest.raises(AssertionError, match="Environment ->"):
+        replay(SmartHomeParser(clock=clock), golden)
@@ -0,0 +1,54 @@
+import threading
+
+from monitor_core.handoff import Handoff
+
+
+def test_each_producer_has_its_own_bounded_lane_and_exact_counters():
+    handoff = Handoff(max_items=500)
+    threads = [threading.Thread(target=lambda: [handoff.post(len, ()) for _ in range(2000)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = handoff.stats()
+    assert stats['posted'] == stats['depth'] == 2000
+    assert stats['dropped'] == 6000
+    assert stats['high_water'] == 500
+
+
+def test_calls_from_one_producer_run_in_order():
+    handoff = Handoff()
+    ran = []
+    for index in range(10):
+        handoff.post(ran.append, index)
+    assert handoff.drain(limit=4) == 4
+    handoff.drain()
+    assert ran == list(range(10))
+
+
+def test_dropped_state_changes_go_out_with_the_next_delta():
+    handoff = Handoff(max_items=1)
+    applied = {}
+    post_state = handoff.state_poster(applied.update)
+    post_state({'door': 'Open'})
+    post_state({'gas': 'Alert'})
+    handoff.drain()
+    post_state({'flame': 'Normal'})
+    handoff.drain()
+    assert applied == {'door': 'Open', 'gas': 'Alert', 'flame': 'Normal'}
+    assert handoff.dropped == 1
+
+
+def test_the_pump_applies_a_dropped_last_delta_without_another_line():
+    handoff = Handoff(max_items=1)
+    applied = {}
+    post_state = handoff.state_poster(applied.update)
+    post_state({'door': 'Open'})
+    post_state({'door': 'Closed', 'gas': 'Alert'})
+    # Nothing is flushed over calls still queued, which are older
+    assert not handoff.flush_unsent()
+    handoff.drain()
+    assert applied == {'door': 'Open'}
+    assert handoff.flush_unsent()
+    assert applied == {'door': 'Closed', 'gas': 'Alert'}
+    assert not handoff.flush_unsent()
@@ -0,0 +1,42 @@
+import errno
+import os
+
+import pytest
+
+from monitor_core import hub as hub_module
+from monitor_core.hub import MonitorHub
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="the hub's selector needs real file descriptors")
+
+
+class PipePort:
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+
+    def fileno(self):
+        return self.read_fd
+
+    def close(self):
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
+def test_a_lost_port_is_counted_and_reported_on_its_engine(monkeypatch):
+    hub = MonitorHub()
+    port = PipePort()
+    device = hub.add_device('ttyUSB0', 'smarthome', port)
+    messages = []
+    disconnected = []
+    device.engine.subscribe_errors(messages.append)
+    hub.subscribe_disconnects(disconnected.append)
+
+    def lost(fd, size):
+        raise OSError(errno.EIO, "Input/output error")
+    os.write(port.write_fd, b"x")
+    monkeypatch.setattr(hub_module.os, 'read', lost)
+    hub.poll(timeout=1)
+
+    assert device.engine.read_errors == 1
+    assert messages == ["Serial port lost: [Errno 5] Input/output error"]
+    assert disconnected == [device]
+    port.close()
@@ -0,0 +1,114 @@
+import os
+
+from monitor_core.engine import MonitorEngine
+from monitor_core.journal import EventJournal, LINE, STATE, encode_record, read_segment
+
+ENVIRONMENT = "Environment -> Temp: {:.2f}°C  Humidity: 60.00%  Light: 3.25V"
+
+
+def strip(state):
+    return {key: value for key, value in state.items() if key != 'last_update'}
+
+
+def recovered_state(directory):
+    engine = MonitorEngine.for_device('smarthome')
+    EventJournal(directory).recover(engine)
+    return engine.current_data
+
+
+def test_recovery_restores_the_readings(tmp_path):
+    engine = MonitorEngine.for_device('smarthome')
+    journal = EventJournal(str(tmp_path))
+    journal.attach(engine)
+    engine.process_line(ENVIRONMENT.format(24.5))
+    journal.close()
+    state = recovered_state(str(tmp_path))
+    assert (state['temperature'], state['humidity'], state['light']) == ('24.50', '60.00', '3.25')
+
+
+def test_a_stalled_writer_drops_the_oldest_lines_and_recovery_skips_the_gap(tmp_path):
+    engine = MonitorEngine.for_device('smarthome')
+    journal = EventJournal(str(tmp_path), max_pending=100)
+    messages = []
+    journal.subscribe_errors(messages.append)
+    journal.attach(engine)
+    # Nothing is written until close, as if the disk had stalled
+    journal.stop()
+    for index in range(250):
+        engine.process_line(ENVIRONMENT.format(20 + index % 7))
+    assert len(journal.pending) <= 100
+    assert journal.dropped > 0 and messages
+    journal.close()
+    assert journal.stats()['dropped'] == journal.dropped
+    assert strip(recovered_state(str(tmp_path))) == strip(engine.current_data)
+
+
+def journal_lines(directory, temperatures):
+    engine = MonitorEngine.for_device('smarthome')
+    journal = EventJournal(directory)
+    journal.attach(engine)
+    for temperature in temperatures:
+        engine.process_line(ENVIRONMENT.format(temperature))
+    journal.close()
+    return engine, journal.segment_path(journal.segments()[-1])
+
+
+def test_recovery_cuts_off_a_torn_tail(tmp_path):
+    engine, path = journal_lines(str(tmp_path), [21, 22, 23])
+    good_size = os.path.getsize(path)
+    # A crash in the middle of a write leaves the last record cut short
+    with open(path, 'ab') as f:
+        f.write(encode_record(LINE, 0, ENVIRONMENT.format(99).encode('utf-8'))[:20])
+
+    recovered = MonitorEngine.for_device('smarthome')
+    stats = EventJournal(str(tmp_path)).recover(recovered)
+    assert stats['truncated'] == 20
+    assert os.path.getsize(path) == good_size
+    assert strip(recovered.current_data) == strip(engine.current_data)
+
+
+def test_recovery_cuts_off_a_record_that_fails_its_checksum(tmp_path):
+    engine, path = journal_lines(str(tmp_path), [21, 22])
+    record = bytearray(encode_record(LINE, 0, ENVIRONMENT.format(99).encode('utf-8')))
+    record[-1] ^= 0xFF
+    with open(path, 'ab') as f:
+        f.write(record)
+
+    recovered = MonitorEngine.for_device('smarthome')
+    stats = EventJournal(str(tmp_path)).recover(recovered)
+    assert stats['truncated'] == len(record)
+    assert recovered.current_data['temperature'] == '22.00'
+
+    # The journal keeps appending after the cut, and the next recovery sees the new line
+    journal = EventJournal(str(tmp_path))
+    journal.attach(recovered)
+    recovered.process_line(ENVIRONMENT.format(24))
+    journal.close()
+    assert recovered_state(str(tmp_path))['temperature'] == '24.00'
+
+
+def test_the_first_line_after_recovery_publishes_only_what_it_changed(tmp_path):
+    journal_lines(str(tmp_path), [21, 22])
+    engine = MonitorEngine.for_device('smarthome')
+    EventJournal(str(tmp_path)).recover(engine)
+    changes = []
+    engine.state.subscribe(changes.append)
+    engine.process_line("Environment -> Temp: 23.00°C  Humidity: 60.00%  Light: 3.25V")
+    assert [set(change) - {'last_update'} for change in changes] == [{'temperature'}]
+
+
+def test_dropping_lines_around_segment_checkpoints_keeps_every_segment_recoverable(tmp_path):
+    engine = MonitorEngine.for_device('smarthome')
+    # Segments of a few lines, so checkpoints are queued among the lines the drop removes
+    journal = EventJournal(str(tmp_path), segment_bytes=300, max_pending=100, keep_segments=1000)
+    journal.attach(engine)
+    journal.stop()
+    for index in range(250):
+        engine.process_line(ENVIRONMENT.format(20 + index % 7))
+    assert journal.dropped > 0
+    assert any(type(item) is bytes for item in journal.pending)
+    journal.close()
+    for index in journal.segments():
+        records = read_segment(journal.segment_path(index))[0]
+        assert records[0][0] == STATE
+    assert strip(recovered_state(str(tmp_path))) == strip(engine.current_data)
@@ -0,0 +1,51 @@
+from monitor_core.engine import MonitorEngine
+from monitor_core.timeseries import TimeSeriesStore
+
+SECOND = 1_000_000_000
+
+
+def test_attached_store_writes_a_reading_only_when_it_changes(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    engine = MonitorEngine.for_device('smarthome')
+    store.attach(engine)
+    for line in ["Environment -> Temp: 25.50°C  Humidity: 60.00%  Light: 3.25V",
+                 "Environment -> Temp: 25.50°C  Humidity: 61.00%  Light: 3.25V",
+                 "Environment -> Temp: 26.00°C  Humidity: 61.00%  Light: 3.25V",
+                 "Security -> Motion: NO | Door: CLOSED | Gas: 450",
+                 "Security -> Motion: NO | Door: CLOSED | Gas: 450",
+                 "Security -> Motion: NO | Door: CLOSED | Gas: 470"]:
+        engine.process_line(line)
+
+    assert store.range('temperature')[1] == [25.5, 26.0]
+    assert store.range('humidity')[1] == [60.0, 61.0]
+    assert store.range('light')[1] == [3.25]
+    # Gas comes from the samples rather than the state, and is recorded the same way
+    assert store.range('gas')[1] == [450.0, 470.0]
+    store.close()
+
+
+def test_range_carries_the_value_in_force_into_the_window(tmp_path):
+    store = TimeSeriesStore(str(tmp_path), segment_capacity=2)
+    for ts, value in [(0, 20.0), (10, 21.0), (20, 22.0)]:
+        store.append('temperature', value, ts * SECOND)
+
+    assert store.range('temperature', 15 * SECOND, 18 * SECOND) == ([15 * SECOND], [21.0])
+    assert store.range('temperature', 15 * SECOND) == ([15 * SECOND, 20 * SECOND], [21.0, 22.0])
+    assert store.range('temperature', 10 * SECOND, 11 * SECOND) == ([10 * SECOND], [21.0])
+    assert store.range('temperature', None, 5 * SECOND) == ([0], [20.0])
+    store.close()
+
+
+def test_downsample_weighs_each_level_by_how_long_it_held(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    store.append('gas', 400.0, 0)
+    store.append('gas', 600.0, 45 * SECOND)
+
+    buckets = store.downsample('gas', 60 * SECOND, 0, 180 * SECOND)
+    assert buckets == [(0, 400.0, 600.0, 450.0, 2),
+                       (60 * SECOND, 600.0, 600.0, 600.0, 0),
+                       (120 * SECOND, 600.0, 600.0, 600.0, 0)]
+    # A window after the last change still has the level in force
+    assert store.downsample('gas', 60 * SECOND, 120 * SECOND, 180 * SECOND) == [
+        (120 * SECOND, 600.0, 600.0, 600.0, 0)]
+    store.close()